@@ -0,0 +1,59 @@
+"""
+Key-ring of wallet mnemonics encryption, MultiFernet built once per process.
+Keys come from core.secrets: `encryption_keys` list (newest first) or single
+`encryption_key`. New data is always encrypted with the first key, any key
+of the ring decrypts, so a new key is rolled out by prepending it to the list
+and running `manage.py rotate_mnemonics`, then the old key can be removed.
+"""
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+import threading
+
+from . import secrets
+
+
+_keyring = None
+_primary = None
+_lock = threading.Lock()
+
+
+def keys() -> list:
+    return list(getattr(secrets, 'encryption_keys', None) or [secrets.encryption_key])
+
+
+def get_keyring() -> MultiFernet:
+    """Return process-wide MultiFernet, created on first use"""
+    global _keyring, _primary
+
+    if _keyring is None:
+        with _lock:
+            if _keyring is None:
+                fernets = [Fernet(key) for key in keys()]
+                _primary = fernets[0]
+                _keyring = MultiFernet(fernets)
+    return _keyring
+
+
+def encrypt(text: str) -> str:
+    return get_keyring().encrypt(text.encode('utf-8')).decode('utf-8')
+
+
+def decrypt(token: str) -> str:
+    """:raise InvalidToken: when no key of the ring decrypts the token"""
+    return get_keyring().decrypt(token.encode('utf-8')).decode('utf-8')
+
+
+def is_current(token: str) -> bool:
+    """True if token is encrypted with the newest key"""
+    get_keyring()
+    try:
+        _primary.decrypt(token.encode('utf-8'))
+        return True
+    except InvalidToken:
+        return False
+
+
+def rotate(token: str) -> str:
+    """Re-encrypt token with the newest key
+    :raise InvalidToken: when no key of the ring decrypts the token
+    """
+    return get_keyring().rotate(token.encode('utf-8')).decode('utf-8')
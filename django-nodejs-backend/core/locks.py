@@ -0,0 +1,159 @@
+"""
+Per-wallet send lanes: sends from one address run strictly one after another,
+sends from different addresses run in parallel. On PostgreSQL lanes hold across
+all Django processes (session advisory lock keyed by wallet address), other
+databases fall back to locks local to this process.
+"""
+from contextlib import contextmanager, asynccontextmanager
+from hashlib import blake2b
+import threading
+import asyncio
+import time
+
+from django.db import connection, OperationalError
+from django.conf import settings
+from asgiref.sync import sync_to_async
+
+
+# Seconds between pg_try_advisory_lock attempts of async lock
+ASYNC_LOCK_POLL = 0.05
+
+
+class WalletBusy(Exception):
+    """Wallet lane was not free within lock timeout"""
+
+
+class LaneLocks:
+    """
+    Process local locks of wallet lanes, created on first use and dropped
+    when nobody holds or waits for them, so idle wallets keep no lock.
+    :param factory: lock class, threading.Lock or asyncio.Lock
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.locks: dict = {}
+        self._guard = threading.Lock()
+
+    def take(self, address: str):
+        """Return lock of the wallet lane, every take() must be followed by put()"""
+        with self._guard:
+            entry = self.locks.setdefault(address, [self.factory(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def put(self, address: str):
+        with self._guard:
+            entry = self.locks[address]
+            entry[1] -= 1
+            if not entry[1]:
+                del self.locks[address]
+
+    def __len__(self):
+        return len(self.locks)
+
+
+_local_locks = LaneLocks(threading.Lock)
+_async_locks = LaneLocks(asyncio.Lock)
+
+
+def lock_key(address: str) -> int:
+    """64-bit signed advisory lock key of wallet address"""
+    return int.from_bytes(blake2b(address.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def _timeout(timeout: float = None) -> float:
+    return timeout or getattr(settings, 'VITE_WALLET_LOCK_TIMEOUT', 30)
+
+
+def _advisory() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def _try_advisory_lock(key: int) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+        return cursor.fetchone()[0]
+
+
+def _advisory_unlock(key: int):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [key])
+
+
+@contextmanager
+def wallet_lock(address: str, timeout: float = None):
+    """
+    Hold send lane of the wallet, waiting for it at most `timeout` seconds
+    (VITE_WALLET_LOCK_TIMEOUT by default), raise WalletBusy if it is not free.
+    """
+    timeout = _timeout(timeout)
+
+    if not _advisory():
+        lock = _local_locks.take(address)
+
+        try:
+            if not lock.acquire(timeout=timeout):
+                raise WalletBusy(f"wallet {address} busy")
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            _local_locks.put(address)
+        return
+
+    # Waiters are queued by PostgreSQL, lock_timeout limits the wait
+    key = lock_key(address)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('lock_timeout', %s, false)", [f"{int(timeout * 1000)}ms"])
+        try:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [key])
+        except OperationalError:
+            raise WalletBusy(f"wallet {address} busy")
+        finally:
+            cursor.execute("RESET lock_timeout")
+
+    try:
+        yield
+    finally:
+        _advisory_unlock(key)
+
+
+@asynccontextmanager
+async def async_wallet_lock(address: str, timeout: float = None):
+    """
+    wallet_lock() for async views, waits without blocking the event loop.
+    Async views share one database connection and advisory locks are
+    re-entrant per connection, so lanes are first held by an asyncio.Lock.
+    """
+    deadline = time.monotonic() + _timeout(timeout)
+    lock = _async_locks.take(address)
+
+    try:
+        try:
+            await asyncio.wait_for(lock.acquire(), _timeout(timeout))
+        except asyncio.TimeoutError:
+            raise WalletBusy(f"wallet {address} busy")
+
+        try:
+            if not _advisory():
+                yield
+                return
+
+            key = lock_key(address)
+
+            while not await sync_to_async(_try_advisory_lock)(key):
+                if time.monotonic() >= deadline:
+                    raise WalletBusy(f"wallet {address} busy")
+                await asyncio.sleep(ASYNC_LOCK_POLL)
+
+            try:
+                yield
+            finally:
+                await sync_to_async(_advisory_unlock)(key)
+        finally:
+            lock.release()
+    finally:
+        _async_locks.put(address)
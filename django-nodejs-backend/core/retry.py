@@ -0,0 +1,269 @@
+import threading
+import asyncio
+import random
+import time
+
+
+# Response classification
+SUCCESS = 'success'
+RETRYABLE = 'retryable'
+TERMINAL = 'terminal'
+
+# Lower case fragments of error messages worth another attempt,
+# node or worker did not answer, not a problem with the request itself
+# (prevHash / prevBlock: sender account moved on, retried with fresh height)
+RETRYABLE_ERRORS = ('timeout', 'timed out', 'worker exited', 'no free node.js worker',
+                    'econnrefused', 'econnreset', 'socket hang up', 'network', 'connection',
+                    'prevhash', 'prevblock')
+
+# Retryable errors caused by local contention, not by VITE node, never counted by CircuitBreaker
+# (worker pool of this process is saturated, another send from the same wallet won the block)
+CONTENTION_ERRORS = ('no free node.js worker', 'prevhash', 'prevblock')
+
+# Errors which will not go away on retry, checked before RETRYABLE_ERRORS
+TERMINAL_ERRORS = ('insufficient', 'sendblock.height must be larger than 1',
+                   'balance is not enough', 'invalid', 'missing args')
+
+
+def error_response(msg: str) -> dict:
+    return {'error': 1, 'msg': msg, 'data': None}
+
+
+class Deadline:
+    """Total time budget of one HTTP request shared by all calls and retries made for it
+    :param seconds: budget in seconds, None for no deadline
+    """
+
+    def __init__(self, seconds: float = None):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds if seconds is not None else None
+
+    @classmethod
+    def from_request(cls, request, default: float = None):
+        """Deadline from 'X-Request-Timeout' header (seconds), never longer than `default`"""
+        try:
+            seconds = float(request.headers.get('X-Request-Timeout', default))
+        except (TypeError, ValueError):
+            seconds = default
+
+        if default is not None and seconds is not None:
+            seconds = min(seconds, default)
+        return cls(seconds)
+
+    def remaining(self) -> float:
+        """Seconds left, None if there is no deadline"""
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def __repr__(self):
+        return f"Deadline({self.remaining()})"
+
+
+class CircuitBreaker:
+    """Stop calling VITE node after `threshold` retryable failures in a row,
+    fail fast for `reset_timeout` seconds, then let one trial call through
+    (half-open) and close again on its success.
+    Thread safe, one instance is shared by the whole process.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str, threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if call can be made now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial = False
+
+            # Only one trial call at a time when half-open
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+
+            return False
+
+    def record(self, success: bool):
+        with self._lock:
+            if success:
+                self.state = self.CLOSED
+                self.failures = 0
+            else:
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                    self.state = self.OPEN
+                    self.opened_at = time.monotonic()
+            self._trial = False
+
+    def release(self):
+        """End trial call without result (not made, failed locally or raised), state unchanged"""
+        with self._lock:
+            self._trial = False
+
+    def __repr__(self):
+        return f"CircuitBreaker({self.name} | {self.state} | failures: {self.failures})"
+
+
+class RetryPolicy:
+    """Retry connector calls with exponential backoff and full jitter.
+    Called function receives timeout for its single attempt (remaining deadline)
+    and returns response dict {'error', 'msg', 'data'}.
+    :param attempts: max number of attempts
+    :param base_delay: first backoff delay in seconds
+    :param max_delay: backoff delay cap in seconds
+    :param timeout: max seconds of a single attempt, so one slow attempt
+                    does not use up the whole deadline (None for no limit)
+    """
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 5, timeout: float = None):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    @staticmethod
+    def classify(response: dict) -> str:
+        if not response['error']:
+            return SUCCESS
+
+        msg = str(response['msg']).lower()
+
+        if any(error in msg for error in TERMINAL_ERRORS):
+            return TERMINAL
+        if any(error in msg for error in RETRYABLE_ERRORS):
+            return RETRYABLE
+        return TERMINAL
+
+    @staticmethod
+    def contention(response: dict) -> bool:
+        """True if error is caused by local contention, see CONTENTION_ERRORS"""
+        msg = str(response['msg']).lower()
+        return any(error in msg for error in CONTENTION_ERRORS)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def attempt_timeout(self, deadline: Deadline = None):
+        """Timeout of next attempt, None if neither deadline nor attempt timeout is set"""
+        timeouts = [t for t in (deadline.remaining() if deadline else None, self.timeout) if t is not None]
+        return min(timeouts) if timeouts else None
+
+    def _before_attempt(self, name: str, deadline: Deadline, breaker: CircuitBreaker):
+        """Return error response if attempt must not be made, else None"""
+        if deadline and deadline.expired:
+            return error_response(f"{name} deadline exceeded")
+        if breaker and not breaker.allow():
+            return error_response(f"{name} failed fast, VITE node unavailable ({breaker.state})")
+
+    @staticmethod
+    def _attempt_raised(breaker: CircuitBreaker):
+        """Attempt raised (or was cancelled), do not leave half-open breaker waiting for its result"""
+        if breaker:
+            breaker.release()
+
+    def _after_attempt(self, name: str, attempt: int, response: dict, deadline: Deadline,
+                       breaker: CircuitBreaker, logger: object) -> tuple:
+        """Return (final response or None, backoff delay)"""
+        kind = self.classify(response)
+
+        if breaker:
+            if kind == RETRYABLE and self.contention(response):
+                breaker.release()
+            else:
+                breaker.record(kind != RETRYABLE)
+
+        if kind != RETRYABLE:
+            return response, 0
+
+        if attempt >= self.attempts:
+            return error_response(f"{name} too many failed attempts ({response['msg']})"), 0
+
+        delay = self.backoff(attempt)
+
+        if deadline and deadline.remaining() is not None and delay >= deadline.remaining():
+            return error_response(f"{name} deadline exceeded ({response['msg']})"), 0
+
+        if logger:
+            logger.warning(f"{response['msg']}, re-try {name} in {delay:.2f}s "
+                           f"({self.attempts - attempt} left)")
+        return None, delay
+
+    def call(self, fn, name: str, deadline: Deadline = None, breaker: CircuitBreaker = None,
+             logger: object = None) -> dict:
+        """Run fn(timeout) until success, terminal error, no attempts or no time left"""
+        for attempt in range(1, self.attempts + 1):
+            response = self._before_attempt(name, deadline, breaker)
+            if response:
+                return response
+
+            try:
+                response = fn(self.attempt_timeout(deadline))
+            except BaseException:
+                self._attempt_raised(breaker)
+                raise
+            response, delay = self._after_attempt(name, attempt, response, deadline, breaker, logger)
+
+            if response:
+                return response
+            time.sleep(delay)
+
+    async def acall(self, fn, name: str, deadline: Deadline = None, breaker: CircuitBreaker = None,
+                    logger: object = None) -> dict:
+        """Async version of call(), fn(timeout) returns awaitable"""
+        for attempt in range(1, self.attempts + 1):
+            response = self._before_attempt(name, deadline, breaker)
+            if response:
+                return response
+
+            try:
+                response = await fn(self.attempt_timeout(deadline))
+            except BaseException:
+                self._attempt_raised(breaker)
+                raise
+            response, delay = self._after_attempt(name, attempt, response, deadline, breaker, logger)
+
+            if response:
+                return response
+            await asyncio.sleep(delay)
+
+    def steps(self, attempt, name: str, deadline: Deadline = None, breaker: CircuitBreaker = None,
+              logger: object = None):
+        """
+        Generator version of call() for code written once for sync and async callers
+        (see core.vite_connector): attempt(timeout) is a generator of I/O steps, waits
+        between attempts are yielded as ('sleep', seconds) steps for the caller to run.
+        :return: final response, as generator return value
+        """
+        for number in range(1, self.attempts + 1):
+            response = self._before_attempt(name, deadline, breaker)
+            if response:
+                return response
+
+            try:
+                response = yield from attempt(self.attempt_timeout(deadline))
+            except BaseException:
+                self._attempt_raised(breaker)
+                raise
+            response, delay = self._after_attempt(name, number, response, deadline, breaker, logger)
+
+            if response:
+                return response
+            yield 'sleep', delay
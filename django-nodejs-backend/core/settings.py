@@ -162,3 +162,57 @@ STATICFILES_DIRS = [DJANGO_VITE_ASSETS_PATH]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'vtm.TelegramUser'
+
+# NodeJS workers serving VITE API calls (core.vite_connector.WorkerPool)
+VITE_WORKERS = 4
+VITE_WORKER_TIMEOUT = 60
+VITE_WORKER_HEALTH_INTERVAL = 30
+
+# Mount tipbot async/* end-points, enable only when served by ASGI (core.asgi),
+# they share one node.js worker pool per event loop (core.vite_connector.get_async_pool)
+VITE_ASYNC_VIEWS = False
+
+# Total seconds one HTTP request may spend on VITE calls and their retries,
+# clients can ask for less with 'X-Request-Timeout' header (core.retry.Deadline)
+VITE_REQUEST_DEADLINE = 90
+
+# Fail fast after this many VITE node failures in a row, try again after reset timeout
+VITE_BREAKER_THRESHOLD = 5
+VITE_BREAKER_RESET_TIMEOUT = 30
+
+# Pending transactions are received by `manage.py run_receiver` service,
+# tipbot update/ end-point only reads wallet status when enabled
+VITE_AUTO_RECEIVE = False
+VITE_RECEIVER_INTERVAL = 10
+VITE_RECEIVER_WORKERS = 2
+
+# send_transaction only queues transactions for `manage.py run_outbox` workers,
+# clients follow them with transaction_status (long-polling up to VITE_STATUS_MAX_WAIT)
+VITE_SEND_OUTBOX = False
+VITE_OUTBOX_WORKERS = 4
+VITE_STATUS_MAX_WAIT = 30
+
+# Max seconds a send waits for other sends from the same wallet (core.locks.wallet_lock)
+VITE_WALLET_LOCK_TIMEOUT = 30
+
+# Sender rate limit (vtm.models.TelegramUser.allow_send): burst of sends, then one per interval seconds
+TIPBOT_SEND_BURST = 3
+TIPBOT_SEND_INTERVAL = 2
+
+# Max number of receivers of one /tipbot/send_batch/ request
+TIPBOT_MAX_BATCH_RECEIVERS = 20
+
+# Max age in seconds of balances served from cache by /tipbot/balance/ (tipbot.balance_cache),
+# used only with CACHES backend shared by all processes, e.g. memcached:
+# CACHES = {'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+#                       'LOCATION': '127.0.0.1:11211'}}
+VITE_BALANCE_CACHE_TTL = 30
+
+# Seconds before token registry (vtm.tokens) reloads tokens changed by other processes
+VITE_TOKEN_REGISTRY_TTL = 300
+
+# Max number of profiles in one /api/users/sync request (bot write-behind profile sync)
+VTM_MAX_SYNC_USERS = 500
+
+# Max number of usernames, ids and alias titles in one /api/users/resolve request
+VTM_MAX_RESOLVE = 50
@@ -1,12 +1,12 @@
-from cryptography.fernet import Fernet
-
 import json
 
-from .secrets import secret_links_login, secret_links_key, encryption_key
+from .secrets import secret_links_login, secret_links_key
 from vtm.models import Token, TelegramUser
 from .secret_links import OneTimeSecret
 from tipbot.models import Wallet
 from .vite_connector import ViteConnector
+from vtm import tokens
+from . import keyring
 
 
 def get_or_create_telegram_user(request) -> tuple:
@@ -36,18 +36,7 @@ def get_or_create_vite_token(payload: dict) -> Token:
     :param payload: dict with request data (token details)
     :return: Token instance
     """
-    token_data = {
-        'id': payload['tokenId'],
-        'name': payload['tokenName'],
-        'symbol': payload['tokenSymbol'],
-        'decimals': payload['decimals'],
-        'max_supply': payload['maxSupply'],
-        'total_supply': payload['totalSupply'],
-        'owner_address': payload['owner']
-        }
-    token, created = Token.objects.get_or_create(
-        id=payload['tokenId'], defaults=token_data)
-    return token
+    return tokens.registry.register(payload)
 
 
 def create_vite_wallet(user: TelegramUser) -> dict:
@@ -63,10 +52,7 @@ def create_vite_wallet(user: TelegramUser) -> dict:
         response = {'error': 1, 'msg': new_wallet['msg'], 'data': None}
     else:
         # Encrypt mnemonics before storing in database
-        mnemonics_b = bytes(new_wallet['data']['mnemonics'], 'utf-8')
-        encrypted_mnemonics = Fernet(encryption_key).encrypt(mnemonics_b)
-
-        mnemonics_ = encrypted_mnemonics.decode('utf-8')
+        mnemonics_ = keyring.encrypt(new_wallet['data']['mnemonics'])
 
         # make sure mnemonics are saved as expected
         if len(mnemonics_) < 292:
@@ -123,16 +109,7 @@ def create_wallet_secret(wallet: Wallet, request) -> str:
 
 def readable_balance(balance: dict):
     """Parse Vite API addressBalance to readable form"""
-    epic_id = 'tti_f370fadb275bc2a1a839c753'
-
-    if balance and 'balanceInfoMap' in balance.keys() \
-        and epic_id in balance['balanceInfoMap'].keys():
-        epic = balance['balanceInfoMap'][epic_id]
-        as_int = int(epic['balance'])
-        decimals = epic['tokenInfo']['decimals']
-        return round((as_int / 10 ** decimals), 8)
-    else:
-        return 0.0
+    return tokens.readable_balance(balance)
 
 
 def is_valid_vite_address(address: str) -> bool:
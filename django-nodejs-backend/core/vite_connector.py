@@ -4,15 +4,588 @@ https://github.com/vitelabs/vite.js
 https://docs.vite.org/vite-docs/vite.js/
 """
 import subprocess
+import threading
+import asyncio
+import itertools
+import hashlib
+import atexit
+import queue
+import json
 import time
 
+from django.conf import settings
+
+from .retry import RetryPolicy, CircuitBreaker, Deadline, error_response
+from .logger_ import setup_logging
+
+try:
+    # Optional faster decoder for node.js frames
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 SCRIPT_PATH = "static/src/js/api_handler.js"
 
+# Frame format version, must match PROTOCOL_VERSION in static/src/js/tools.js
+PROTOCOL_VERSION = 1
+
+# Retry policies of connector calls, see core.retry
+BALANCE_RETRY = RetryPolicy(attempts=5, base_delay=0.2, max_delay=2, timeout=15)
+UPDATE_RETRY = RetryPolicy(attempts=4, base_delay=0.5, max_delay=4, timeout=60)
+SEND_RETRY = RetryPolicy(attempts=3, base_delay=0.5, max_delay=4, timeout=45)
+CREATE_RETRY = RetryPolicy(attempts=2, base_delay=0.2, max_delay=1, timeout=10)
+BALANCES_RETRY = RetryPolicy(attempts=3, base_delay=0.5, max_delay=4)
+
+# Lower case fragments of node errors refusing a send block because of its
+# previous block, block was not added and send can be re-tried on fresh state
+SEND_REJECTED_ERRORS = ('prevhash', 'prevblock')
+
+# Commands of one wallet always handed to the same worker of a pool, which keeps
+# derived key pair (keys.js) and pre-computed PoW (pow.js) of the wallet in memory
+WALLET_COMMANDS = ('send', 'update')
+
+# blockType of account blocks sent by send(), see ledger_getLatestAccountBlock
+SEND_BLOCK_TYPE = '2'
+
+logger = setup_logging(name=__name__, console_log_output="stdout", console_log_level="info", console_log_color=True,
+                       logfile_file=__name__ + ".log", logfile_log_level="info", logfile_log_color=False,
+                       log_line_template="%(color_on)s[%(asctime)s] [%(threadName)s] [%(levelname)-8s] %(message)s%(color_off)s")
+
+
+def wallet_worker(command: str, args: dict, size: int):
+    """Index of the worker in pool of `size` for WALLET_COMMANDS, None for any worker"""
+    if command not in WALLET_COMMANDS or 'mnemonics' not in args:
+        return None
+
+    wallet = f"{args['mnemonics']}:{args.get('address_id', 0)}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(wallet, digest_size=8).digest(), 'big') % size
+
+
+class NodeWorker:
+    """Long-lived `node api_handler.js serve` process answering JSON requests
+    sent line by line to its stdin. Worker writes JSON frames to stdout,
+    one per line, matched with requests by id, and `>>` logs to stderr.
+    Every spawned process has its own map of pending requests, so exit of
+    a replaced process never fails requests sent to its successor.
+    :param script: path to api_handler.js
+    :param logger: logger
+    """
+
+    def __init__(self, script: str, logger: object):
+        self.script = script
+        self.logger = logger
+        self.process = None
+        self.pending: dict = {}
+        self.timed_out = False
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.start()
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.pending = {}
+        self.timed_out = False
+        self.process = subprocess.Popen(['node', self.script, 'serve'], stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        for target, args, name in ((self._read_frames, (self.process, self.pending), 'node-worker'),
+                                   (self._read_logs, (self.process, ), 'node-logs')):
+            reader = threading.Thread(target=target, args=args,
+                                      name=f"{name}-{self.process.pid}", daemon=True)
+            reader.start()
+        self.logger.info(f"node.js worker [{self.process.pid}] started")
+
+    def stop(self):
+        if self.is_alive:
+            self.process.kill()
+            self.process.wait()
+
+    def restart(self):
+        self.logger.warning(f"node.js worker [{self.process.pid}] not responding, respawning..")
+        self.stop()
+        self.start()
+
+    def _read_logs(self, process):
+        """Forward worker stderr (`>>` log lines) to logger"""
+        for line in process.stderr:
+            line = line.decode('utf-8', 'replace').strip()
+            if line: self.logger.info(f"node.js >> {line.lstrip('> ')}")
+
+    def _read_frames(self, process, pending: dict):
+        """Decode worker stdout frames and pass them to requests waiting on this process"""
+        for line in process.stdout:
+            if not self._route_frame(line, process, pending):
+                break
+
+        self._release_pending(pending)
+
+    def _route_frame(self, line: bytes, process, pending: dict) -> bool:
+        """Decode single frame and put it to its request queue,
+        return False when worker speaks incompatible protocol."""
+        try:
+            frame = json_loads(line)
+        except ValueError:
+            self.logger.warning(f"node.js >> invalid frame: {line[:200]}")
+            return True
+
+        if frame.get('v') != PROTOCOL_VERSION:
+            self.logger.error(f"node.js worker [{process.pid}] protocol "
+                              f"v{frame.get('v')} != v{PROTOCOL_VERSION}, stopping")
+            process.kill()
+            return False
+
+        frames = pending.get(frame.get('id'))
+        if frames is not None: frames.put_nowait(frame)
+        return True
+
+    @staticmethod
+    def _release_pending(pending: dict):
+        """Process finished, release requests still waiting for its response"""
+        for request_id in list(pending):
+            frames = pending.pop(request_id, None)
+            if frames is not None:
+                frames.put_nowait({'type': 'result', 'error': 1, 'msg': 'node.js worker exited', 'data': None})
+
+    def stream(self, command: str, timeout: float, **args):
+        """
+        Send command with args to the worker and yield response frames as they
+        arrive: 'item' frames of streamed lists first, 'result' frame last.
+        :param command: api_handler.js worker command
+        :param timeout: seconds to wait for the whole response
+        :return: generator of frame dicts
+        """
+        request_id = next(self._ids)
+        frames = queue.Queue()
+        process, pending = self.process, self.pending
+        pending[request_id] = frames
+        line = json.dumps({'v': PROTOCOL_VERSION, 'id': request_id, 'command': command, 'args': args})
+
+        try:
+            with self._lock:
+                process.stdin.write(line.encode('utf-8') + b'\n')
+                process.stdin.flush()
+        except (OSError, ValueError) as e:
+            pending.pop(request_id, None)
+            yield {'type': 'result', 'error': 1, 'msg': f"node.js worker error: {e}", 'data': None}
+            return
+
+        deadline = time.monotonic() + timeout
+
+        try:
+            while True:
+                try:
+                    frame = frames.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    # Worker may be stuck, pool respawns it before next use
+                    self.timed_out = True
+                    yield {'type': 'result', 'error': 1, 'msg': f"{command} timeout after {timeout}s", 'data': None}
+                    return
+
+                yield frame
+                if frame['type'] == 'result':
+                    return
+        finally:
+            pending.pop(request_id, None)
+
+    def request(self, command: str, timeout: float, **args) -> dict:
+        """
+        Send command with args to the worker and wait for response,
+        streamed items are collected into response data list.
+        :return: dict, {'error': int, 'msg': str, 'data': any}
+        """
+        items = []
+
+        for frame in self.stream(command, timeout, **args):
+            if frame['type'] == 'item':
+                items.append(frame['data'])
+            else:
+                return {'error': frame['error'], 'msg': frame['msg'],
+                        'data': items if items else frame['data']}
+
+
+class WorkerPool:
+    """Fixed size pool of warm NodeWorker processes shared by all ViteConnector
+    instances in this process. Idle workers are health-checked periodically,
+    dead or unresponsive workers are respawned. Commands of one wallet wait for
+    its own worker (see WALLET_COMMANDS), other commands take any idle one.
+    :param size: number of node.js workers
+    :param script: path to api_handler.js
+    :param logger: logger
+    :param timeout: default request timeout in seconds
+    :param health_interval: seconds between health checks
+    """
+
+    def __init__(self, size: int, script: str, logger: object, timeout: float = 60, health_interval: float = 30):
+        self.size = size
+        self.script = script
+        self.logger = logger
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.workers = [NodeWorker(script, logger) for _ in range(size)]
+        self.idle = list(self.workers)
+        self._idle_changed = threading.Condition()
+
+        health = threading.Thread(target=self._health_check, name='node-pool-health', daemon=True)
+        health.start()
+
+    def _acquire(self, command: str, timeout: float, args: dict):
+        """Take idle worker for the command out of the pool, None if there is none in time"""
+        index = wallet_worker(command, args, self.size)
+        wanted = self.workers[index] if index is not None else None
+
+        with self._idle_changed:
+            if not self._idle_changed.wait_for(lambda: wanted in self.idle if wanted is not None else self.idle, timeout):
+                return None
+
+            worker = wanted or self.idle[0]
+            self.idle.remove(worker)
+            return worker
+
+    def _put(self, worker: NodeWorker):
+        with self._idle_changed:
+            self.idle.append(worker)
+            self._idle_changed.notify_all()
+
+    def request(self, command: str, timeout: float = None, **args) -> dict:
+        """Hand command to free worker and return its response"""
+        timeout = timeout or self.timeout
+        worker = self._acquire(command, timeout, args)
+
+        if worker is None:
+            return {'error': 1, 'msg': f"{command} timeout, no free node.js worker", 'data': None}
+
+        try:
+            if not worker.is_alive:
+                worker.restart()
+            return worker.request(command, timeout, **args)
+        finally:
+            self._release(worker)
+
+    def stream(self, command: str, timeout: float = None, **args):
+        """Hand command to free worker and yield its response frames"""
+        timeout = timeout or self.timeout
+        worker = self._acquire(command, timeout, args)
+
+        if worker is None:
+            yield {'type': 'result', 'error': 1, 'msg': f"{command} timeout, no free node.js worker", 'data': None}
+            return
+
+        try:
+            if not worker.is_alive:
+                worker.restart()
+            yield from worker.stream(command, timeout, **args)
+        finally:
+            self._release(worker)
+
+    def _release(self, worker: NodeWorker):
+        """Return worker to idle ones, respawn it first if its request timed out"""
+        try:
+            if worker.timed_out:
+                worker.restart()
+        finally:
+            self._put(worker)
+
+    def broadcast(self, command: str, timeout: float = None, **args) -> list:
+        """Send command to every worker, busy ones included (worker state commands
+        like purge_keys), and return list of their responses"""
+        return [worker.request(command, timeout or self.timeout, **args)
+                for worker in self.workers if worker.is_alive]
+
+    def _health_check(self):
+        """Ping idle workers every `health_interval` seconds, respawn failing ones"""
+        while True:
+            time.sleep(self.health_interval)
+
+            # Take out only currently idle workers, busy ones are checked on use
+            with self._idle_changed:
+                idle_workers, self.idle = self.idle, []
+
+            for worker in idle_workers:
+                try:
+                    if not worker.is_alive or worker.timed_out or worker.request('ping', timeout=5)['error']:
+                        worker.restart()
+                except Exception as e:
+                    self.logger.error(f"node.js worker health check: {e}")
+                finally:
+                    self._put(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> WorkerPool:
+    """Return process-wide WorkerPool, start node.js workers on first use"""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WorkerPool(size=getattr(settings, 'VITE_WORKERS', 4),
+                                   script=SCRIPT_PATH, logger=logger,
+                                   timeout=getattr(settings, 'VITE_WORKER_TIMEOUT', 60),
+                                   health_interval=getattr(settings, 'VITE_WORKER_HEALTH_INTERVAL', 30))
+                atexit.register(_pool.close)
+    return _pool
+
+
+_breaker = None
+
+
+def get_breaker() -> CircuitBreaker:
+    """Return process-wide circuit breaker of VITE node calls"""
+    global _breaker
+
+    if _breaker is None:
+        with _pool_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker('vite-node',
+                                          threshold=getattr(settings, 'VITE_BREAKER_THRESHOLD', 5),
+                                          reset_timeout=getattr(settings, 'VITE_BREAKER_RESET_TIMEOUT', 30))
+    return _breaker
+
+
+class AsyncNodeWorker(NodeWorker):
+    """NodeWorker driven by asyncio subprocess I/O, many requests can be
+    in-flight on one worker at the same time. Must be started with
+    `await worker.start()` inside the event loop which will use it.
+    """
+
+    def __init__(self, script: str, logger: object):
+        self.script = script
+        self.logger = logger
+        self.process = None
+        self.pending: dict = {}
+        self.timed_out = False
+        self._ids = itertools.count(1)
+        self._readers = []
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        self.pending = {}
+        self.timed_out = False
+        # Raise StreamReader line limit (64 KiB by default) for big frames
+        self.process = await asyncio.create_subprocess_exec(
+            'node', self.script, 'serve', stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, limit=2 ** 24)
+        self._readers = [asyncio.ensure_future(self._read_frames(self.process, self.pending)),
+                         asyncio.ensure_future(self._read_logs(self.process))]
+        self.logger.info(f"node.js async worker [{self.process.pid}] started")
+
+    async def stop(self):
+        if self.is_alive:
+            self.process.kill()
+            await self.process.wait()
+
+    async def restart(self):
+        self.logger.warning(f"node.js async worker [{self.process.pid}] not responding, respawning..")
+        await self.stop()
+        await self.start()
+
+    async def _read_logs(self, process):
+        async for line in process.stderr:
+            line = line.decode('utf-8', 'replace').strip()
+            if line: self.logger.info(f"node.js >> {line.lstrip('> ')}")
+
+    async def _read_frames(self, process, pending: dict):
+        async for line in process.stdout:
+            if not self._route_frame(line, process, pending):
+                break
+
+        self._release_pending(pending)
+
+    async def stream(self, command: str, timeout: float, **args):
+        """Async version of NodeWorker.stream()"""
+        request_id = next(self._ids)
+        frames = asyncio.Queue()
+        process, pending = self.process, self.pending
+        pending[request_id] = frames
+        line = json.dumps({'v': PROTOCOL_VERSION, 'id': request_id, 'command': command, 'args': args})
+
+        try:
+            process.stdin.write(line.encode('utf-8') + b'\n')
+            await process.stdin.drain()
+        except (OSError, ValueError) as e:
+            pending.pop(request_id, None)
+            yield {'type': 'result', 'error': 1, 'msg': f"node.js worker error: {e}", 'data': None}
+            return
+
+        deadline = time.monotonic() + timeout
+
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(frames.get(), max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    self.timed_out = True
+                    yield {'type': 'result', 'error': 1, 'msg': f"{command} timeout after {timeout}s", 'data': None}
+                    return
+
+                yield frame
+                if frame['type'] == 'result':
+                    return
+        finally:
+            pending.pop(request_id, None)
+
+    async def request(self, command: str, timeout: float, **args) -> dict:
+        """Async version of NodeWorker.request()"""
+        items = []
+
+        async for frame in self.stream(command, timeout, **args):
+            if frame['type'] == 'item':
+                items.append(frame['data'])
+            else:
+                return {'error': frame['error'], 'msg': frame['msg'],
+                        'data': items if items else frame['data']}
+
+
+class AsyncWorkerPool:
+    """WorkerPool for asyncio code (ASGI views). Requests are not waiting for
+    a free worker, they are multiplexed on the least busy AsyncNodeWorker,
+    commands of one wallet always on its own worker (see WALLET_COMMANDS).
+    One pool per event loop, see get_async_pool().
+    """
+
+    def __init__(self, size: int, script: str, logger: object, timeout: float = 60, health_interval: float = 30):
+        self.size = size
+        self.script = script
+        self.logger = logger
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.workers = [AsyncNodeWorker(script, logger) for _ in range(size)]
+        self.ready = asyncio.Event()
+        self._health = None
+
+    async def start(self):
+        await asyncio.gather(*[worker.start() for worker in self.workers])
+        self._health = asyncio.ensure_future(self._health_check())
+        self.ready.set()
+
+    def _worker(self, command: str, args: dict) -> AsyncNodeWorker:
+        index = wallet_worker(command, args, self.size)
+        if index is not None:
+            return self.workers[index]
+        return min(self.workers, key=lambda worker: len(worker.pending))
+
+    @staticmethod
+    async def _respawn(worker: AsyncNodeWorker):
+        """Restart dead worker or worker with a timed out request"""
+        if not worker.is_alive or worker.timed_out:
+            # Clear flag first, so concurrent requests do not restart it again
+            worker.timed_out = False
+            await worker.restart()
+
+    async def request(self, command: str, timeout: float = None, **args) -> dict:
+        """Hand command to its worker and return its response"""
+        worker = self._worker(command, args)
+        await self._respawn(worker)
+        return await worker.request(command, timeout or self.timeout, **args)
+
+    async def stream(self, command: str, timeout: float = None, **args):
+        """Hand command to its worker and yield its response frames"""
+        worker = self._worker(command, args)
+        await self._respawn(worker)
+
+        async for frame in worker.stream(command, timeout or self.timeout, **args):
+            yield frame
+
+    async def broadcast(self, command: str, timeout: float = None, **args) -> list:
+        """Send command to every worker and return list of their responses"""
+        return await asyncio.gather(*[worker.request(command, timeout or self.timeout, **args)
+                                      for worker in self.workers if worker.is_alive])
+
+    async def _health_check(self):
+        """Ping workers every `health_interval` seconds, respawn failing ones"""
+        while True:
+            await asyncio.sleep(self.health_interval)
+
+            for worker in self.workers:
+                try:
+                    if worker.timed_out:
+                        await self._respawn(worker)
+                    elif not worker.is_alive or (await worker.request('ping', timeout=5))['error']:
+                        await worker.restart()
+                except Exception as e:
+                    self.logger.error(f"node.js async worker health check: {e}")
+
+    async def close(self):
+        if self._health: self._health.cancel()
+        await asyncio.gather(*[worker.stop() for worker in self.workers])
+
+
+_async_pools = {}
+
+
+async def get_async_pool() -> AsyncWorkerPool:
+    """Return AsyncWorkerPool of the running event loop, start workers on first use.
+    Only for ASGI deployment (core.asgi, VITE_ASYNC_VIEWS) where the loop lives as long
+    as the process, pools of short-lived loops (async views under WSGI) would never close."""
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+
+    if pool is None:
+        pool = _async_pools[loop] = AsyncWorkerPool(
+            size=getattr(settings, 'VITE_WORKERS', 4), script=SCRIPT_PATH, logger=logger,
+            timeout=getattr(settings, 'VITE_WORKER_TIMEOUT', 60),
+            health_interval=getattr(settings, 'VITE_WORKER_HEALTH_INTERVAL', 30))
+        await pool.start()
+    else:
+        await pool.ready.wait()
+
+    return pool
+
+
+class AccountStateTracker:
+    """Last known height and block hash of custodial accounts, updated from
+    send and account results of this process. Send uses it as previous block
+    instead of fetching it from node. Other processes add blocks too, send built
+    on outdated state is refused by node (prevHash) and re-tried on fresh one.
+    Thread safe, one instance per process.
+    """
+
+    def __init__(self):
+        self.accounts: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, address: str):
+        """Return {'address', 'height', 'hash'} or None if unknown"""
+        with self._lock:
+            state = self.accounts.get(address)
+            return dict(state) if state else None
+
+    def update(self, state: dict):
+        """Save account state from send / account result"""
+        if not state or not state.get('address') or not state.get('hash'):
+            return
+
+        with self._lock:
+            self.accounts[state['address']] = {'address': state['address'],
+                                               'height': str(state['height']), 'hash': state['hash']}
+
+    def invalidate(self, address: str):
+        with self._lock:
+            self.accounts.pop(address, None)
+
+
+account_state = AccountStateTracker()
+
 
 class ViteConnector:
-    """Connect to VITE node and manage VITE blockchain API calls via NODE.JS scripts
+    """Connect to VITE node and manage VITE blockchain API calls via NODE.JS workers
     Possible status: running, finished, failed
-    :param logs_from_nodejs:  True
+    Connector logic is written once, as generators of worker I/O steps, which
+    ViteConnector runs with blocking calls and AsyncViteConnector awaits:
+    - ('run', command, timeout, args): api_handler.js call, step result is its response
+    - ('sleep', seconds): wait between retries
     :param balance_response: dict = {}
     :param update_response: dict = {}
     :param send_response: dict = {}
@@ -20,201 +593,348 @@ class ViteConnector:
     :param node_url:  node_url
     :param logger:  logger
     :param method:  method
+    :param deadline: Deadline of the HTTP request shared by all calls and retries
     """
     script = SCRIPT_PATH
 
-    def __init__(self, logger: object, method: str = 'http', node_url: str = None):
-        self.logs_from_nodejs = True
+    def __init__(self, logger: object, method: str = 'http', node_url: str = None, deadline: Deadline = None):
         self.balance_response: dict = {}
         self.update_response: dict = {}
         self.send_response: dict = {}
         self.node_url = node_url
-        self.last_log: str = ''
         self.logger = logger
         self.method = method
+        self.deadline = deadline
         self.status = 'running'
 
-    def _run_command(self, command) -> dict:
+    def _run_command(self, command: str, timeout: float = None, **args) -> dict:
         """
-        Run NodeJS scripts with subprocess.Popen(), parse stdout
+        Run api_handler.js command on warm node.js worker from the pool
         and return dictionary with script payload.
-        :param command: Full NodeJS command as list
+        :param command: api_handler.js command name
+        :param timeout: seconds for this single call, pool default if None
+        :param args: command arguments
         :return: dict,
         """
-        logs_list = []
+        return get_pool().request(command, timeout=timeout, **args)
 
-        # Run the command as subprocess and read output
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    def _drive(self, steps):
+        """
+        Run connector steps with blocking worker calls
+        :param steps: generator of worker I/O steps
+        :return: generator return value
+        """
+        result = None
 
-        # While process is running collect and filter logs
-        while True:
-            output = process.stdout.readline()
+        try:
+            while True:
+                step = steps.send(result)
 
-            if output == '' and process.poll() is not None:
-                # Process finished
-                break
-            if output.strip().startswith('>>'):
-                # Filter logs from NodeJS to self.logger
-                line = output.strip().replace('>>', 'node.js >>')
-                if self.logs_from_nodejs and self.last_log != line: self.logger.info(line)
-                self.last_log = line
-            elif output and not output.startswith((' >>', '>>')):
-                # Append parts of dictionary for return
-                logs_list.append(output)
-
-        # If process finished
-        if not process.poll():
-            try:
-                # Serialize stdout output and return dict
-                logs_list = [line.replace('null', 'None') for line in logs_list]
-                logs_list = [line.replace('true', 'True') for line in logs_list]
-                logs_list = [line.replace('false', 'False') for line in logs_list]
-                logs_json = ''.join([line.replace('\n', '') for line in logs_list])
-                logs_dict = eval(logs_json)
-                return logs_dict
-
-            except Exception as e:
-                return {'error': 1, 'msg': e, 'data': None}
-
-    def _balance(self, **kwargs) -> dict:
-        try_counter = 10
-        args = ('address', 'mnemonics', 'address_id')
-
-        if args[0] in kwargs:
-            command = ['node', self.script, 'balance', '-a', kwargs['address']]
-
-        elif all(arg in args[1:] for arg in kwargs):
-            kwargs['address_id'] = str(kwargs['address_id'])
-            command = ['node', self.script, 'balance', '-a', '0',
-                       '-m', kwargs['mnemonics'], '-i', kwargs['address_id']]
-        else:
-            return {'error': 1, 'msg': f'missing args, any of {args}', 'data': None}
+                if step[0] == 'sleep':
+                    time.sleep(step[1])
+                    result = None
+                else:
+                    _, command, timeout, args = step
+                    result = self._run_command(command, timeout=timeout, **args)
+        except StopIteration as stop:
+            return stop.value
+
+    @staticmethod
+    def _run(command: str, timeout: float = None, **args):
+        """Step of single api_handler.js call, return its response"""
+        return (yield 'run', command, timeout, args)
+
+    def _call(self, command: str, policy: RetryPolicy, **args):
+        """Steps of command run with retry policy, request deadline and VITE node circuit breaker"""
+        return (yield from policy.steps(lambda timeout: self._run(command, timeout, **args), name=command,
+                                        deadline=self.deadline, breaker=get_breaker(), logger=self.logger))
+
+    @staticmethod
+    def _balance_command(**kwargs):
+        """Return balance command args or None when required args are missing"""
+        if 'address' in kwargs:
+            return {'address': kwargs['address']}
+        elif 'mnemonics' in kwargs and 'address_id' in kwargs:
+            return {'mnemonics': kwargs['mnemonics'], 'address_id': int(kwargs['address_id'])}
+
+    @staticmethod
+    def _send_command(**kwargs):
+        args = ('mnemonics', 'address_id', 'to_address', 'token_id', 'amount')
 
-        response = self._run_command(command)
+        if all(arg in kwargs for arg in args):
+            return {'mnemonics': kwargs['mnemonics'],
+                    'address_id': int(kwargs['address_id']),
+                    'to_address': kwargs['to_address'],
+                    'token_id': kwargs['token_id'],
+                    'amount': str(kwargs['amount'])}
+
+    @staticmethod
+    def _update_result(response: dict) -> dict:
+        if response['error'] and 'no pending' in response['msg'].lower():
+            return {'error': 0, 'msg': "No pending transactions", 'data': None}
+        return response
 
-        while response['error'] and try_counter:
-            try_counter -= 1
+    @staticmethod
+    def _sent_block(previous: dict, current: dict, **kwargs):
+        """
+        Compare account state from before failed send with current one.
+        :return: None if unknown, False if not sent, True if latest block is this send
+        """
+        if not previous or not current or not previous.get('hash'):
+            return None
+
+        height, previous_height = int(current['height']), int(previous['height'])
+
+        if height == previous_height and current['hash'] == previous['hash']:
+            return False
+
+        # Send could only be added right on top of previous block, when more blocks
+        # are on top of it, it may be hidden under them
+        if height != previous_height + 1 or current.get('previousHash') != previous['hash']:
+            return None
+
+        # Next block of the account is this send, or it was refused for e.g. a receive
+        return (str(current.get('blockType')) == SEND_BLOCK_TYPE
+                and current.get('toAddress') == kwargs['to_address']
+                and current.get('tokenId') == kwargs['token_id']
+                and str(current.get('amount')) == str(kwargs['amount']))
+
+    @staticmethod
+    def _rejected(response: dict) -> bool:
+        """Node refused send block for its previous block, nothing was sent"""
+        msg = str(response['msg']).lower()
+        return bool(response['error']) and any(error in msg for error in SEND_REJECTED_ERRORS)
+
+    def _finish(self, response: dict) -> dict:
+        self.status = 'failed' if response['error'] else 'finished'
+        if self.logger:
+            self.logger.info(f"{self.status} |  {response['msg']}")
+        return response
 
-            if 'timeout' in response['msg']:
-                self.logger.warning(f"{response['msg']} re-try balance ({try_counter} left)")
-                self._run_command(command)
-            else:
-                return response
+    def _balance(self, **kwargs):
+        command = self._balance_command(**kwargs)
 
-        if not try_counter:
-            response = {'error': 1, 'msg': "too many getBalance fail attempts", 'data': None}
+        if not command:
+            response = error_response(f"missing args, any of ('address', 'mnemonics', 'address_id')")
+        else:
+            response = yield from self._call('balance', BALANCE_RETRY, **command)
 
-        return response
+        self.balance_response = self._finish(response)
+        return self.balance_response
 
     def create_wallet(self):
-        command = ['node', self.script, 'create']
-        return self._run_command(command)
+        return self._drive(self._call('create', CREATE_RETRY))
+
+    def transactions(self, address: str, page_index: int = 0, page_size: int = 10):
+        """
+        Yield address transactions one by one as node.js worker streams them,
+        without collecting whole list first.
+        :return: generator of transaction dicts
+        """
+        for frame in get_pool().stream('transactions', address=address,
+                                       page_index=page_index, page_size=page_size):
+            if frame['type'] == 'item':
+                yield frame['data']
+            elif frame['error']:
+                self.status = 'failed'
+                self.logger.warning(f"{self.status} |  {frame['msg']}")
+            else:
+                self.status = 'finished'
 
     def balance(self, **kwargs) -> dict:
-        self.balance_response = self._balance(**kwargs)
+        return self._drive(self._balance(**kwargs))
 
-        if self.balance_response['error']:
-            self.status = 'failed'
-        else:
-            self.status = 'finished'
+    @staticmethod
+    def _balances_response(response: dict) -> dict:
+        """Turn list of streamed {address, balance, unreceived} items into {address: balance_info}"""
+        if response['error']:
+            return response
 
-        self.logger.info(f"{self.status} |  {self.balance_response['msg']}")
+        balances = {item.pop('address'): item for item in response['data']}
+        return {'error': 0, 'msg': 'success', 'data': balances}
+
+    @staticmethod
+    def _balances_timeout(timeout: float, pool_timeout: float, addresses: list, chunk_size: int):
+        """Give big batches more time than single calls, within request deadline"""
+        batch_timeout = max(pool_timeout, len(addresses) / chunk_size * 5)
+        return min(timeout, batch_timeout) if timeout else batch_timeout
+
+    def _balance_many(self, addresses: list, chunk_size: int):
+        addresses = list(dict.fromkeys(addresses))
+        pool_timeout = getattr(settings, 'VITE_WORKER_TIMEOUT', 60)
+
+        def attempt(timeout):
+            timeout = self._balances_timeout(timeout, pool_timeout, addresses, chunk_size)
+            return self._run('balances', timeout, addresses=addresses, chunk_size=chunk_size)
+
+        response = yield from BALANCES_RETRY.steps(attempt, name='balances', deadline=self.deadline,
+                                                   breaker=get_breaker(), logger=self.logger)
+
+        self.balance_response = self._balances_response(response)
+        self.status = 'failed' if self.balance_response['error'] else 'finished'
+        self.logger.info(f"{self.status} |  balance_many({len(addresses)}) {self.balance_response['msg']}")
         return self.balance_response
 
-    def send(self, **kwargs) -> dict:
-        try_counter = 3
-        args = ('mnemonics', 'address_id', 'to_address', 'token_id', 'amount')
+    def balance_many(self, addresses: list, chunk_size: int = 25) -> dict:
+        """
+        Get balances of many addresses with batched JSON-RPC calls in one worker request,
+        instead of one balance() round trip per address.
+        :param addresses: list of VITE addresses
+        :param chunk_size: number of addresses in one node batch call
+        :return: dict, data is {address: {'balance': ..., 'unreceived': ...}}
+        """
+        return self._drive(self._balance_many(addresses, chunk_size))
 
-        # Get sender's last transaction ID, later will be
-        # used to confirm that transaction was sent successfully.
-        last_tx_id = self._get_last_tx_id(**kwargs)
-
-        if all(arg in args for arg in kwargs):
-            kwargs['address_id'] = str(kwargs['address_id'])
-            kwargs['amount'] = str(kwargs['amount'])
-            command = ['node', self.script, 'send',
-                       '-m', kwargs['mnemonics'],
-                       '-i', kwargs['address_id'],
-                       '-d', kwargs['to_address'],
-                       '-t', kwargs['token_id'],
-                       '-a', kwargs['amount']]
-
-            self.send_response = self._run_command(command)
-
-            while self.send_response['error'] and try_counter:
-                if 'timeout' in self.send_response['msg'].lower():
-                    try_counter -= 1
-                    time.sleep(1)
-                    current_tx_id = self._get_last_tx_id(**kwargs)
-
-                    while not current_tx_id:
-                        self.logger.critical(f"problem with getting balance, re-try...")
-                        current_tx_id = self._get_last_tx_id(**kwargs)
-
-                    if current_tx_id == last_tx_id:
-                        self.logger.warning(f"{self.send_response['msg']}, re-try send ({try_counter} left)..")
-                        time.sleep(1)
-                        self.send_response = self._run_command(command)
-
-                    else:
-                        self.logger.info(f"New TX last ID [{current_tx_id}], finishing process..")
-                        break
-                else:
-                    break
+    def _account(self, **kwargs):
+        """Fetch height, hash and latest block details of the account from node, save it to account_state"""
+        response = yield from self._call('account', BALANCE_RETRY, **self._balance_command(**kwargs))
 
-            if try_counter < 1:
-                self.send_response = {'error': 1, 'msg': "Too many failed attempts", 'data': None}
-                self.status = 'failed'
-            elif self.send_response['error']:
-                self.status = 'failed'
-            else:
-                self.status = 'finished'
+        if response['error']:
+            self.logger.warning(f"account state: {response['msg']}")
+            account_state.invalidate(kwargs.get('address'))
+            return None
+
+        account_state.update(response['data'])
+        return response['data']
+
+    def _confirm_send(self, previous: dict, current: dict, **kwargs):
+        """
+        Check failed send against current account state.
+        :return: None if send can be re-tried, else final send response
+        """
+        sent = self._sent_block(previous, current, **kwargs)
+
+        if sent is None:
+            return error_response("send failed, transaction state unknown")
+        if sent:
+            self.logger.info(f"New TX found on {current['address']} [{current['height']}], finishing process..")
+            return {'error': 0, 'msg': 'send success', 'data': current}
+
+    @staticmethod
+    def _sent(response: dict, **kwargs) -> dict:
+        """Keep account_state in sync with send result"""
+        if response['error']:
+            account_state.invalidate(kwargs.get('address'))
+        else:
+            account_state.update(response['data'])
+        return response
 
-            self.logger.info(f"{self.status} |  {self.send_response['msg']}")
+    def _send(self, **kwargs):
+        command = self._send_command(**kwargs)
+
+        if not command:
+            self.send_response = self._finish(error_response('missing send args'))
             return self.send_response
 
+        # Previous block known from last send / account call of this process,
+        # read from node only for unknown address
+        previous = account_state.get(kwargs.get('address')) or (yield from self._account(**kwargs))
+        last = None
+
+        def attempt(timeout):
+            nonlocal previous, last
+
+            # Failed attempt, refused block was not added, any other error needs a check
+            if last is not None:
+                current = yield from self._account(**kwargs)
+                confirmed = None if self._rejected(last) else self._confirm_send(previous, current, **kwargs)
+                if confirmed:
+                    return confirmed
+                previous = current
+
+            last = self._sent((yield from self._run('send', timeout, previous=previous, **command)), **kwargs)
+            return last
+
+        response = yield from SEND_RETRY.steps(attempt, name='send', deadline=self.deadline,
+                                               breaker=get_breaker(), logger=self.logger)
+
+        self.send_response = self._finish(response)
+        return self.send_response
+
+    def send(self, **kwargs) -> dict:
+        """
+        Send transaction, call it holding the sender wallet lock (core.locks),
+        so no other send is built on the same previous block meanwhile.
+        Optional `address` of sender lets it use account_state as previous
+        block instead of asking node for it.
+        """
+        return self._drive(self._send(**kwargs))
+
+    def _update(self, **kwargs):
+        if 'mnemonics' not in kwargs or 'address_id' not in kwargs:
+            self.update_response = self._finish(error_response("missing args, ('mnemonics', 'address_id')"))
+            return self.update_response
+
+        command = {'mnemonics': kwargs['mnemonics'], 'address_id': int(kwargs['address_id'])}
+        response = yield from self._call('update', UPDATE_RETRY, **command)
+
+        # Received blocks moved the account on
+        if not response['error'] and response['data']:
+            account_state.invalidate(response['data'].get('address'))
+
+        self.update_response = self._finish(self._update_result(response))
+        return self.update_response
+
     def update(self, **kwargs) -> dict:
-        try_counter = 5
-        args = ('mnemonics', 'address_id')
-
-        if all(arg in args for arg in kwargs):
-            kwargs['address_id'] = str(kwargs['address_id'])
-            command = ['node', self.script, 'update', '-m', kwargs['mnemonics'], '-i', kwargs['address_id']]
-            self.update_response = self._run_command(command)
-
-            while self.update_response['error'] and try_counter:
-                try_counter -= 1
-
-                if 'timeout' in self.update_response['msg'].lower():
-                    self.logger.info(f"{self.update_response['msg']}, re-try update ({try_counter} left)")
-                    self._run_command(command)
-                elif 'no pending' in self.update_response['msg'].lower():
-                    self.update_response = {'error': 0, 'msg': "No pending transactions", 'data': None}
-                    break
-                else:
-                    break
+        return self._drive(self._update(**kwargs))
 
-            if not try_counter:
-                self.update_response = {'error': 1, 'msg': "Too many failed attempts", 'data': None}
-                self.status = 'failed'
+    @staticmethod
+    def _purge_response(responses: list) -> dict:
+        failed = [response['msg'] for response in responses if response['error']]
+        purged = sum(response['data']['purged'] for response in responses if not response['error'])
+
+        if failed:
+            return error_response(f"purge_keys failed on {len(failed)} workers: {failed[0]}")
+        return {'error': 0, 'msg': f"purged {purged} keys", 'data': [response['data'] for response in responses]}
+
+    def purge_keys(self, address: str = None) -> dict:
+        """
+        Drop cached derived key pairs in all node.js workers,
+        e.g. after wallet mnemonics were changed.
+        :param address: purge only key pairs of this address, all if None
+        """
+        return self._purge_response(get_pool().broadcast('purge_keys', address=address))
 
-            elif self.update_response['error']:
-                self.status = 'failed'
 
+class AsyncViteConnector(ViteConnector):
+    """ViteConnector with the same balance/send/update/create_wallet surface
+    for asyncio code, connector steps are awaited on AsyncWorkerPool without
+    blocking the event loop or a thread, so public methods return awaitables."""
+
+    async def _run_command(self, command: str, timeout: float = None, **args) -> dict:
+        pool = await get_async_pool()
+        return await pool.request(command, timeout=timeout, **args)
+
+    async def _drive(self, steps):
+        """Async version of ViteConnector._drive()"""
+        result = None
+
+        try:
+            while True:
+                step = steps.send(result)
+
+                if step[0] == 'sleep':
+                    await asyncio.sleep(step[1])
+                    result = None
+                else:
+                    _, command, timeout, args = step
+                    result = await self._run_command(command, timeout=timeout, **args)
+        except StopIteration as stop:
+            return stop.value
+
+    async def transactions(self, address: str, page_index: int = 0, page_size: int = 10):
+        pool = await get_async_pool()
+
+        async for frame in pool.stream('transactions', address=address,
+                                       page_index=page_index, page_size=page_size):
+            if frame['type'] == 'item':
+                yield frame['data']
+            elif frame['error']:
+                self.status = 'failed'
+                self.logger.warning(f"{self.status} |  {frame['msg']}")
             else:
                 self.status = 'finished'
 
-        self.logger.info(f"{self.status} |  {self.update_response['msg']}")
-        return self.update_response
-
-    def _get_last_tx_id(self, **kwargs) -> int:
-        kwargs = {'mnemonics': kwargs['mnemonics'],
-                  'address_id': kwargs['address_id']}
-        balance = self._balance(**kwargs)
-
-        if not balance['error']:
-            try:
-                return balance['data']['balance']['blockCount']
-            except Exception as e:
-                self.logger.warning(f"_get_last_tx_id(): {e}")
-        return 0
\ No newline at end of file
+    async def purge_keys(self, address: str = None) -> dict:
+        pool = await get_async_pool()
+        return self._purge_response(await pool.broadcast('purge_keys', address=address))
@@ -1,5 +1,7 @@
 import {
     getBalance,
+    getBalances,
+    getAccountState,
     createWallet,
     sendTransaction,
     getTransactions,
@@ -8,13 +10,20 @@ import {
 
 import {
     logAndExit,
+    logsToStderr,
+    writeFrame,
     DEBUG,
     sleep,
     ReceiveProcess
 } from './tools.js'
 
+import {keys} from './keys.js'
+import {powCache} from './pow.js'
+import {getNodes} from './provider.js'
+
 import _yargs from 'yargs';
 import { hideBin } from 'yargs/helpers';
+import readline from 'readline';
 
 
 /*
@@ -31,6 +40,7 @@ COMMANDS & ARGS:
 - update            -m <mnemonics> -i <address_derivation_id>
 - send              -m <mnemonics> -i <address_derivation_id>
                     -d <destination_address> -t <tokenId> -a <amount>
+- serve             no args, long-lived worker (see serve() below)
 
 */
 
@@ -39,6 +49,9 @@ COMMANDS & ARGS:
 const yargs = _yargs(hideBin(process.argv));
 const args = await yargs.argv
 
+// stdout carries only JSON frames, logs go to stderr
+if (!DEBUG) { logsToStderr() }
+
 
 // Recognize command and run proper function withs args
 switch (args._[0]) {
@@ -62,6 +75,10 @@ switch (args._[0]) {
         await send(args.m, args.i, args.d, args.t, args.a);
         break
 
+    case 'serve':
+        await serve()
+        break
+
     default:
         logAndExit(1, 'invalid command')
 }
@@ -135,13 +152,139 @@ export async function receive(mnemonics, address_id) {
             return receiveTransactions(mnemonics, address_id)
         } else {
             await receiveTransactions(mnemonics, address_id, manager, 1000)
-
-            // Keep process alive until receiving is finished or error appears
-            while (manager.status !== 'success') {
-                console.log(">> " + manager.msg)
-                await sleep(1000)
-            }
+            await waitForReceive(manager)
             logAndExit(manager.error, manager.msg, manager.data)
         }
     } catch (error) {logAndExit(1, error)}
 }
+
+
+// Keep caller waiting until receiving is finished or error appears
+async function waitForReceive(manager, timeout=null) {
+    const started = Date.now()
+
+    while (manager.status !== 'success') {
+        if (timeout && Date.now() - started > timeout) { throw 'receive timeout' }
+        console.log(">> " + manager.msg)
+        await sleep(1000)
+    }
+    return manager
+}
+
+
+/*  ####################
+    ### WORKER MODE  ###
+    ####################
+
+Long-lived worker used by the Django ViteConnector pool, started with:
+node <this_file_path> serve
+
+Reads one JSON request per line from stdin:
+    {"id": 1, "command": "balance", "args": {"address": "vite_..."}}
+
+Writes one JSON frame per line to stdout, every frame carries protocol
+version "v" and request "id":
+    {"v": 1, "type": "ready", "id": null}                   once, on start
+    {"v": 1, "type": "item", "id": 1, "data": {...}}        streamed list element
+    {"v": 1, "type": "result", "id": 1, "error": 0, "msg": "...", "data": {...}}
+
+`>>` log lines are written to stderr. Requests are handled concurrently,
+frames are matched with requests by "id".
+*/
+
+// Map worker commands to Vite API calls, each returns [msg, data] or throws,
+// list responses are streamed element by element with emit(item)
+const handlers = {
+    ping: async () => ['pong', null],
+
+    nodes: async () => ['nodes stats', getNodes().stats()],
+
+    create: async () => ['create success', createWallet()],
+
+    keys: async () => ['keys stats', keys.stats()],
+
+    pow: async () => ['pow stats', powCache.stats()],
+
+    purge_keys: async (a) => {
+        const purged = keys.purge(a.address)
+        return [`purged ${purged} keys`, {purged: purged, ...keys.stats()}]
+    },
+
+    balance: async (a) => ['balance success',
+        await getBalance(a.address, a.mnemonics, a.address_id, 800)],
+
+    balances: async (a, emit) => {
+        await getBalances(a.addresses || [], (address, balance) => emit({address: address, ...balance}),
+            a.chunk_size || 25, a.concurrency || 4)
+        return ['balances success', null]
+    },
+
+    transactions: async (a, emit) => {
+        const txs = await getTransactions(a.address, a.page_index || 0, a.page_size || 10)
+        for (const tx of txs || []) { emit(tx) }
+        return ['txs success', null]
+    },
+
+    send: async (a) => {
+        const result = await sendTransaction(a.mnemonics, a.address_id, a.to_address,
+            a.token_id, a.amount.toString(), a.timeout || 5000, a.previous)
+        console.log(">> sending " + (parseInt(a.amount) / 10 ** 8) + " completed")
+        return ['transaction success', result]
+    },
+
+    update: async (a) => {
+        const manager = new ReceiveProcess()
+        await receiveTransactions(a.mnemonics, a.address_id, manager, 1000)
+        await waitForReceive(manager, a.timeout || 60000)
+        if (manager.error) { throw manager.msg }
+
+        // Address lets caller drop its account state, received blocks moved it on
+        const {address} = keys.get(a.mnemonics, a.address_id)
+        return [manager.msg, {...manager.data, address: address}]
+    },
+
+    account: async (a) => ['account success', await getAccountState(a.address, a.mnemonics, a.address_id)],
+}
+
+
+// Run single worker request and always finish it with a result frame
+async function handle(request) {
+    const id = request.id
+    const handler = handlers[request.command]
+    if (!handler) { return writeFrame({id: id, type: 'result', error: 1, msg: 'invalid command', data: null}) }
+
+    let count = 0
+    const emit = (item) => {
+        count++
+        writeFrame({id: id, type: 'item', data: item})
+    }
+
+    try {
+        const [msg, data] = await handler(request.args || {}, emit)
+        writeFrame({id: id, type: 'result', error: 0, msg: `${msg}`, data: data, count: count})
+    } catch (error) {
+        writeFrame({id: id, type: 'result', error: 1, msg: `${error}`, data: null, count: count})
+    }
+}
+
+
+// Serve requests from stdin until parent process closes the pipe
+export async function serve() {
+    const lines = readline.createInterface({input: process.stdin, terminal: false})
+
+    lines.on('line', (line) => {
+        if (!line.trim()) { return }
+        let request
+
+        try { request = JSON.parse(line) }
+        catch (error) {
+            writeFrame({id: null, type: 'result', error: 1, msg: 'invalid request', data: null})
+            return
+        }
+
+        handle(request)
+    })
+
+    lines.on('close', () => process.exit(0))
+    writeFrame({id: null, type: 'ready'})
+}
\ No newline at end of file
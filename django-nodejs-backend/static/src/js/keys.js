@@ -0,0 +1,75 @@
+import crypto from 'crypto';
+import vitejs_pkg from '@vite/vitejs';
+
+const { wallet } = vitejs_pkg;
+
+
+// Max number of cached key pairs and their time to live in ms,
+// override with VITE_KEY_CACHE_SIZE / VITE_KEY_CACHE_TTL environment variables
+const MAX_KEYS = +(process.env.VITE_KEY_CACHE_SIZE || 1000)
+const KEY_TTL = +(process.env.VITE_KEY_CACHE_TTL || 15 * 60 * 1000)
+
+
+// LRU cache of derived wallet key pairs, worker lives long and the same
+// sender wallets are used over and over, so BIP39 seed (PBKDF2) and ed25519
+// derivation is done once per wallet instead of once per call.
+// Mnemonics are not stored, entries are keyed by their sha256 hash and address_id.
+// Sends and updates of a wallet always come to the same worker of a pool.
+class KeyCache {
+    constructor(size, ttl) {
+        this.size = size
+        this.ttl = ttl
+        this.keys = new Map()   // insertion order = LRU order
+        this.hits = 0
+        this.misses = 0
+    }
+
+    static key(mnemonics, address_id) {
+        return crypto.createHash('sha256').update(`${mnemonics}`).digest('hex') + ':' + address_id
+    }
+
+    // Return {address, privateKey} for mnemonics and address_id
+    get(mnemonics, address_id=0) {
+        const key = KeyCache.key(mnemonics, address_id)
+        const entry = this.keys.get(key)
+
+        if (entry) {
+            this.keys.delete(key)
+
+            if (entry.expires > Date.now()) {
+                this.keys.set(key, entry)
+                this.hits++
+                return entry.keyPair
+            }
+        }
+
+        this.misses++
+        const {address, privateKey} = wallet.getWallet(mnemonics).deriveAddress(address_id)
+        const keyPair = Object.freeze({address, privateKey})
+
+        this.keys.set(key, {keyPair: keyPair, expires: Date.now() + this.ttl})
+        while (this.keys.size > this.size) { this.keys.delete(this.keys.keys().next().value) }
+
+        return keyPair
+    }
+
+    // Remove key pairs of given address or all of them, return number removed
+    purge(address=null) {
+        const before = this.keys.size
+
+        if (!address) { this.keys.clear() }
+        else {
+            for (const [key, entry] of this.keys) {
+                if (entry.keyPair.address === address) { this.keys.delete(key) }
+            }
+        }
+        return before - this.keys.size
+    }
+
+    stats() {
+        return {size: this.keys.size, hits: this.hits, misses: this.misses}
+    }
+}
+
+
+export const keys = new KeyCache(MAX_KEYS, KEY_TTL)
@@ -0,0 +1,111 @@
+import vitejs_pkg from '@vite/vitejs';
+import {log} from './tools.js'
+
+const { utils, wallet } = vitejs_pkg;
+
+
+// How long pre-computed PoW stays usable in ms,
+// override with VITE_POW_CACHE_TTL environment variable
+const POW_TTL = +(process.env.VITE_POW_CACHE_TTL || 10 * 60 * 1000)
+
+// Send block type, used for pre-warming next block of the same wallet
+const BLOCK_TYPE_SEND = 2
+
+
+// --- GET POW FOR ACCOUNT BLOCK --- \\
+// :return: {difficulty, nonce}, difficulty is null when account has enough quota
+export async function computePoW(provider, block) {
+    const {difficulty} = await provider.request('ledger_getPoWDifficulty', {
+        address: block.address,
+        previousHash: block.previousHash,
+        blockType: block.blockType,
+        toAddress: block.toAddress,
+        data: block.data
+    }).catch(e => {throw e.error.message});
+
+    // If difficulty is null, it indicates the account has enough quota to
+    // send the transaction. There is no need to do PoW.
+    if (!difficulty) { return {difficulty: null, nonce: null} }
+
+    // Call GVite-RPC API to calculate nonce from difficulty
+    const getNonceHashBuffer = Buffer.from(block.originalAddress + block.previousHash, 'hex');
+    const getNonceHash = utils.blake2bHex(getNonceHashBuffer, null, 32);
+    const nonce = await provider.request('util_getPoWNonce', difficulty, getNonceHash
+    ).catch(e => {throw e.error.message})
+
+    return {difficulty, nonce}
+}
+
+
+// PoW computed in background for the next send block of hot sender wallets,
+// right after their previous send. Entry is valid only for the previousHash
+// it was computed for, any other account height drops it.
+// Cache lives in one worker, pools hand all sends of a wallet to the same
+// worker (WALLET_COMMANDS in core/vite_connector.py).
+class PowCache {
+    constructor(ttl) {
+        this.ttl = ttl
+        this.entries = new Map()   // address -> {previousHash, pow (promise), expires}
+        this.hits = 0
+        this.misses = 0
+        this.invalidated = 0
+    }
+
+    // Start computing PoW for block following `lastBlock` {address, hash, toAddress}
+    prewarm(provider, lastBlock) {
+        const block = {
+            address: lastBlock.address,
+            originalAddress: wallet.getOriginalAddressFromAddress(lastBlock.address),
+            previousHash: lastBlock.hash,
+            blockType: BLOCK_TYPE_SEND,
+            toAddress: lastBlock.toAddress,
+            data: null,
+        }
+        const pow = computePoW(provider, block)
+        const entry = {previousHash: block.previousHash, pow: pow, expires: Date.now() + this.ttl}
+
+        this.entries.set(block.address, entry)
+        pow.catch((error) => {
+            log(`PoW pre-warm failed for ${block.address}: ${error}`)
+            if (this.entries.get(block.address) === entry) { this.entries.delete(block.address) }
+        })
+    }
+
+    // Return pre-computed {difficulty, nonce} for this block or null, entries are single use
+    async take(block) {
+        const entry = this.entries.get(block.address)
+        this.entries.delete(block.address)
+
+        if (!entry || entry.expires < Date.now() || block.data) {
+            this.misses++
+            return null
+        }
+
+        // Account height changed since pre-warm (send from other place, receive)
+        if (entry.previousHash !== block.previousHash) {
+            this.invalidated++
+            return null
+        }
+
+        try {
+            const pow = await entry.pow
+            this.hits++
+            return pow
+        } catch (error) {
+            this.misses++
+            return null
+        }
+    }
+
+    purge(address=null) {
+        if (!address) { this.entries.clear() }
+        else { this.entries.delete(address) }
+    }
+
+    stats() {
+        return {size: this.entries.size, hits: this.hits, misses: this.misses, invalidated: this.invalidated}
+    }
+}
+
+
+export const powCache = new PowCache(POW_TTL)
@@ -2,32 +2,149 @@ import http_pkg from "@vite/vitejs-http";
 import vitejs_pkg from '@vite/vitejs';
 import ws from "@vite/vitejs-ws";
 
+import {log, method} from './tools.js'
+
 const { WS_RPC } = ws;
 const { HTTP_RPC } = http_pkg;
 const { ViteAPI } = vitejs_pkg;
 
 
-export function connect(method, timeout=5000) {
-    let service
+// Ranked VITE node endpoints, first is preferred until stats say otherwise.
+// Override with comma separated VITE_NODES environment variable.
+const NODES = {
+    http: ["https://node.vite.net/gvite/"],
+    wss: ["wss://node-vite.thomiz.dev/ws", "wss://node.vite.net/gvite/ws"],
+}
+
+// Weight of the newest sample in latency / error rate moving averages
+const ALPHA = 0.2
+
+
+// Single long-lived node connection with its latency and error statistics
+class Endpoint {
+    constructor(url, method, timeout, rank) {
+        this.url = url
+        this.latency = 100 * rank   // keep configured order until measured
+        this.errorRate = 0
+        this.requests = 0
 
-    if (method === 'http') {
-        service = new HTTP_RPC("https://node.vite.net/gvite/", timeout);
-    } else {
-        service = new WS_RPC("wss://node-vite.thomiz.dev/ws", timeout);
+        const service = method === 'http'
+            ? new HTTP_RPC(url, timeout)
+            : new WS_RPC(url, timeout, {retryTimes: 10, retryInterval: 2000})
+
+        this.provider = new ViteAPI(service, () => {
+            log(`Connected to VITE NODE: ${url}`)
+        });
     }
 
-    let provider = new ViteAPI(service, () => {
-        if (method !== 'http') {
-            if (!provider.isConnected) {
-                log(`Connected to VITE NODE: ${provider.isConnected}`)
-            }
+    // Lower is better, errors make endpoint look slower
+    get score() {
+        return this.latency * (1 + 4 * this.errorRate)
+    }
+
+    record(started, failed) {
+        const elapsed = Date.now() - started
+        this.requests++
+        this.latency = this.requests === 1 ? elapsed : ALPHA * elapsed + (1 - ALPHA) * this.latency
+        this.errorRate = ALPHA * (failed ? 1 : 0) + (1 - ALPHA) * this.errorRate
+    }
+
+    // Run fn(provider) and record its latency and result
+    async run(fn) {
+        const started = Date.now()
+        try {
+            const result = await fn(this.provider)
+            this.record(started, false)
+            return result
+        } catch (error) {
+            this.record(started, true)
+            throw error
         }
-    });
+    }
+}
+
+
+// Shared pool of node endpoints, JSON-RPC requests are multiplexed
+// over one connection per endpoint for the lifetime of the worker
+export class NodePool {
+    constructor(method, urls, timeout=5000, hedgeDelay=300) {
+        this.hedgeDelay = hedgeDelay
+        this.endpoints = urls.map((url, rank) => new Endpoint(url, method, timeout, rank))
+    }
+
+    ranked() {
+        return [...this.endpoints].sort((a, b) => a.score - b.score)
+    }
 
-    if (method === 'http') {
-        if (!provider.isConnected) {
-            log(`Connected to VITE NODE: ${provider.isConnected}`)
+    // Provider of the best endpoint, for vite.js objects that need one
+    // (account blocks, ReceiveAccountBlockTask)
+    primary() {
+        return this.ranked()[0].provider
+    }
+
+    // Run fn(provider) on the best endpoint only, for writes which
+    // must not be repeated on other nodes (sending account blocks)
+    write(fn) {
+        return this.ranked()[0].run(fn)
+    }
+
+    // Run fn(provider) on the best endpoint, fail over to next ones on error
+    async call(fn) {
+        let lastError
+        for (const endpoint of this.ranked()) {
+            try { return await endpoint.run(fn) }
+            catch (error) {
+                lastError = error
+                log(`VITE NODE ${endpoint.url} failed, trying next one`)
+            }
         }
+        throw lastError
+    }
+
+    // Hedged read: if the best endpoint does not answer within its usual
+    // latency, ask the second one too and take the first successful answer
+    read(fn) {
+        const [first, second] = this.ranked()
+        if (!second) { return first.run(fn) }
+
+        return new Promise((resolve, reject) => {
+            let pending = 1
+            let hedged = false
+
+            const done = (error) => { if (--pending === 0 && hedged) { reject(error) } }
+            const hedge = () => {
+                if (hedged) { return }
+                hedged = true
+                pending++
+                second.run(fn).then(resolve, done)
+            }
+
+            const timer = setTimeout(hedge, Math.max(this.hedgeDelay, 2 * first.latency))
+            first.run(fn).then((result) => {
+                clearTimeout(timer)
+                resolve(result)
+            }, (error) => {
+                clearTimeout(timer)
+                hedge()
+                done(error)
+            })
+        })
+    }
+
+    stats() {
+        return this.ranked().map(e => ({url: e.url, latency: Math.round(e.latency),
+                                         errorRate: e.errorRate, requests: e.requests}))
+    }
+}
+
+
+let nodes = null
+
+// Return worker-wide NodePool, created on first use
+export function getNodes(timeout=5000) {
+    if (!nodes) {
+        const urls = process.env.VITE_NODES ? process.env.VITE_NODES.split(',') : NODES[method === 'http' ? 'http' : 'wss']
+        nodes = new NodePool(method, urls, timeout)
     }
-    return provider
+    return nodes
 }
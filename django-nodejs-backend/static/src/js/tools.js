@@ -1,6 +1,9 @@
 export const DEBUG = false
 export const method = 'wss'
 
+// Version of the stdout frame format, checked by core.vite_connector
+export const PROTOCOL_VERSION = 1
+
 // --- Wrap function with timer and return either
 // --- success function response before timout or null
 export async function withTimeout(func, args = [], timeout = 2000) {
@@ -33,17 +36,29 @@ export const ReceiveProcess = class {
 }
 
 
-// Print nested objects to stdout and exit process
+// Write single protocol frame as one JSON line to stdout
+// frame types: 'ready', 'item' (streamed data element), 'result' (final response)
+export function writeFrame(frame) {
+    process.stdout.write(JSON.stringify({v: PROTOCOL_VERSION, ...frame}) + '\n')
+}
+
+
+// Print result frame to stdout and exit process
 export function  logAndExit(error, msg, data=null) {
     if (!DEBUG) {
-        console.log(JSON.stringify(
-            {error: error, msg: `${msg}`, data: data}, null, 2));
+        writeFrame({id: null, type: 'result', error: error, msg: `${msg}`, data: data})
         process.exit(0);
     } else {
         console.log(msg)
     }
 }
 
+
+// Move console.log() output (`>>` lines) to stderr, keep stdout for frames only
+export function logsToStderr() {
+    console.log = (...args) => process.stderr.write(args.join(' ') + '\n')
+}
+
 // ASYNC sleep function
 export function sleep(ms) {
     return new Promise(resolve => setTimeout(resolve, ms));
@@ -1,14 +1,16 @@
 import vitejs_pkg from '@vite/vitejs';
-import {connect} from './provider.js'
-import {log, method, withTimeout} from './tools.js'
+import {getNodes} from './provider.js'
+import {keys} from './keys.js'
+import {computePoW, powCache} from './pow.js'
+import {log, withTimeout} from './tools.js'
 
-const { utils, accountBlock, wallet } = vitejs_pkg;
+const { accountBlock, wallet } = vitejs_pkg;
 const { ReceiveAccountBlockTask } = accountBlock;
 
 export {
     createWallet, getTransactions,
     receiveTransactions, sendTransaction,
-    getBalance
+    getBalance, getBalances, getAccountState
 }
 
 // --- CREATE WALLET ---\\
@@ -23,34 +25,83 @@ function createWallet() {
 // --- GET ADDRESS BALANCE --- \\
 // :return: Wallet balance and unreceived blocks
 async function getBalance(address, mnemonics, address_id=0, timeout=1000) {
-    const provider = connect(method, timeout)
-    // Handle error with VITE node
-    if (!provider) { throw "ERROR Connection to VITE NODE" }
+    const nodes = getNodes()
 
     // If address provided return its balance
     if (address) {
         // console.log(">> getting balance for " + address)
-        return provider.getBalanceInfo(address)
+        return nodes.read(provider => provider.getBalanceInfo(address))
     }
 
     // If mnemonics provided, get Wallet from network and use its address
     else if (mnemonics) {
-        let wallet_ = wallet.getWallet(mnemonics).deriveAddress(address_id)
+        let wallet_ = keys.get(mnemonics, address_id)
         // console.log(">> getting balance for " + wallet_.address)
-        return provider.getBalanceInfo(wallet_.address)
+        return nodes.read(provider => provider.getBalanceInfo(wallet_.address))
     }
 }
 
 
+// --- GET ACCOUNT HEIGHT AND LAST BLOCK HASH --- \\
+// Asked on the best endpoint (not hedged), the one used for sending blocks
+// :return: {address, height, hash, previousHash, blockType, toAddress, tokenId, amount}, height '0' and hash null for account without blocks
+async function getAccountState(address, mnemonics, address_id=0) {
+    if (!address) { address = keys.get(mnemonics, address_id).address }
+
+    const block = await getNodes().call(provider => provider.request('ledger_getLatestAccountBlock', address))
+    if (!block) { return {address: address, height: '0', hash: null} }
+
+    return {address: address, height: block.height, hash: block.hash, previousHash: block.previousHash,
+            blockType: block.blockType, toAddress: block.toAddress, tokenId: block.tokenId, amount: block.amount}
+}
+
+
+// --- GET MANY ADDRESSES BALANCES --- \\
+// Addresses are split into chunks, each chunk is one JSON-RPC batch call
+// with account info and unreceived blocks info for every address in it,
+// up to `concurrency` batches are in flight at once.
+// onBalance(address, {balance, unreceived}) is called as chunks complete.
+async function getBalances(addresses, onBalance, chunkSize=25, concurrency=4) {
+    const nodes = getNodes()
+    const chunks = []
+
+    for (let i = 0; i < addresses.length; i += chunkSize) {
+        chunks.push(addresses.slice(i, i + chunkSize))
+    }
+
+    const fetchChunk = async (chunk) => {
+        const requests = chunk.flatMap(address => [
+            {type: 'request', methodName: 'ledger_getAccountInfoByAddress', params: [address]},
+            {type: 'request', methodName: 'ledger_getUnreceivedBlocksInfoByAddress', params: [address]},
+        ])
+        const results = await nodes.read(provider => provider.batch(requests))
+
+        chunk.forEach((address, i) => {
+            const [balance, unreceived] = [results[2 * i], results[2 * i + 1]]
+            const error = balance.error || unreceived.error
+
+            onBalance(address, error
+                ? {balance: null, unreceived: null, error: error.message || `${error}`}
+                : {balance: balance.result, unreceived: unreceived.result})
+        })
+    }
+
+    let next = 0
+    const runner = async () => {
+        while (next < chunks.length) { await fetchChunk(chunks[next++]) }
+    }
+    await Promise.all(Array.from({length: Math.min(concurrency, chunks.length)}, runner))
+}
+
+
 // --- GET TRANSACTION LIST --- \\
 // :return: transactions array
 async function getTransactions(address, pageIndex, pageSize) {
-    const provider = connect(method)
+    const nodes = getNodes()
 
-    // Handle error with VITE node
-    if (!provider) { throw "ERROR Connection to VITE NODE" }
     console.log(">> " + address, pageIndex, pageSize)
-    return provider.getTransactionList({address: address, pageIndex: pageIndex, pageSize: pageSize})
+    return nodes.read(provider => provider.getTransactionList(
+        {address: address, pageIndex: pageIndex, pageSize: pageSize}))
 }
 
 
@@ -61,15 +112,11 @@ async function receiveTransactions(mnemonics, address_id, callback={}, timeout)
     let successBlocks = []
     let errorBlocks = []
 
-    // Set provider (VITE node handler)
-    const provider = connect(method, timeout)
-
-    // Handle error with VITE node
-    if (!provider) { throw "ERROR Connection to VITE NODE" }
+    // Set provider (shared connection to the best VITE node)
+    const provider = getNodes().primary()
 
-    // Get wallet instance form mnemonics
-    const wallet_ = wallet.getWallet(mnemonics);
-    const {privateKey, address} = wallet_.deriveAddress(address_id);
+    // Get wallet key pair form mnemonics (cached)
+    const {privateKey, address} = keys.get(mnemonics, address_id);
 
     // Create new ReceiveTask
     const ReceiveTask = new ReceiveAccountBlockTask({
@@ -89,6 +136,8 @@ async function receiveTransactions(mnemonics, address_id, callback={}, timeout)
 
         // Initialize ReceiveTransaction subscription task if needed
         if (callback.unreceived) {
+            // Receive blocks change account height, pre-warmed PoW is useless now
+            powCache.purge(address)
             log(`Start Receiving ${callback.unreceived} Transactions`)
             callback.msg = 'start receiving task..'
             ReceiveTask.start({
@@ -146,57 +195,58 @@ async function receiveTransactions(mnemonics, address_id, callback={}, timeout)
 
 // --- SEND TRANSACTION --- \\
 // :return: error or transaction data in JSON
-async function sendTransaction(mnemonics, address_id, toAddress, tokenId, amount, timeout=2000) {
-    // Connect to provider (VITE node handler)
-    const provider = connect(method, timeout)
+// previous: {height, hash} of the last account block when caller knows it,
+// saves fetching it from node
+async function sendTransaction(mnemonics, address_id, toAddress, tokenId, amount, timeout=2000, previous=null) {
     console.log(">> sending " + (parseInt(amount) / 10**8 )+ " to: " + toAddress)
 
-    // Handle error with VITE node
-    if (!provider) { throw "ERROR Connection to VITE NODE" }
-
-    // 1. Import wallet from mnemonic/seedphrase
-    const myWallet = wallet.getWallet(mnemonics);
-    const { privateKey, address } = myWallet.deriveAddress(address_id);
+    // Shared connection to the best VITE node, blocks are not hedged
+    // to other nodes to avoid broadcasting the same send twice
+    return getNodes().write(async (provider) => {
+        // 1. Import wallet key pair from mnemonic/seedphrase (cached)
+        const { privateKey, address } = keys.get(mnemonics, address_id);
+
+        //2. Create accountBlock instance
+        const {createAccountBlock} = accountBlock;
+        const sendBlock = createAccountBlock('send', {
+            address: address,
+            toAddress: toAddress,
+            tokenId: tokenId,
+            amount: amount
+        })
+
+        // 3. Set provider and private sendBlockKey
+        sendBlock.setProvider(provider).setPrivateKey(privateKey);
+
+        // 4. Set height and previousHash, known by caller or autofilled from node
+        if (previous && previous.hash) {
+            sendBlock.setPreviousAccountBlock({height: previous.height, hash: previous.hash})
+        } else {
+            await sendBlock.autoSetPreviousAccountBlock().catch(e => {throw e.message});
+        }
 
-    //2. Create accountBlock instance
-    const {createAccountBlock} = accountBlock;
-    const sendBlock = createAccountBlock('send', {
-        address: address,
-        toAddress: toAddress,
-        tokenId: tokenId,
-        amount: amount
-    })
+        // 5. PoW (when not enough quota), pre-computed after previous send
+        // of this wallet if its previousHash still matches, else from node
+        const prewarmed = await powCache.take(sendBlock)
+        const pow = prewarmed || await computePoW(provider, sendBlock)
+        const sign = ({difficulty, nonce}) => {
+            if (difficulty) {
+                sendBlock.setDifficulty(difficulty);
+                sendBlock.setNonce(nonce);
+            }
+            return sendBlock.sign().send()
+        }
 
-    // 3. Set provider and private sendBlockKey
-    sendBlock.setProvider(provider).setPrivateKey(privateKey);
-
-    // 4. Autofill height and previousHash
-    await sendBlock.autoSetPreviousAccountBlock().catch(e => {throw e.message});
-
-    // 5. Get difficulty for PoW Puzzle (when not enough quota)
-    const {difficulty} = await provider.request('ledger_getPoWDifficulty', {
-        address: sendBlock.address,
-        previousHash: sendBlock.previousHash,
-        blockType: sendBlock.blockType,
-        toAddress: sendBlock.toAddress,
-        data: sendBlock.data
-    }).catch(e => {throw e.error.message});
-
-    // If difficulty is null, it indicates the account has enough quota to
-    // send the transaction. There is no need to do PoW.
-    if (difficulty) {
-        // Call GVite-RPC API to calculate nonce from difficulty
-        const getNonceHashBuffer = Buffer.from(sendBlock.originalAddress + sendBlock.previousHash, 'hex');
-        const getNonceHash = utils.blake2bHex(getNonceHashBuffer, null, 32);
-        const nonce = await provider.request('util_getPoWNonce', difficulty, getNonceHash
-        ).catch(e => {throw e.error.message})
-
-        sendBlock.setDifficulty(difficulty);
-        sendBlock.setNonce(nonce);
-    }
+        // 6. Sign and send the AccountBlock, pre-warmed PoW may be outdated
+        // if quota changed meanwhile, then get fresh one and send again
+        const result = await sign(pow).catch(async (e) => {
+            if (!prewarmed) { throw e.error.message }
+            log(`Pre-warmed PoW rejected for ${address}, computing again`)
+            return sign(await computePoW(provider, sendBlock)).catch(e => {throw e.error.message})
+        });
 
-    // 6. Sign and send the AccountBlock
-    return sendBlock.sign().send()
-        .then((result) => {return result})
-        .catch(e => {throw e.error.message});
+        // 7. Pre-warm PoW for the next send of this wallet in background
+        powCache.prewarm(provider, {address: address, hash: sendBlock.hash, toAddress: toAddress})
+        return {...result, address: address, height: sendBlock.height, hash: sendBlock.hash}
+    })
 }
@@ -0,0 +1,74 @@
+"""
+Read-through cache of VITE address balances (django.core.cache, see CACHES),
+keyed by address, so it covers addresses outside the database too.
+Entries live VITE_BALANCE_CACHE_TTL seconds and are dropped as soon as
+a send from / to the address finishes or its pending blocks are received.
+Those invalidations come from other processes too (run_outbox, run_receiver),
+so balances are cached only when CACHES 'default' is shared by processes.
+"""
+import time
+
+from django.core.cache import cache
+from django.conf import settings
+
+
+KEY_PREFIX = 'tipbot:balance:'
+
+# Cache backends private to one process, balance cache is disabled with them
+LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',
+                  'django.core.cache.backends.dummy.DummyCache')
+
+
+def enabled() -> bool:
+    """Balance cache is used only with CACHES 'default' shared by all processes"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    return ttl() > 0 and backend not in LOCAL_BACKENDS
+
+
+def ttl() -> float:
+    """Staleness window, max age of cached balance in seconds"""
+    return getattr(settings, 'VITE_BALANCE_CACHE_TTL', 30)
+
+
+def max_age(payload: dict) -> float:
+    """Max age of cached balance accepted by request, never longer than ttl()"""
+    try:
+        return min(float(payload.get('max_age', ttl())), ttl())
+    except (TypeError, ValueError):
+        return ttl()
+
+
+def get(address: str, max_age: float = None):
+    """:return: cached balance data not older than `max_age` seconds or None"""
+    if not enabled():
+        return None
+
+    entry = cache.get(KEY_PREFIX + address)
+    max_age = ttl() if max_age is None else max_age
+
+    if entry and time.time() - entry['time'] <= max_age:
+        return entry['balance']
+
+
+def save(address: str, balance: dict):
+    if not enabled():
+        return
+
+    cache.set(KEY_PREFIX + address, {'balance': balance, 'time': time.time()}, ttl())
+
+
+def save_many(balances: dict):
+    """Cache {address: balance data} from one network call"""
+    if not enabled():
+        return
+
+    now = time.time()
+    cache.set_many({KEY_PREFIX + address: {'balance': balance, 'time': now}
+                    for address, balance in balances.items()}, ttl())
+
+
+def invalidate(*addresses: str):
+    if not enabled():
+        return
+
+    cache.delete_many([KEY_PREFIX + address for address in addresses if address])
@@ -0,0 +1,62 @@
+import time
+
+from cryptography.fernet import InvalidToken
+from django.core.management.base import BaseCommand
+
+from tipbot.models import Wallet
+from core import keyring
+
+
+class Command(BaseCommand):
+    help = "Re-encrypt Wallet mnemonics with the newest key of the key-ring (core.keyring), " \
+           "in streamed batches ordered by address, safe to run on live database and to resume"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000, help="wallets in one bulk UPDATE")
+        parser.add_argument('--after', default='', help="resume after this wallet address")
+        parser.add_argument('--dry-run', action='store_true', help="count wallets to rotate, write nothing")
+
+    def handle(self, *args, **options):
+        batch, dry_run = options['batch'], options['dry_run']
+        stats = {'scanned': 0, 'rotated': 0, 'current': 0, 'failed': 0}
+        started = time.monotonic()
+        updated = []
+        last = options['after']
+
+        wallets = Wallet.objects.filter(address__gt=last, mnemonics__isnull=False) \
+            .order_by('address').only('address', 'mnemonics').iterator(chunk_size=batch)
+
+        for wallet in wallets:
+            stats['scanned'] += 1
+            last = wallet.address
+
+            if keyring.is_current(wallet.mnemonics):
+                stats['current'] += 1
+            else:
+                try:
+                    wallet.mnemonics = keyring.rotate(wallet.mnemonics)
+                    updated.append(wallet)
+                    stats['rotated'] += 1
+                except InvalidToken:
+                    # Not encrypted with any key of the ring, left untouched
+                    stats['failed'] += 1
+                    self.stderr.write(f"{wallet.address}: no key decrypts mnemonics")
+
+            if stats['scanned'] % batch == 0:
+                self.flush(updated, dry_run)
+                self.progress(stats, started, last)
+
+        self.flush(updated, dry_run)
+        self.progress(stats, started, last)
+        self.stdout.write(self.style.SUCCESS("rotation finished" + (" (dry run)" if dry_run else "")))
+
+    @staticmethod
+    def flush(updated: list, dry_run: bool):
+        if updated and not dry_run:
+            Wallet.objects.bulk_update(updated, ['mnemonics'])
+        updated.clear()
+
+    def progress(self, stats: dict, started: float, last: str):
+        elapsed = time.monotonic() - started
+        rate = stats['scanned'] / elapsed if elapsed else 0
+        self.stdout.write(f"{stats} | {rate:.0f} wallets/s | resume with --after {last}")
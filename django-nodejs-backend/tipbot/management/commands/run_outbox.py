@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from tipbot.outbox import OutboxWorkers
+
+
+class Command(BaseCommand):
+    help = "Send queued transactions (VITE_SEND_OUTBOX mode) with a pool of workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'VITE_OUTBOX_WORKERS', 4),
+                            help="transactions sent at the same time")
+
+    def handle(self, *args, **options):
+        outbox = OutboxWorkers(workers=options['workers'])
+
+        try:
+            outbox.run()
+        except KeyboardInterrupt:
+            outbox.stop()
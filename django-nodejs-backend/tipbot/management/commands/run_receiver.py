@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from tipbot.receiver import Receiver
+
+
+class Command(BaseCommand):
+    help = "Receive pending transactions of all custodial wallets in a loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=getattr(settings, 'VITE_RECEIVER_INTERVAL', 10),
+                            help="seconds between polling rounds")
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'VITE_RECEIVER_WORKERS', 2),
+                            help="wallets receiving at the same time")
+        parser.add_argument('--once', action='store_true', help="run single polling round and exit")
+
+    def handle(self, *args, **options):
+        receiver = Receiver(interval=options['interval'], workers=options['workers'])
+
+        if options['once']:
+            received = receiver.run_once()
+            self.stdout.write(f"received pending transactions of {received} wallets")
+            return
+
+        try:
+            receiver.run()
+        except KeyboardInterrupt:
+            receiver.stop()
@@ -1,9 +1,20 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import InvalidToken
 from django.conf import settings
+from django.db.models.functions import Upper
 from django.db import models
 
-from core.secrets import encryption_key
+from core import keyring
+from vtm.tokens import registry as tokens, readable_balance
 from vtm.models import Token
+from . import balance_cache
+
+
+# Response message of requests which need wallet mnemonics no key can decrypt
+MNEMONICS_ERROR_MSG = "Wallet keys not available, please contact @blacktyg3r"
+
+
+class MnemonicsError(Exception):
+    """Stored wallet mnemonics are not decrypted by any key of the key-ring"""
 
 
 class Wallet(models.Model):
@@ -15,26 +26,22 @@ class Wallet(models.Model):
 
     objects = models.Manager()
 
-    def decrypt_mnemonics(self):
+    def decrypt_mnemonics(self) -> str:
+        """:raise MnemonicsError: when mnemonics are missing or no key of core.keyring decrypts them"""
         try:
-            mnemonics_b = self.mnemonics.encode('utf-8')
-            return Fernet(encryption_key).decrypt(mnemonics_b).decode('utf-8')
-        except Exception:
-            return self.mnemonics
+            return keyring.decrypt(self.mnemonics)
+        except (InvalidToken, AttributeError):
+            raise MnemonicsError(f"wallet {self.address}: mnemonics can not be decrypted")
 
     def readable_balance(self):
-        epic_id = 'tti_f370fadb275bc2a1a839c753'
-
-        if self.balance and 'balanceInfoMap' in self.balance.keys() \
-            and epic_id in self.balance['balanceInfoMap'].keys():
+        return readable_balance(self.balance)
 
-            epic = self.balance['balanceInfoMap'][epic_id]
-            as_int = int(epic['balance'])
-            decimals = epic['tokenInfo']['decimals']
-            return round((as_int / 10**decimals), 8)
+    def owner_repr(self) -> str:
+        """Owner mention if user is already loaded, else user id, never queries database"""
+        return self.user.mention if Wallet.user.field.is_cached(self) else str(self.user_id)
 
     def __str__(self):
-        return f"Wallet({self.user.mention} | {self.network} | {self.readable_balance()} EPIC)"
+        return f"Wallet({self.owner_repr()} | {self.network} | {self.readable_balance()} EPIC)"
 
 
 class AccountAlias(models.Model):
@@ -46,6 +53,13 @@ class AccountAlias(models.Model):
     network = models.CharField(max_length=16, default='VITE')
     details = models.JSONField(default=dict, null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Bot alias directory is refreshed with aliases updated since its last refresh
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(Upper('title'), name='alias_title_upper'),
+            ]
 
     def __str__(self):
         return f"#{self.title}({self.address[0:8]}...{self.address[-4:]})"
@@ -53,8 +67,10 @@ class AccountAlias(models.Model):
 class Transaction(models.Model):
     network = models.CharField(max_length=16, default='VITE')
     token = models.ForeignKey(Token, blank=True, null=True, on_delete=models.SET_NULL, related_name='token')
-    sender = models.ForeignKey(Wallet, null=True, on_delete=models.SET_NULL, related_name='sender_wallet')
-    receiver = models.ForeignKey(Wallet, blank=True, null=True, on_delete=models.SET_NULL, related_name='receiver_wallet')
+    # Indexed by composite (sender / receiver, timestamp) indexes in Meta
+    sender = models.ForeignKey(Wallet, null=True, on_delete=models.SET_NULL, related_name='sender_wallet', db_index=False)
+    receiver = models.ForeignKey(Wallet, blank=True, null=True, on_delete=models.SET_NULL,
+                                 related_name='receiver_wallet', db_index=False)
     address = models.CharField(max_length=58, null=True, blank=True)
     amount = models.DecimalField(decimal_places=8, max_digits=32, null=True)
     type_of = models.CharField(max_length=16, null=True, blank=True)
@@ -62,24 +78,34 @@ class Transaction(models.Model):
     data = models.JSONField(default=dict)
     message = models.TextField(null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     objects = models.Manager()
 
     class Meta:
         ordering = ('-timestamp', )
+        indexes = [
+            models.Index(fields=['sender', 'timestamp'], name='tx_sender_timestamp'),
+            models.Index(fields=['receiver', 'timestamp'], name='tx_receiver_timestamp'),
+            models.Index(fields=['address', 'timestamp'], name='tx_address_timestamp'),
+            ]
+
+    def _cached(self, field: str):
+        """Related object if already loaded, else None, never queries database"""
+        return getattr(self, field) if self._meta.get_field(field).is_cached(self) else None
 
     def logs_repr(self):
-        return f"Transaction({self.network} | {self.amount} {self.token.symbol} | " \
-               f"{self.sender.user.mention if self.sender else ''} to --> " \
-               f"{self.receiver.user.mention if self.receiver else self.address} |" \
+        sender, receiver = self._cached('sender'), self._cached('receiver')
+        return f"Transaction({self.network} | {self.amount} {tokens.symbol(self.token_id)} | " \
+               f"{sender.owner_repr() if sender else self.sender_id or ''} to --> " \
+               f"{receiver.owner_repr() if receiver else self.receiver_id or self.address} |" \
                f" {self.type_of} | {self.status})"
 
     def __str__(self):
         return self.logs_repr()
 
     def prepare_amount(self):
-        dec = 10 ** self.token.decimals if self.token else 8
-        return int(self.amount * dec)
+        return tokens.to_raw(self.token_id, self.amount)
 
     def prepare_address(self):
         assert self.address or self.receiver
@@ -87,3 +113,27 @@ class Transaction(models.Model):
             return self.receiver.address
         elif self.address:
             return self.address
+
+    def send_params(self) -> dict:
+        """Prepare ViteConnector.send() params"""
+        return {
+            'address': self.sender.address,
+            'mnemonics': self.sender.decrypt_mnemonics(),
+            'address_id': 0,
+            'to_address': self.prepare_address(),
+            'token_id': self.token_id,
+            'amount': self.prepare_amount()
+            }
+
+    def set_result(self, transaction: dict):
+        """Save network result of send: tx hash on success, else error msg"""
+        if not transaction['error']:
+            self.data = {'hash': transaction['data']['hash']}
+            self.status = 'success'
+        else:
+            self.data = {'error': transaction['msg']}
+            self.status = 'failed'
+        self.save()
+
+        # Balances of both sides are not known any more
+        balance_cache.invalidate(self.sender.address if self.sender else None, self.prepare_address())
@@ -0,0 +1,115 @@
+"""
+Transaction outbox, see `manage.py run_outbox`.
+In outbox mode send_transaction only validates request and saves Transaction
+as 'queued', background workers claim queued rows one by one with
+SELECT ... FOR UPDATE SKIP LOCKED, send them and save tx hash or error.
+Clients follow the result with transaction_status end-point (long-polling).
+"""
+import threading
+
+from django.db import transaction, close_old_connections
+from django.conf import settings
+
+from core.vite_connector import ViteConnector
+from core.logger_ import setup_logging
+from core.locks import wallet_lock, WalletBusy
+from core.retry import Deadline, error_response
+from .models import Transaction, MnemonicsError, MNEMONICS_ERROR_MSG
+
+
+logger = setup_logging(name=__name__, console_log_output="stdout", console_log_level="info", console_log_color=True,
+                       logfile_file=__name__ + ".log", logfile_log_level="info", logfile_log_color=False,
+                       log_line_template="%(color_on)s[%(asctime)s] [%(threadName)s] [%(levelname)-8s] %(message)s%(color_off)s")
+
+# Transaction statuses before the send result is known
+IN_PROGRESS = ('pending', 'queued', 'sending')
+
+
+def outbox_enabled() -> bool:
+    return getattr(settings, 'VITE_SEND_OUTBOX', False)
+
+
+def claim() -> Transaction:
+    """
+    Take the oldest queued Transaction and mark it as 'sending', rows locked
+    by other workers are skipped, so each row is claimed exactly once.
+    :return: Transaction or None when nothing is queued
+    """
+    with transaction.atomic():
+        tx = Transaction.objects.select_for_update(skip_locked=True) \
+            .filter(status='queued').order_by('timestamp').first()
+
+        if tx:
+            tx.status = 'sending'
+            tx.save(update_fields=['status'])
+    return tx
+
+
+def execute(tx: Transaction) -> Transaction:
+    """Send claimed Transaction to the network and save its result,
+    put it back to the queue when sender wallet lane stays busy"""
+    provider = ViteConnector(logger=logger, deadline=Deadline(getattr(settings, 'VITE_REQUEST_DEADLINE', 90)))
+
+    try:
+        with wallet_lock(tx.sender.address):
+            tx.set_result(provider.send(**tx.send_params()))
+    except WalletBusy:
+        tx.status = 'queued'
+        tx.save(update_fields=['status'])
+        logger.warning(f"outbox: {tx.sender.address} busy, transaction {tx.id} queued again")
+        return tx
+    except MnemonicsError as e:
+        logger.error(f"outbox: {e}")
+        tx.set_result(error_response(MNEMONICS_ERROR_MSG))
+
+    logger.info(f"outbox: {tx}")
+    return tx
+
+
+class OutboxWorkers:
+    """
+    Pool of threads sending queued transactions, throughput is bounded
+    by number of workers (and node.js workers of core.vite_connector pool).
+    Rows left in 'sending' by a crashed process are not sent again,
+    they need manual check against the network.
+    :param workers: number of threads
+    :param poll_interval: seconds to wait when nothing is queued
+    """
+
+    def __init__(self, workers: int = 4, poll_interval: float = 0.5):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+        self.threads = []
+
+    def work(self):
+        while not self.stopped.is_set():
+            close_old_connections()
+
+            try:
+                tx = claim()
+                if tx:
+                    execute(tx)
+                    continue
+            except Exception as e:
+                logger.error(f"outbox: {e}")
+
+            self.stopped.wait(self.poll_interval)
+
+        close_old_connections()
+
+    def run(self):
+        logger.info(f"outbox: started {self.workers} workers")
+        self.threads = [threading.Thread(target=self.work, name=f"outbox-{i}", daemon=True)
+                        for i in range(self.workers)]
+
+        for thread in self.threads:
+            thread.start()
+        for thread in self.threads:
+            thread.join()
+
+    def stop(self):
+        """Let workers finish transactions they are sending and exit"""
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,99 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+
+from rest_framework.pagination import BasePagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from django.utils.dateparse import parse_datetime
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination on (timestamp, id), page request costs the same
+    however long the history is: every branch queryset is read with an index
+    range scan limited to one page and branches are merged in Python.
+
+    Query params:
+    - cursor: `next` of previous page, continue to older items
+    - since: `since` of first page or of earlier sync, only newer items, oldest first (incremental sync)
+    - page_size: items per page, up to max_page_size
+
+    Response: {'next': cursor or None, 'since': cursor or None, 'results': [...]}
+    """
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page = []
+        self.has_more = False
+        self.since = None
+        self.cursor = None
+
+    @staticmethod
+    def encode_cursor(timestamp, id_: int) -> str:
+        return urlsafe_b64encode(f"{timestamp.isoformat()}|{id_}".encode()).decode()
+
+    def cursor_of(self, obj) -> str:
+        return self.encode_cursor(obj.timestamp, obj.id)
+
+    def decode_cursor(self, cursor: str) -> tuple:
+        """:return: tuple(timestamp, id) or None"""
+        if not cursor:
+            return None
+
+        try:
+            timestamp, id_ = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            timestamp = parse_datetime(timestamp)
+            assert timestamp
+            return timestamp, int(id_)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_size(self, request) -> int:
+        try:
+            return max(1, min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size))
+        except ValueError:
+            return self.page_size
+
+    def _branch(self, queryset, size: int):
+        """Page of one branch, keyset bound on timestamp is usable by (x, timestamp) indexes"""
+        if self.since:
+            timestamp, id_ = self.since
+            queryset = queryset.filter(timestamp__gte=timestamp).exclude(timestamp=timestamp, id__lte=id_)
+            return queryset.order_by('timestamp', 'id')[:size + 1]
+
+        if self.cursor:
+            timestamp, id_ = self.cursor
+            queryset = queryset.filter(timestamp__lte=timestamp).exclude(timestamp=timestamp, id__gte=id_)
+        return queryset.order_by('-timestamp', '-id')[:size + 1]
+
+    def paginate_branches(self, querysets: list, request) -> list:
+        """Paginate union of querysets, each should be backed by its own index"""
+        self.since = self.decode_cursor(request.query_params.get('since'))
+        self.cursor = self.decode_cursor(request.query_params.get('cursor'))
+        size = self.get_page_size(request)
+
+        rows = {}
+        for queryset in querysets:
+            rows.update((obj.id, obj) for obj in self._branch(queryset, size))
+
+        page = sorted(rows.values(), key=lambda obj: (obj.timestamp, obj.id), reverse=not self.since)
+        self.has_more = len(page) > size
+        self.page = page[:size]
+
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_branches([queryset], request)
+
+    def get_paginated_response(self, data):
+        if self.since:
+            # Oldest first, newest item of the page is where next sync starts
+            since = self.cursor_of(self.page[-1]) if self.page else self.encode_cursor(*self.since)
+            next_ = since if self.has_more else None
+        else:
+            # Newest item is known only on the first page
+            since = self.cursor_of(self.page[0]) if self.page and not self.cursor else None
+            next_ = self.cursor_of(self.page[-1]) if self.has_more else None
+
+        return Response({'next': next_, 'since': since, 'results': data})
@@ -0,0 +1,147 @@
+"""
+Auto-receive service for custodial wallets, see `manage.py run_receiver`.
+Polls unreceived blocks of all tipbot.Wallet addresses with batched balance
+calls and receives pending transactions as soon as they show up, so wallet
+balances are settled before users ask for them.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from django.conf import settings
+
+from core.vite_connector import ViteConnector
+from core.logger_ import setup_logging
+from core.retry import error_response
+from .models import Wallet, MnemonicsError
+from . import balance_cache
+
+
+logger = setup_logging(name=__name__, console_log_output="stdout", console_log_level="info", console_log_color=True,
+                       logfile_file=__name__ + ".log", logfile_log_level="info", logfile_log_color=False,
+                       log_line_template="%(color_on)s[%(asctime)s] [%(threadName)s] [%(levelname)-8s] %(message)s%(color_off)s")
+
+
+def unreceived_count(balance: dict) -> int:
+    """Number of unreceived blocks in wallet balance data"""
+    try:
+        return int(balance['unreceived']['blockCount'] or 0)
+    except (TypeError, KeyError, ValueError):
+        return 0
+
+
+class Receiver:
+    """
+    Receive pending transactions of all wallets in a loop
+    :param interval: seconds between polling rounds
+    :param batch_size: addresses in one balance_many() worker request
+    :param workers: number of wallets receiving at the same time
+    """
+
+    def __init__(self, interval: float = 10, batch_size: int = 500, workers: int = 2):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.workers = workers
+        self.stopped = threading.Event()
+
+    def _addresses(self):
+        """Yield lists of all wallet addresses, `batch_size` at a time"""
+        addresses = Wallet.objects.values_list('address', flat=True).order_by('address')
+        batch = []
+
+        for address in addresses.iterator(chunk_size=self.batch_size):
+            batch.append(address)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _save_balances(self, balances: dict):
+        """Save changed balances, only wallets whose balance data differs are written"""
+        wallets = list(Wallet.objects.filter(address__in=balances.keys()).only('address', 'balance'))
+        changed = []
+
+        for wallet in wallets:
+            balance = balances[wallet.address]
+            if not balance.get('error') and wallet.balance != balance:
+                wallet.balance = balance
+                changed.append(wallet)
+
+        Wallet.objects.bulk_update(changed, ['balance'])
+
+    def pending(self) -> list:
+        """Poll balances of all wallets, return addresses with unreceived blocks"""
+        pending = []
+
+        for addresses in self._addresses():
+            response = ViteConnector(logger=logger).balance_many(addresses)
+
+            if response['error']:
+                logger.error(f"receiver: balances of {len(addresses)} wallets failed: {response['msg']}")
+                continue
+
+            self._save_balances(response['data'])
+            pending += [address for address, balance in response['data'].items() if unreceived_count(balance)]
+
+        return pending
+
+    @staticmethod
+    def receive(address: str) -> dict:
+        """Receive all pending blocks of the wallet and save its fresh balance"""
+        wallet = Wallet.objects.get(address=address)
+
+        try:
+            mnemonics = wallet.decrypt_mnemonics()
+        except MnemonicsError as e:
+            return error_response(str(e))
+
+        provider = ViteConnector(logger=logger)
+        response = provider.update(mnemonics=mnemonics, address_id=0)
+
+        if not response['error']:
+            balance = provider.balance(address=address)
+            if not balance['error']:
+                balance_cache.save(address, balance['data'])
+                wallet.balance = balance['data']
+                wallet.save(update_fields=['balance'])
+            else:
+                balance_cache.invalidate(address)
+
+        return response
+
+    def run_once(self) -> int:
+        """Single polling round, return number of wallets with received blocks"""
+        pending = self.pending()
+
+        if not pending:
+            return 0
+
+        logger.info(f"receiver: {len(pending)} wallets with pending transactions")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='receiver') as executor:
+            responses = list(executor.map(self.receive, pending))
+
+        for address, response in zip(pending, responses):
+            if response['error']:
+                logger.warning(f"receiver: {address} {response['msg']}")
+
+        return sum(not response['error'] for response in responses)
+
+    def run(self):
+        logger.info(f"receiver: started, polling every {self.interval}s")
+
+        while not self.stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"receiver: {e}")
+
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def auto_receive() -> bool:
+    """True when run_receiver service settles wallets and update requests only read status"""
+    return getattr(settings, 'VITE_AUTO_RECEIVE', False)
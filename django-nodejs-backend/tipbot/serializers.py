@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from vtm.tokens import registry as tokens
 from .models import Wallet, Transaction, AccountAlias
 
 
@@ -10,14 +11,21 @@ class WalletSerializer(serializers.ModelSerializer):
 
 
 class TransactionSerializer(serializers.ModelSerializer):
+    symbol = serializers.SerializerMethodField()
+
     class Meta:
         model = Transaction
-        fields = ('sender', 'receiver', 'address', 'amount', 'token', 'status', 'data')
+        fields = ('id', 'sender', 'receiver', 'address', 'amount', 'token', 'symbol', 'status', 'data',
+                  'idempotency_key')
+
+    @staticmethod
+    def get_symbol(obj: Transaction) -> str:
+        return tokens.symbol(obj.token_id)
 
 
 class AccountAliasSerializer(serializers.ModelSerializer):
     class Meta:
         model = AccountAlias
-        fields = ('address', 'title', 'details', 'network', 'owner')
+        fields = ('address', 'title', 'details', 'network', 'owner', 'updated')
 
 
@@ -1,5 +1,31 @@
+from cryptography.fernet import Fernet, InvalidToken
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import TestCase, SimpleTestCase
+from urllib.parse import quote
+from unittest import mock
+from decimal import Decimal
+from datetime import datetime, timedelta, timezone
+import threading
+import tempfile
+import asyncio
+import json
+import io
+import os
+
+from core import keyring, locks
+from core.locks import wallet_lock, async_wallet_lock, WalletBusy
+from core.retry import RetryPolicy, CircuitBreaker, Deadline, error_response, SUCCESS, RETRYABLE, TERMINAL
+from vtm.tokens import registry
+from vtm.models import TelegramUser, Token
+from .models import Wallet, Transaction, AccountAlias, MnemonicsError, MNEMONICS_ERROR_MSG
+from .views import WALLET_BUSY_MSG, BATCH_STOPPED_MSG, SEND_UNKNOWN_MSG
+
+
+# Cache backend shared by processes, balance cache is disabled with local ones
+SHARED_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                             'LOCATION': os.path.join(tempfile.gettempdir(), 'tipbot-tests-cache')}}
 
 
 class UsersManagersTests(TestCase):
@@ -39,4 +65,603 @@ class UsersManagersTests(TestCase):
             pass
         with self.assertRaises(ValueError):
             User.objects.create_superuser(
-                email='super@user.com', password='foo', is_superuser=False)
\ No newline at end of file
+                email='super@user.com', password='foo', is_superuser=False)
+
+
+class QueryCountTests(TestCase):
+    """API end-points make a fixed number of queries, however many rows they return"""
+
+    def setUp(self):
+        cache.clear()
+        registry.invalidate()
+
+    def create_users(self, start: int, count: int):
+        for id_ in range(start, start + count):
+            user = TelegramUser.objects.create(id=id_, username=f"user_{id_}", first_name=f"user {id_}")
+            wallet = Wallet.objects.create(user=user, address=f"vite_{id_:050d}",
+                                           mnemonics=keyring.encrypt(f"words {id_}"))
+            AccountAlias.objects.create(title=f"alias_{id_}", owner=user, address=wallet.address)
+            Transaction.objects.create(sender=wallet, receiver=wallet, token=registry.default(),
+                                       amount=1, type_of='tip', status='success')
+
+    def assertFixedQueries(self, num: int, url: str):
+        """Same number of queries with few and with many rows"""
+        for start, count in ((1, 2), (100, 20)):
+            self.create_users(start, count)
+            with self.assertNumQueries(num):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def post(self, url: str, payload: dict) -> dict:
+        return self.client.post(url, json.dumps(payload), content_type='application/json').json()
+
+    def test_users(self):
+        self.assertFixedQueries(2, '/api/users/')
+
+    def test_users_sync(self):
+        for start, count in ((1, 2), (100, 20)):
+            self.create_users(start, count)
+            profiles = [{'id': id_, 'username': f"new_{id_}", 'is_premium': None} for id_ in range(start, start + count)]
+
+            with self.assertNumQueries(2):
+                response = self.post('/api/users/sync/', {'users': profiles + [{'id': 999999, 'username': 'x'}]})
+
+            self.assertEqual(len(response['data']), count)
+            self.assertEqual(TelegramUser.objects.get(id=start).username, f"new_{start}")
+            self.assertFalse(TelegramUser.objects.filter(id=999999).exists())
+
+    def test_users_resolve(self):
+        for start, count in ((1, 2), (100, 20)):
+            self.create_users(start, count)
+            payload = {'ids': [start], 'usernames': [f"@USER_{id_}" for id_ in range(start + 1, start + count)] + ['nobody'],
+                       'aliases': [f"#alias_{id_}" for id_ in range(start, start + count)]}
+
+            with self.assertNumQueries(2):
+                response = self.post('/api/users/resolve/', payload)
+
+            self.assertEqual(len(response['data']['users']), count)
+            self.assertEqual(len(response['data']['aliases']), count)
+            self.assertEqual(response['data']['users'][0]['wallet'], [f"vite_{start:050d}"])
+
+    def test_users_part_username(self):
+        self.assertFixedQueries(2, '/api/users/?part_username=user')
+
+    def test_wallets(self):
+        self.assertFixedQueries(1, '/api/wallets/')
+
+    def test_transactions(self):
+        self.assertFixedQueries(1, '/api/transactions/')
+
+    def test_user_transactions(self):
+        self.assertFixedQueries(3, '/api/transactions/?id=1')
+
+    def test_alias(self):
+        self.assertFixedQueries(1, '/api/alias/')
+
+    def test_alias_updated_since(self):
+        self.create_users(1, 3)
+        since = self.client.get('/api/alias/').json()[-1]['updated']
+
+        alias = AccountAlias.objects.get(title='alias_1')
+        alias.address = 'vite_new'
+        alias.save()
+
+        aliases = self.client.get(f"/api/alias/?updated_since={quote(since)}").json()
+        self.assertEqual(aliases[-1]['title'], 'alias_1')
+        self.assertNotIn('alias_2', [alias['title'] for alias in aliases])
+        self.assertEqual(self.client.get('/api/alias/?updated_since=yesterday').status_code, 400)
+
+    def test_send_transaction(self):
+        self.create_users(1, 2)
+        sent = {'error': 0, 'msg': 'send success', 'data': {'hash': 'hash'}}
+        payload = {'sender': {'id': 1}, 'receiver': {'id': 2}, 'amount': 1,
+                   'type_of': 'tip', 'network': 'VITE', 'idempotency_key': 'key'}
+
+        with mock.patch('tipbot.views.ViteConnector') as connector:
+            connector.return_value.send.return_value = sent
+
+            with self.assertNumQueries(7):
+                response = self.post('/tipbot/send_transaction/', payload)
+            self.assertEqual(response['data']['hash'], 'hash')
+
+            # Repeated request gets the first result
+            with self.assertNumQueries(1):
+                self.post('/tipbot/send_transaction/', payload)
+
+    def test_balance(self):
+        self.create_users(1, 2)
+        balance = {'error': 0, 'msg': 'success', 'data': {'balanceInfoMap': {}}}
+
+        with mock.patch('tipbot.views.ViteConnector') as connector, self.settings(CACHES=SHARED_CACHES):
+            cache.clear()
+            connector.return_value.balance_response = balance
+
+            with self.assertNumQueries(2):
+                self.post('/tipbot/balance/', {'id': 1})
+
+            # Served from balance cache
+            with self.assertNumQueries(1):
+                response = self.post('/tipbot/balance/', {'id': 1})
+            self.assertEqual(response['data'], balance['data'])
+            self.assertEqual(connector.return_value.balance.call_count, 1)
+            cache.clear()
+
+    def test_balance_local_cache(self):
+        self.create_users(1, 2)
+        balance = {'error': 0, 'msg': 'success', 'data': {'balanceInfoMap': {}}}
+
+        # Process local cache would miss invalidations of other processes
+        with mock.patch('tipbot.views.ViteConnector') as connector:
+            connector.return_value.balance_response = balance
+
+            for _ in range(2):
+                self.post('/tipbot/balance/', {'id': 1})
+            self.assertEqual(connector.return_value.balance.call_count, 2)
+
+
+class SendBatchTests(TestCase):
+
+    def setUp(self):
+        registry.invalidate()
+        self.sender = TelegramUser.objects.create(id=1, username='user_1', first_name='user 1')
+        self.wallet = Wallet.objects.create(user=self.sender, address=f"vite_{1:050d}",
+                                            mnemonics=keyring.encrypt('words 1'))
+        receiver = TelegramUser.objects.create(id=2, username='user_2', first_name='user 2')
+        Wallet.objects.create(user=receiver, address=f"vite_{2:050d}", mnemonics=keyring.encrypt('words 2'))
+
+        patcher = mock.patch('tipbot.views.ViteConnector')
+        self.connector = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def sent(hash_: str) -> dict:
+        return {'error': 0, 'msg': 'transaction success', 'data': {'hash': hash_}}
+
+    def send_batch(self, receivers: list, key: str = 'batch') -> dict:
+        payload = {'sender': {'id': 1}, 'receivers': receivers, 'amount': 1,
+                   'type_of': 'tip', 'network': 'VITE', 'idempotency_key': key}
+        return self.client.post('/tipbot/send_batch/', json.dumps(payload), content_type='application/json').json()
+
+    def results(self, response: dict) -> list:
+        return [(r['error'], r['msg']) for r in response['data']]
+
+    def test_results(self):
+        self.connector.send.side_effect = [self.sent('hash_1'), self.sent('hash_2')]
+        receivers = [{'id': 2}, {'id': 404}, {'address': 'vite_external'}]
+
+        response = self.send_batch(receivers)
+        self.assertEqual(response['msg'], 'send_batch success: 2/3')
+        self.assertEqual(self.results(response), [(0, 'send success'), (1, 'no account'), (0, 'send success')])
+        self.assertEqual([r['data'] and r['data']['hash'] for r in response['data']], ['hash_1', None, 'hash_2'])
+        self.assertEqual(sorted(Transaction.objects.values_list('idempotency_key', flat=True)),
+                         ['batch:0', 'batch:2'])
+
+        # Repeated request gets results of the first one, nothing sent again
+        self.assertEqual(self.send_batch(receivers)['data'], response['data'])
+        self.assertEqual(self.connector.send.call_count, 2)
+
+    def test_failed_receiver(self):
+        self.connector.send.side_effect = [self.sent('hash_1'), error_response('invalid address'),
+                                           self.sent('hash_3')]
+
+        response = self.send_batch([{'id': 2}, {'address': 'vite_invalid'}, {'id': 2}])
+        self.assertEqual(self.results(response), [(0, 'send success'), (1, 'invalid address'), (0, 'send success')])
+
+    def test_busy(self):
+        with wallet_lock(self.wallet.address), self.settings(VITE_WALLET_LOCK_TIMEOUT=0.1):
+            response = self.send_batch([{'id': 2}, {'address': 'vite_external'}])
+
+        self.assertEqual(self.results(response), [(1, WALLET_BUSY_MSG)] * 2)
+        self.assertFalse(self.connector.send.called)
+
+    def test_mnemonics_error(self):
+        Wallet.objects.filter(address=self.wallet.address).update(mnemonics='plain words')
+
+        response = self.send_batch([{'id': 2}, {'address': 'vite_external'}])
+        self.assertEqual(self.results(response), [(1, MNEMONICS_ERROR_MSG)] * 2)
+        self.assertFalse(Transaction.objects.filter(status='pending').exists())
+
+    def test_error(self):
+        self.connector.send.side_effect = [self.sent('hash_1'), RuntimeError('broken'), self.sent('hash_3')]
+
+        response = self.send_batch([{'id': 2}, {'address': 'vite_external'}, {'id': 2}])
+        self.assertEqual(self.results(response), [(0, 'send success'), (1, SEND_UNKNOWN_MSG), (1, BATCH_STOPPED_MSG)])
+        self.assertFalse(Transaction.objects.filter(status='pending').exists())
+
+
+class KeysetPaginationTests(TestCase):
+    """Transactions of user 1, merged from its sender and receiver branches"""
+
+    def setUp(self):
+        registry.invalidate()
+        self.t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.wallets = {}
+        for id_ in range(1, 4):
+            user = TelegramUser.objects.create(id=id_, username=f"user_{id_}", first_name=f"user {id_}")
+            self.wallets[id_] = Wallet.objects.create(user=user, address=f"vite_{id_:050d}", mnemonics='')
+
+    def create(self, pairs: list, minute: int) -> list:
+        """Successful transactions (sender id, receiver id) at the same timestamp, return their ids"""
+        txs = [Transaction.objects.create(sender=self.wallets[sender], receiver=self.wallets[receiver],
+                                          token=registry.default(), amount=1, type_of='tip', status='success')
+               for sender, receiver in pairs]
+        ids = [tx.id for tx in txs]
+        Transaction.objects.filter(id__in=ids).update(timestamp=self.t0 + timedelta(minutes=minute))
+        return ids
+
+    def get(self, **params) -> dict:
+        params.setdefault('id', 1)
+        return self.client.get('/api/transactions/', params).json()
+
+    def test_cursor(self):
+        # Both branches at equal timestamps, self send is in both of them, 2 -> 3 is not of user 1
+        older = self.create([(1, 2), (2, 1), (3, 1)], minute=0)
+        newer = self.create([(1, 1), (2, 3), (1, 3), (2, 1)], minute=1)
+        expected = sorted(newer[:1] + newer[2:], reverse=True) + sorted(older, reverse=True)
+
+        pages, cursor = [], None
+        while True:
+            page = self.get(page_size=2, **({'cursor': cursor} if cursor else {}))
+            pages.append([tx['id'] for tx in page['results']])
+            cursor = page['next']
+            if not cursor:
+                break
+
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual([len(ids) for ids in pages], [2, 2, 2])
+
+    def test_last_page(self):
+        self.create([(1, 2), (2, 1)], minute=0)
+
+        page = self.get(page_size=2)
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNone(page['next'])
+
+        self.assertIsNone(self.get(page_size=3)['next'])
+        self.assertIsNotNone(self.get(page_size=1)['next'])
+
+    def test_since(self):
+        self.create([(1, 2), (2, 1)], minute=0)
+        since = self.get()['since']
+
+        # Nothing new yet, same position to sync from
+        page = self.get(since=since)
+        self.assertEqual((page['results'], page['next'], page['since']), ([], None, since))
+
+        # New ones at equal and later timestamps, oldest first
+        same = self.create([(3, 1)], minute=0)
+        later = self.create([(1, 3), (2, 1), (2, 3)], minute=1)
+
+        page = self.get(since=since, page_size=2)
+        self.assertEqual([tx['id'] for tx in page['results']], same + later[:1])
+        self.assertEqual(page['next'], page['since'])
+
+        page = self.get(since=page['next'], page_size=2)
+        self.assertEqual([tx['id'] for tx in page['results']], later[1:2])
+        self.assertIsNone(page['next'])
+
+        self.assertEqual(self.client.get('/api/transactions/', {'cursor': 'broken'}).status_code, 404)
+
+
+class TokenRegistryTests(TestCase):
+
+    def setUp(self):
+        registry.invalidate()
+        Token.objects.create(id='tti_test', name='Test', symbol='TST', decimals=2,
+                             max_supply='0', total_supply='0', owner_address='')
+
+    def test_prepare_amount(self):
+        registry.default()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(Transaction(token_id='tti_test', amount=Decimal('1.25')).prepare_amount(), 125)
+            self.assertEqual(Transaction(token=registry.default(), amount=Decimal('1.5')).prepare_amount(), 150000000)
+
+    def test_resolve(self):
+        self.assertEqual(registry.resolve({'token': 'tst'}).id, 'tti_test')
+        self.assertEqual(registry.resolve({}).symbol, 'EPIC')
+        self.assertIsNone(registry.resolve({'token_id': 'tti_unknown'}))
+
+
+class SendRateLimitTests(TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('vtm.models.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        for i in range(1, 3):
+            TelegramUser.objects.create(id=i, username=f"user_{i}", first_name=f"user {i}")
+
+    def sends(self, user_id: int, count: int) -> list:
+        return [TelegramUser.allow_send(user_id, burst=3, interval=10) for _ in range(count)]
+
+    def test_burst(self):
+        self.assertEqual(self.sends(1, 4), [True, True, True, False])
+
+    def test_interval(self):
+        self.sends(1, 3)
+
+        # One more send for each interval passed, not more
+        self.now += 9
+        self.assertEqual(self.sends(1, 1), [False])
+        self.now += 1
+        self.assertEqual(self.sends(1, 2), [True, False])
+
+        # Long idle sender gets whole burst again
+        self.now += 100
+        self.assertEqual(self.sends(1, 4), [True, True, True, False])
+
+    def test_users(self):
+        self.sends(1, 3)
+        self.assertEqual(self.sends(2, 4), [True, True, True, False])
+        self.assertFalse(TelegramUser.allow_send(1, burst=3, interval=10))
+        self.assertFalse(TelegramUser.allow_send(404, burst=3, interval=10))
+
+
+class KeyringTests(TestCase):
+
+    def setUp(self):
+        self.old_key, self.new_key = Fernet.generate_key(), Fernet.generate_key()
+        self.addCleanup(setattr, keyring, '_keyring', None)
+
+    def use_keys(self, *keys):
+        """Key-ring of `keys`, newest first"""
+        patcher = mock.patch('core.keyring.keys', return_value=list(keys))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        keyring._keyring = None
+
+    def create_wallets(self, mnemonics: list) -> list:
+        user = TelegramUser.objects.create(id=1, username='user_1', first_name='user 1')
+        Wallet.objects.bulk_create([Wallet(user=user, address=f"vite_{i:050d}", mnemonics=text)
+                                    for i, text in enumerate(mnemonics)])
+        return list(Wallet.objects.order_by('address').values_list('address', 'mnemonics'))
+
+    def test_two_keys(self):
+        self.use_keys(self.old_key)
+        old_token = keyring.encrypt('words')
+
+        self.use_keys(self.new_key, self.old_key)
+        new_token = keyring.encrypt('words')
+
+        # Any key decrypts, newest one encrypts
+        self.assertEqual(keyring.decrypt(old_token), 'words')
+        self.assertEqual(keyring.decrypt(new_token), 'words')
+        self.assertEqual(Fernet(self.new_key).decrypt(new_token.encode()), b'words')
+        self.assertTrue(keyring.is_current(new_token))
+        self.assertFalse(keyring.is_current(old_token))
+
+        rotated = keyring.rotate(old_token)
+        self.assertTrue(keyring.is_current(rotated))
+        self.assertEqual(keyring.decrypt(rotated), 'words')
+
+        with self.assertRaises(InvalidToken):
+            keyring.rotate(Fernet(Fernet.generate_key()).encrypt(b'words').decode())
+
+    def test_rotate_mnemonics(self):
+        self.use_keys(self.old_key)
+        wallets = self.create_wallets([keyring.encrypt(f"words {i}") for i in range(4)] + ['plain words'])
+        addresses = [address for address, _ in wallets]
+        self.use_keys(self.new_key, self.old_key)
+
+        def rotate(**options):
+            call_command('rotate_mnemonics', stdout=io.StringIO(), stderr=io.StringIO(), **options)
+            return dict(Wallet.objects.values_list('address', 'mnemonics'))
+
+        # Dry run writes nothing
+        self.assertEqual(rotate(dry_run=True), dict(wallets))
+
+        # Resumed run rotates only wallets after given address
+        stored = rotate(after=addresses[1])
+        self.assertEqual([keyring.is_current(stored[address]) for address in addresses[:4]],
+                         [False, False, True, True])
+
+        stored = rotate()
+        self.assertTrue(all(keyring.is_current(stored[address]) for address in addresses[:4]))
+        self.assertEqual([keyring.decrypt(stored[address]) for address in addresses[:4]],
+                         [f"words {i}" for i in range(4)])
+
+        # Not decrypted by any key, left as it was
+        self.assertEqual(stored[addresses[4]], 'plain words')
+
+        with self.assertRaises(MnemonicsError):
+            Wallet.objects.get(address=addresses[4]).decrypt_mnemonics()
+
+
+class RetryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('core.retry.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def ok():
+        return {'error': 0, 'msg': 'ok', 'data': {}}
+
+    def test_classify(self):
+        classify = RetryPolicy.classify
+        self.assertEqual(classify(self.ok()), SUCCESS)
+        self.assertEqual(classify(error_response('Request timed out')), RETRYABLE)
+        self.assertEqual(classify(error_response('Error: connect ECONNREFUSED')), RETRYABLE)
+        self.assertEqual(classify(error_response('prevHash is not equal')), RETRYABLE)
+        self.assertEqual(classify(error_response('Insufficient balance, timeout')), TERMINAL)
+        self.assertEqual(classify(error_response('Invalid address')), TERMINAL)
+        self.assertEqual(classify(error_response('something unexpected')), TERMINAL)
+
+        self.assertTrue(RetryPolicy.contention(error_response('No free node.js worker')))
+        self.assertTrue(RetryPolicy.contention(error_response('prevBlock mismatch')))
+        self.assertFalse(RetryPolicy.contention(error_response('Request timed out')))
+
+    def test_retry_until_success(self):
+        responses = [error_response('timeout'), error_response('socket hang up'), self.ok()]
+        timeouts = []
+
+        def fn(timeout):
+            timeouts.append(timeout)
+            return responses.pop(0)
+
+        with mock.patch('core.retry.time.sleep') as sleep:
+            response = RetryPolicy(attempts=3, timeout=5).call(fn, 'test', Deadline(20))
+
+        self.assertEqual(response, self.ok())
+        self.assertEqual(timeouts, [5, 5, 5])
+        self.assertEqual(sleep.call_count, 2)
+
+        # Terminal error is not retried
+        fn = mock.Mock(return_value=error_response('Invalid amount'))
+        self.assertEqual(RetryPolicy().call(fn, 'test')['msg'], 'Invalid amount')
+        self.assertEqual(fn.call_count, 1)
+
+    def test_backoff_under_deadline(self):
+        policy = RetryPolicy(attempts=5, base_delay=1, max_delay=4)
+
+        with mock.patch('core.retry.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([policy.backoff(attempt) for attempt in range(1, 5)], [1, 2, 4, 4])
+
+            # No retry when its backoff would not end before the deadline
+            fn = mock.Mock(return_value=error_response('timeout'))
+            with mock.patch('core.retry.time.sleep') as sleep:
+                response = policy.call(fn, 'test', Deadline(1.5))
+            self.assertEqual(response['msg'], 'test deadline exceeded (timeout)')
+            self.assertEqual(fn.call_count, 2)
+            self.assertEqual(sleep.call_args_list, [mock.call(1)])
+
+        # Attempt never gets more time than remains
+        deadline = Deadline(3)
+        self.now += 2
+        self.assertEqual(RetryPolicy(timeout=10).attempt_timeout(deadline), 1)
+        self.now += 2
+        self.assertTrue(deadline.expired)
+        self.assertEqual(RetryPolicy().call(fn, 'test', deadline)['msg'], 'test deadline exceeded')
+
+    def test_breaker(self):
+        breaker = CircuitBreaker('test', threshold=2, reset_timeout=30)
+        policy = RetryPolicy(attempts=1)
+        fail = mock.Mock(return_value=error_response('timeout'))
+
+        policy.call(fail, 'test', breaker=breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        policy.call(fail, 'test', breaker=breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # Open, fails fast without calling
+        self.assertIn('failed fast', policy.call(fail, 'test', breaker=breaker)['msg'])
+        self.assertEqual(fail.call_count, 2)
+
+        # Half-open lets one trial through, its failure opens again
+        self.now += 30
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record(False)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # Successful trial closes
+        self.now += 30
+        self.assertEqual(policy.call(lambda timeout: self.ok(), 'test', breaker=breaker), self.ok())
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.failures, 0)
+
+    def test_breaker_ignores_contention(self):
+        breaker = CircuitBreaker('test', threshold=1)
+        busy = mock.Mock(side_effect=[error_response('no free node.js worker'),
+                                      error_response('prevHash is not equal')])
+
+        with mock.patch('core.retry.time.sleep'):
+            RetryPolicy(attempts=2).call(busy, 'test', breaker=breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.failures, 0)
+
+    def test_trial_raised(self):
+        breaker = CircuitBreaker('test', threshold=1, reset_timeout=30)
+        breaker.record(False)
+        self.now += 30
+
+        def broken(timeout):
+            raise RuntimeError('broken')
+
+        with self.assertRaises(RuntimeError):
+            RetryPolicy().call(broken, 'test', breaker=breaker)
+
+        # Next trial is let through
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+
+
+class WalletLockTests(SimpleTestCase):
+    """Process local lanes, test database is not PostgreSQL"""
+
+    def test_same_address(self):
+        entered = threading.Event()
+
+        def send():
+            with wallet_lock('vite_a', timeout=5):
+                entered.set()
+
+        with wallet_lock('vite_a'):
+            thread = threading.Thread(target=send)
+            thread.start()
+            self.assertFalse(entered.wait(0.2))
+
+        thread.join()
+        self.assertTrue(entered.is_set())
+        self.assertEqual(len(locks._local_locks), 0)
+
+    def test_other_address(self):
+        entered = threading.Event()
+
+        def send():
+            with wallet_lock('vite_b', timeout=5):
+                entered.set()
+
+        with wallet_lock('vite_a'):
+            thread = threading.Thread(target=send)
+            thread.start()
+            self.assertTrue(entered.wait(5))
+        thread.join()
+
+    def test_busy(self):
+        busy = []
+
+        def send():
+            try:
+                with wallet_lock('vite_a', timeout=0.1):
+                    pass
+            except WalletBusy as e:
+                busy.append(e)
+
+        with wallet_lock('vite_a'):
+            thread = threading.Thread(target=send)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(len(busy), 1)
+        self.assertEqual(len(locks._local_locks), 0)
+
+    def test_async(self):
+        order = []
+
+        async def send(address: str, name: str, delay: float = 0.1, timeout: float = 5):
+            async with async_wallet_lock(address, timeout=timeout):
+                order.append(f"{name} start")
+                await asyncio.sleep(delay)
+                order.append(f"{name} end")
+
+        async def main():
+            await asyncio.gather(send('vite_a', 'a1'), send('vite_a', 'a2'), send('vite_b', 'b1', delay=0))
+
+            return await asyncio.gather(send('vite_a', 'a3', delay=0.3), send('vite_a', 'a4', timeout=0.1),
+                                        return_exceptions=True)
+
+        results = asyncio.run(main())
+
+        # Same address one after another, other address in between
+        self.assertEqual(order[:5], ['a1 start', 'b1 start', 'b1 end', 'a1 end', 'a2 start'])
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], WalletBusy)
+        self.assertNotIn('a4 start', order)
+        self.assertEqual(len(locks._async_locks), 0)
@@ -1,12 +1,28 @@
 from django.conf.urls import url
+from django.conf import settings
 from .views import *
 
 
-urlpatterns = [
+# Async (ASGI) versions, keep them before sync patterns with the same suffix.
+# Mounted only for ASGI deployment: under WSGI every async view runs in its own
+# short-lived event loop, which would start new node.js workers for each request.
+async_urlpatterns = [
+    url('async/update/', update_async, name='update-async'),
+    url('async/balances/', get_balances_async, name='get-balances-async'),
+    url('async/balance/', get_balance_async, name='get-balance-async'),
+    url('async/send_transaction/', send_transaction_async, name='send-transaction-async'),
+    url('async/send_batch/', send_batch_async, name='send-batch-async'),
+    url('async/transaction_status/', transaction_status_async, name='transaction-status-async'),
+    ]
+
+urlpatterns = (async_urlpatterns if getattr(settings, 'VITE_ASYNC_VIEWS', False) else []) + [
     url('update/', update, name='update'),
+    url('balances/', get_balances, name='get-balances'),
     url('balance/', get_balance, name='get-balance'),
     url('address/', get_address, name='get-address'),
     url('create_alias', AccountAliasCreateView.as_view(), name='create-alias'),
     url('send_transaction/', send_transaction, name='send-transaction'),
+    url('send_batch/', send_batch, name='send-batch'),
+    url('transaction_status/', transaction_status, name='transaction-status'),
 
     ]
@@ -1,32 +1,49 @@
 from django.views.generic import CreateView
+from django.conf import settings
+from asgiref.sync import sync_to_async
 from django.http import JsonResponse
+from rest_framework.exceptions import ValidationError
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets
+from django.db import IntegrityError, connection
 from django.db.models import Q
 
+import asyncio
+import uuid
 import json
+import time
 
 from .serializers import WalletSerializer, TransactionSerializer, AccountAliasSerializer
-from vtm.models import Token, TelegramUser
-from .models import Wallet, Transaction, AccountAlias
-from core.vite_connector import ViteConnector
+from vtm.tokens import registry as tokens
+from vtm.models import TelegramUser
+from .models import Wallet, Transaction, AccountAlias, MnemonicsError, MNEMONICS_ERROR_MSG
+from core.vite_connector import ViteConnector, AsyncViteConnector
+from core.retry import Deadline, error_response
+from core.locks import wallet_lock, async_wallet_lock, WalletBusy
 from core.logger_ import setup_logging
+from .receiver import auto_receive, unreceived_count
+from .outbox import outbox_enabled, IN_PROGRESS
+from .pagination import KeysetPagination
+from . import balance_cache
 
 
 logger = setup_logging(name=__name__, console_log_output="stdout", console_log_level="info", console_log_color=True,
                        logfile_file=__name__ + ".log", logfile_log_level="info", logfile_log_color=False,
                        log_line_template="%(color_on)s[%(asctime)s] [%(threadName)s] [%(levelname)-8s] %(message)s%(color_off)s")
 
-epic_details = {
-    'id': 'tti_f370fadb275bc2a1a839c753',
-    'name': 'Epic Cash',
-    'symbol': 'EPIC',
-    'decimals': 8,
-    'max_supply': '2100000 000000000',
-    'total_supply': '890000000000000',
-    'owner_address': 'vite_721a68f6ebd764e3f932832a05d87f8b1e8428393a0025bc72'
-    }
+# Seconds between database checks of long-polled transaction status
+STATUS_POLL_INTERVAL = 0.5
 
-epic, _ = Token.objects.get_or_create(**epic_details)
+# Sender rate limit: SEND_BURST transactions at once, then one per SEND_INTERVAL seconds
+SEND_BURST = getattr(settings, 'TIPBOT_SEND_BURST', 3)
+SEND_INTERVAL = getattr(settings, 'TIPBOT_SEND_INTERVAL', 2)
+
+# Max number of receivers of one send_batch request
+MAX_BATCH_RECEIVERS = getattr(settings, 'TIPBOT_MAX_BATCH_RECEIVERS', 20)
+
+WALLET_BUSY_MSG = "Wallet busy with other transactions, please try again."
+BATCH_STOPPED_MSG = "Transaction not sent, batch stopped by an error."
+SEND_UNKNOWN_MSG = "Transaction state unknown, please check it before sending again."
 
 
 class WalletView(viewsets.ModelViewSet):
@@ -57,6 +74,7 @@ class AccountAliasView(viewsets.ModelViewSet):
         queryset = AccountAlias.objects.all()
         address = self.request.query_params.get('address')
         title = self.request.query_params.get('title')
+        updated_since = self.request.query_params.get('updated_since')
 
         if address:
             queryset = queryset.filter(address=address)
@@ -64,29 +82,60 @@ class AccountAliasView(viewsets.ModelViewSet):
         if title:
             queryset = queryset.filter(title__iexact=title)
 
+        # Incremental sync of bot alias directory, `updated` of last alias is next `updated_since`
+        if updated_since:
+            since = parse_datetime(updated_since)
+
+            if not since:
+                raise ValidationError({'updated_since': 'Invalid ISO 8601 datetime'})
+
+            queryset = queryset.filter(updated__gte=since).order_by('updated')
+
         return queryset
 
 
 class TransactionView(viewsets.ModelViewSet):
+    """
+    Successful transactions of wallet `address`, TelegramUser `id` or `username`,
+    newest first, keyset paginated (see tipbot.pagination.KeysetPagination)
+    """
     serializer_class = TransactionSerializer
+    pagination_class = KeysetPagination
 
-    def get_queryset(self):
-        queryset = Transaction.objects.all()
-
+    def get_branches(self) -> list:
+        """
+        Filters of the query, one Q for each side of the transaction so every one
+        is backed by its own (sender / receiver / address, timestamp) index
+        """
         id = self.request.query_params.get('id')
         address = self.request.query_params.get('address')
         username = self.request.query_params.get('username')
 
+        logger.info(f"[{username, id, address}]: get_transactions api call")
+        branches = [Q()]
+
         if address:
-            queryset = queryset.filter(Q(sender__address=address) | Q(address=address))
-        if id:
-            queryset = queryset.filter(Q(sender__user__id=id) | Q(receiver__user__id=id))
-        if username:
-            queryset = queryset.filter(Q(sender__user__username__iexact=username) |
-                                       Q(receiver__user__username__ieaxact=username))
+            branches = [b & q for b in branches for q in (Q(sender_id=address), Q(address=address))]
 
-        logger.info(f"[{username, id, address}]: get_transactions api call")
-        return queryset.filter(status='success')
+        if id or username:
+            users = Q(user__id=id) if id else Q(user__username__iexact=username)
+            if id and username:
+                users &= Q(user__username__iexact=username)
+
+            wallets = list(Wallet.objects.filter(users).values_list('address', flat=True))
+            branches = [b & q for b in branches for q in (Q(sender_id__in=wallets), Q(receiver_id__in=wallets))]
+
+        return branches
+
+    def get_queryset(self):
+        return Transaction.objects.filter(status='success').select_related('sender', 'receiver')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        branches = [queryset.filter(q) for q in self.get_branches()]
+        page = self.paginator.paginate_branches(branches, request)
+
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
 
 class AccountAliasCreateView(CreateView):
@@ -115,32 +164,65 @@ class AccountAliasCreateView(CreateView):
         return JsonResponse(response)
 
 
-def send_transaction(request):
+def _deadline(request) -> Deadline:
+    """Time budget for all VITE calls made while serving this request"""
+    return Deadline.from_request(request, default=getattr(settings, 'VITE_REQUEST_DEADLINE', 90))
+
+
+def _status_response(tx: Transaction) -> dict:
+    """send_transaction / transaction_status response for Transaction in any status"""
+    if tx.status == 'failed':
+        return {'error': 1, 'msg': tx.data.get('error', 'send failed'), 'data': None}
+
+    msg = 'send success' if tx.status == 'success' else f"send {tx.status}"
+    return {'error': 0, 'msg': msg, 'data': dict(tx.data, id=tx.id, status=tx.status)}
+
+
+def _prepare_transaction(data: dict, status: str = 'pending') -> tuple:
     """
-    End-point for POST request with TelegramUser and Transaction data to send
+    Validate send request data, create and save Transaction to database.
+    Request repeated with the same `idempotency_key` gets status of the
+    first one instead of creating another Transaction.
+    :return: tuple(Transaction or None, sender TelegramUser, error response or None)
     """
-    data = json.loads(request.body)
+    key = data.get('idempotency_key')
+    existing = Transaction.objects.filter(idempotency_key=key).first() if key else None
+
+    if existing:
+        return None, None, _status_response(existing)
+
     sender = TelegramUser.objects.filter(id=data['sender']['id']).first()
     sender_wallet = sender.wallet.first()
 
-    # Prevent accidental multiple transactions
+    # Account locked by admin
     if sender.locked:
-        response = {'error': 1, 'msg': f"Too many transactions, please wait 5 seconds.", 'data': None}
-        # logger.error(f"[{data['sender']}]: {response['msg']}")
-        return JsonResponse(response)
+        response = {'error': 1, 'msg': f"Account locked.", 'data': None}
+        return None, sender, response
 
     # If something is wrong with the amount
     if not data['amount']:
         response = {'error': 1, 'msg': f"invalid amount", 'data': None}
         # logger.error(f"[{sender}]: {response['msg']}")
-        return JsonResponse(response)
+        return None, sender, response
+
+    # Token to send, EPIC by default
+    token = tokens.resolve(data)
+    if not token:
+        return None, sender, error_response("unknown token")
+
+    # Prevent accidental multiple transactions / spam
+    if not TelegramUser.allow_send(sender.id, SEND_BURST, SEND_INTERVAL):
+        response = {'error': 1, 'msg': f"Too many transactions, please wait {SEND_INTERVAL} seconds.", 'data': None}
+        return None, sender, response
 
     tx_params = {
         'sender': sender_wallet,
-        'token': epic,
+        'token': token,
         'amount': data['amount'],
         'type_of': data['type_of'],
-        'network': data['network']
+        'network': data['network'],
+        'status': status,
+        'idempotency_key': key,
         }
 
     # Handle withdraw transaction (address as receiver)
@@ -152,49 +234,326 @@ def send_transaction(request):
         if 'address' in data['receiver'].keys():
             tx_params.update({'address': data['receiver']['address']})
         else:
-            receiver = TelegramUser.objects.filter(id=data['receiver']['id']).first()
-            tx_params.update({'receiver': receiver.wallet.first()})
+            receiver = Wallet.objects.select_related('user').filter(user__id=data['receiver']['id']).first()
+            tx_params.update({'receiver': receiver})
 
     # Create and save Transaction to database
-    tx = Transaction.objects.create(**tx_params)
+    try:
+        tx = Transaction.objects.create(**tx_params)
+    except IntegrityError:
+        # Same idempotency_key created by concurrent request
+        return None, sender, _status_response(Transaction.objects.get(idempotency_key=key))
 
-    # Prepare and execute back-end Vite.js script
-    tx_params = {
-        'mnemonics': tx.sender.decrypt_mnemonics(),
-        'address_id': 0,
-        'to_address': tx.prepare_address(),
-        'token_id': tx.token.id,
-        'amount': tx.prepare_amount()
-        }
-    # transaction = js_handler.send(**tx_params)
-    provider = ViteConnector(logger=logger)
-    transaction = provider.send(**tx_params)
-
-    # Update tx status and network transaction data:
-    # if success save tx hash, else error msg.
-    if not transaction['error']:
-        tx.data = {'hash': transaction['data']['hash']}
-        tx.status = 'success'
-        tx.save()
-        logger.info(f"tipbot::views::send_transaction() - {tx}")
+    return tx, sender, None
 
-        # Lock account to prevent spam/unwanted transactions
-        sender.temp_lock()
 
-        tx = TransactionSerializer(tx)
-        response = {'error': 0, 'msg': 'send success', 'data': tx.data['data']}
+def _finish_transaction(tx: Transaction, sender: TelegramUser, transaction: dict) -> dict:
+    """
+    Update tx status and network transaction data:
+    if success save tx hash, else error msg.
+    :return: send_transaction response
+    """
+    tx.set_result(transaction)
 
+    if tx.status == 'success':
+        logger.info(f"tipbot::views::send_transaction() - {tx}")
     else:
-        # Update transaction status in database and prepare failed response
-        tx.status = 'failed'
-        tx.data = {'error': transaction['msg']}
-        tx.save()
-        response = {'error': 1, 'msg': transaction['msg'], 'data': None}
-        logger.warning(f"tipbot::views::send_transaction() - {response['msg']}")
+        logger.warning(f"tipbot::views::send_transaction() - {transaction['msg']}")
+
+    return _status_response(tx)
+
+
+def _transaction_data(request) -> dict:
+    data = json.loads(request.body)
+    data.setdefault('idempotency_key', request.headers.get('Idempotency-Key'))
+    return data
+
+
+def send_transaction(request):
+    """
+    End-point for POST request with TelegramUser and Transaction data to send,
+    in outbox mode (VITE_SEND_OUTBOX) transaction is only queued for run_outbox
+    workers and its result is available from transaction_status end-point.
+    """
+    data = _transaction_data(request)
+    tx, sender, response = _prepare_transaction(data, status='queued' if outbox_enabled() else 'pending')
+
+    if response:
+        return JsonResponse(response)
+
+    if tx.status == 'queued':
+        return JsonResponse(_status_response(tx))
+
+    # Prepare and execute back-end Vite.js script
+    provider = ViteConnector(logger=logger, deadline=_deadline(request))
+
+    # Sends from one wallet run one after another, also across processes
+    try:
+        with wallet_lock(tx.sender.address):
+            transaction = provider.send(**tx.send_params())
+    except WalletBusy:
+        transaction = error_response(WALLET_BUSY_MSG)
+    except MnemonicsError as e:
+        logger.error(f"tipbot::views::send_transaction() - {e}")
+        transaction = error_response(MNEMONICS_ERROR_MSG)
+
+    return JsonResponse(_finish_transaction(tx, sender, transaction))
+
+
+async def send_transaction_async(request):
+    """
+    Async version of send_transaction() for ASGI deployment,
+    waits for the VITE network without blocking a worker thread.
+    """
+    data = _transaction_data(request)
+    status = 'queued' if outbox_enabled() else 'pending'
+    tx, sender, response = await sync_to_async(_prepare_transaction)(data, status)
+
+    if response:
+        return JsonResponse(response)
+
+    if tx.status == 'queued':
+        return JsonResponse(_status_response(tx))
+
+    provider = AsyncViteConnector(logger=logger, deadline=_deadline(request))
+
+    try:
+        params = await sync_to_async(tx.send_params)()
+        async with async_wallet_lock(params['address']):
+            transaction = await provider.send(**params)
+    except WalletBusy:
+        transaction = error_response(WALLET_BUSY_MSG)
+    except MnemonicsError as e:
+        logger.error(f"tipbot::views::send_transaction_async() - {e}")
+        transaction = error_response(MNEMONICS_ERROR_MSG)
+    response = await sync_to_async(_finish_transaction)(tx, sender, transaction)
 
     return JsonResponse(response)
 
 
+def _batch_results(txs: list, keys: list) -> list:
+    """Per receiver responses of send_batch, in order of receivers"""
+    by_key = {tx.idempotency_key: tx for tx in txs}
+    return [_status_response(by_key[key]) if key in by_key
+            else {'error': 1, 'msg': 'no account', 'data': None} for key in keys]
+
+
+def _batch_response(results: list) -> dict:
+    success = len([r for r in results if not r['error']])
+    return {'error': 0, 'msg': f"send_batch success: {success}/{len(results)}", 'data': results}
+
+
+def _prepare_batch(data: dict, status: str = 'pending') -> tuple:
+    """
+    Validate send_batch request data, resolve all receiver wallets with one query
+    and create Transaction for each receiver with one bulk_create. Each Transaction
+    gets '<batch key>:<receiver index>' idempotency key, request repeated with the
+    same `idempotency_key` gets results of the first one.
+    :return: tuple(list of Transaction, list of keys, error response or None)
+    """
+    receivers = data.get('receivers') or []
+    batch_key = data.get('idempotency_key') or uuid.uuid4().hex
+    keys = [f"{batch_key}:{i}" for i in range(len(receivers))]
+
+    if not receivers:
+        return [], keys, error_response("no receivers")
+
+    if len(receivers) > MAX_BATCH_RECEIVERS:
+        return [], keys, error_response(f"Too many receivers: {len(receivers)}, max: {MAX_BATCH_RECEIVERS}")
+
+    existing = list(Transaction.objects.filter(idempotency_key__in=keys))
+
+    if existing:
+        return existing, keys, None
+
+    sender = TelegramUser.objects.filter(id=data['sender']['id']).first()
+    sender_wallet = sender.wallet.first() if sender else None
+
+    if not sender_wallet:
+        return [], keys, error_response("no account")
+
+    if sender.locked:
+        return [], keys, error_response("Account locked.")
+
+    if not data['amount']:
+        return [], keys, error_response("invalid amount")
+
+    token = tokens.resolve(data)
+    if not token:
+        return [], keys, error_response("unknown token")
+
+    # Whole batch counts as one send of the rate limit
+    if not TelegramUser.allow_send(sender.id, SEND_BURST, SEND_INTERVAL):
+        return [], keys, error_response(f"Too many transactions, please wait {SEND_INTERVAL} seconds.")
+
+    # Receiver wallets, one query for all TelegramUser receivers
+    ids = [r['id'] for r in receivers if 'address' not in r]
+    wallets = {}
+    for wallet in Wallet.objects.select_related('user').filter(user__id__in=ids):
+        wallets.setdefault(wallet.user_id, wallet)
+
+    txs = []
+    for key, receiver in zip(keys, receivers):
+        tx_params = {'address': receiver['address']} if 'address' in receiver \
+            else {'receiver': wallets.get(receiver['id'])}
+
+        # Receivers without account get error response, no Transaction
+        if not any(tx_params.values()):
+            continue
+
+        txs.append(Transaction(sender=sender_wallet, token=token, amount=data['amount'],
+                               type_of=data['type_of'], network=data['network'],
+                               status=status, idempotency_key=key, **tx_params))
+
+    try:
+        Transaction.objects.bulk_create(txs)
+    except IntegrityError:
+        # Same idempotency_key created by concurrent request
+        return list(Transaction.objects.filter(idempotency_key__in=keys)), keys, None
+
+    # Primary keys are not returned by bulk_create on every database backend,
+    # saved rows are sent in order of receivers
+    if not connection.features.can_return_rows_from_bulk_insert:
+        saved = {tx.idempotency_key: tx for tx in Transaction.objects.filter(idempotency_key__in=keys)}
+        txs = [saved[tx.idempotency_key] for tx in txs]
+
+    return txs, keys, None
+
+
+def _stop_batch(pending: list, current: Transaction):
+    """Fail batch transactions left pending by unexpected error, `current` one was being sent"""
+    for tx in pending:
+        if tx.status == 'pending':
+            tx.set_result(error_response(SEND_UNKNOWN_MSG if tx is current else BATCH_STOPPED_MSG))
+
+
+def send_batch(request):
+    """
+    End-point for POST request sending the same amount from one sender to many
+    `receivers` (TelegramUser params or {'address': ...}). Transactions are sent
+    one right after another on the sender wallet lane, held for the whole batch,
+    previous account block of each comes from the one sent before it
+    (core.vite_connector.account_state).
+    :return: response with list of send_transaction responses, one for each receiver
+    """
+    data = _transaction_data(request)
+    txs, keys, response = _prepare_batch(data, status='queued' if outbox_enabled() else 'pending')
+
+    if response:
+        return JsonResponse(response)
+
+    pending = [tx for tx in txs if tx.status == 'pending']
+
+    if pending:
+        provider = ViteConnector(logger=logger, deadline=_deadline(request))
+        sender = pending[0].sender
+        current = None
+
+        try:
+            with wallet_lock(sender.address):
+                for tx in pending:
+                    current = tx
+                    _finish_transaction(tx, sender.user, provider.send(**tx.send_params()))
+        except WalletBusy:
+            for tx in pending:
+                tx.set_result(error_response(WALLET_BUSY_MSG))
+        except MnemonicsError as e:
+            # Raised by the first send, all transactions share the sender
+            logger.error(f"tipbot::views::send_batch() - {e}")
+            for tx in pending:
+                tx.set_result(error_response(MNEMONICS_ERROR_MSG))
+        except Exception as e:
+            logger.error(f"tipbot::views::send_batch() - {e!r}")
+            _stop_batch(pending, current)
+
+    return JsonResponse(_batch_response(_batch_results(txs, keys)))
+
+
+async def send_batch_async(request):
+    """Async version of send_batch() for ASGI deployment"""
+    data = _transaction_data(request)
+    status = 'queued' if outbox_enabled() else 'pending'
+    txs, keys, response = await sync_to_async(_prepare_batch)(data, status)
+
+    if response:
+        return JsonResponse(response)
+
+    pending = [tx for tx in txs if tx.status == 'pending']
+
+    if pending:
+        provider = AsyncViteConnector(logger=logger, deadline=_deadline(request))
+        current = None
+
+        try:
+            params = [await sync_to_async(tx.send_params)() for tx in pending]
+            async with async_wallet_lock(params[0]['address']):
+                for tx, tx_params in zip(pending, params):
+                    current = tx
+                    transaction = await provider.send(**tx_params)
+                    await sync_to_async(_finish_transaction)(tx, None, transaction)
+        except WalletBusy:
+            for tx in pending:
+                await sync_to_async(tx.set_result)(error_response(WALLET_BUSY_MSG))
+        except MnemonicsError as e:
+            logger.error(f"tipbot::views::send_batch_async() - {e}")
+            for tx in pending:
+                await sync_to_async(tx.set_result)(error_response(MNEMONICS_ERROR_MSG))
+        except Exception as e:
+            logger.error(f"tipbot::views::send_batch_async() - {e!r}")
+            await sync_to_async(_stop_batch)(pending, current)
+
+    return JsonResponse(_batch_response(_batch_results(txs, keys)))
+
+
+def _find_transaction(payload: dict):
+    if 'id' in payload:
+        return Transaction.objects.filter(id=payload['id']).first()
+    elif 'idempotency_key' in payload:
+        return Transaction.objects.filter(idempotency_key=payload['idempotency_key']).first()
+
+
+def _status_wait(payload: dict) -> float:
+    """Seconds to hold the request while transaction is in progress"""
+    return min(float(payload.get('wait', 0)), getattr(settings, 'VITE_STATUS_MAX_WAIT', 30))
+
+
+def transaction_status(request):
+    """
+    End-point for POST request with Transaction `id` or `idempotency_key`,
+    with `wait` seconds response is held until transaction is sent or failed (long-polling)
+    """
+    payload = json.loads(request.body)
+    tx = _find_transaction(payload)
+
+    if not tx:
+        return JsonResponse({'error': 1, 'msg': 'invalid transaction', 'data': None})
+
+    deadline = time.monotonic() + _status_wait(payload)
+
+    while tx.status in IN_PROGRESS and time.monotonic() < deadline:
+        time.sleep(STATUS_POLL_INTERVAL)
+        tx.refresh_from_db(fields=['status', 'data'])
+
+    return JsonResponse(_status_response(tx))
+
+
+async def transaction_status_async(request):
+    """Async version of transaction_status(), long-polling does not hold a worker thread"""
+    payload = json.loads(request.body)
+    tx = await sync_to_async(_find_transaction)(payload)
+
+    if not tx:
+        return JsonResponse({'error': 1, 'msg': 'invalid transaction', 'data': None})
+
+    deadline = time.monotonic() + _status_wait(payload)
+
+    while tx.status in IN_PROGRESS and time.monotonic() < deadline:
+        await asyncio.sleep(STATUS_POLL_INTERVAL)
+        await sync_to_async(tx.refresh_from_db)(fields=['status', 'data'])
+
+    return JsonResponse(_status_response(tx))
+
+
 def get_address(request):
     """
     End-point for POST request with TelegramUser
@@ -212,6 +571,18 @@ def get_address(request):
     return JsonResponse(response)
 
 
+def _update_wallet(payload: dict):
+    """Find Wallet to receive pending transactions for"""
+    return Wallet.objects.filter(Q(user__id=payload['id']) |
+                                 Q(address=payload['address'])).first()
+
+
+def _receive_status(wallet: Wallet) -> dict:
+    """Update response from saved wallet balance when run_receiver service is receiving"""
+    pending = unreceived_count(wallet.balance)
+    return {'error': 0, 'msg': f"auto receive, {pending} pending transactions", 'data': {'unreceived': pending}}
+
+
 def update(request):
     """
     End-point for POST request with TelegramUser
@@ -220,30 +591,54 @@ def update(request):
     payload = json.loads(request.body)
     logger.info(f"tipbot::views::get_update_balance({payload})")
 
-    wallet = Wallet.objects.filter(Q(user__id=payload['id']) |
-                                   Q(address=payload['address'])).first()
+    wallet = _update_wallet(payload)
     response = {'error': 1, 'msg': 'invalid wallet', 'data': None}
 
     if not wallet: return JsonResponse(response)
+    if auto_receive(): return JsonResponse(_receive_status(wallet))
 
-    # js_handler.update_(mnemonics=wallet.decrypt_mnemonics(), timeout=timeout)
-    params = {'mnemonics': wallet.decrypt_mnemonics(), 'address_id': 0}
-    provider = ViteConnector(logger=logger)
+    try:
+        params = {'mnemonics': wallet.decrypt_mnemonics(), 'address_id': 0}
+    except MnemonicsError as e:
+        logger.error(f"tipbot::views::update() - {e}")
+        return JsonResponse(error_response(MNEMONICS_ERROR_MSG))
+
+    provider = ViteConnector(logger=logger, deadline=_deadline(request))
     provider.update(**params)
+    balance_cache.invalidate(wallet.address)
 
     return JsonResponse(provider.update_response)
 
 
-def get_balance(request):
-    """
-    End-point for POST request with TelegramUser
-    data to retrieve wallet balance from network
-    """
+async def update_async(request):
+    """Async version of update() for ASGI deployment"""
+    payload = json.loads(request.body)
+    logger.info(f"tipbot::views::update_async({payload})")
+
+    wallet = await sync_to_async(_update_wallet)(payload)
     response = {'error': 1, 'msg': 'invalid wallet', 'data': None}
 
-    payload = json.loads(request.body)
-    logger.info(f"tipbot::views::get_balance({payload})")
+    if not wallet: return JsonResponse(response)
+    if auto_receive(): return JsonResponse(_receive_status(wallet))
+
+    try:
+        params = {'mnemonics': wallet.decrypt_mnemonics(), 'address_id': 0}
+    except MnemonicsError as e:
+        logger.error(f"tipbot::views::update_async() - {e}")
+        return JsonResponse(error_response(MNEMONICS_ERROR_MSG))
 
+    provider = AsyncViteConnector(logger=logger, deadline=_deadline(request))
+    await provider.update(**params)
+    await sync_to_async(balance_cache.invalidate)(wallet.address)
+
+    return JsonResponse(provider.update_response)
+
+
+def _balance_wallet(payload: dict) -> tuple:
+    """
+    Find Wallet and ViteConnector.balance() params for balance request
+    :return: tuple(Wallet or None, params dict or None)
+    """
     if 'id' in payload:
         wallet = Wallet.objects.filter(user__id=payload['id']).first()
     elif 'address' in payload:
@@ -256,17 +651,169 @@ def get_balance(request):
     elif not wallet and 'address' in payload:
         params = {'address': payload['address']}
     else:
+        params = None
+
+    return wallet, params
+
+
+def _save_balance(wallet: Wallet, address: str, balance_response: dict) -> dict:
+    """Cache fresh network balance, save it to Wallet if changed and prepare get_balance response"""
+    balance_cache.save(address, balance_response['data'])
+    tokens.register_balance(balance_response['data'])
+
+    if wallet and wallet.balance != balance_response['data']:
+        wallet.balance = balance_response['data']
+        wallet.save(update_fields=['balance'])
+
+    return {'error': 0, 'msg': 'success', 'data': balance_response['data']}
+
+
+def _cached_balance(params: dict, payload: dict) -> dict:
+    """get_balance response from balance cache, None when missing or older than `max_age`"""
+    balance = balance_cache.get(params['address'], balance_cache.max_age(payload))
+
+    if balance is not None:
+        return {'error': 0, 'msg': 'success', 'data': balance}
+
+
+def get_balance(request):
+    """
+    End-point for POST request with TelegramUser
+    data to retrieve wallet balance from network,
+    balance cached within `max_age` seconds (VITE_BALANCE_CACHE_TTL at most) is
+    returned without network call, max_age=0 always asks the network
+    """
+    response = {'error': 1, 'msg': 'invalid wallet', 'data': None}
+
+    payload = json.loads(request.body)
+    logger.info(f"tipbot::views::get_balance({payload})")
+
+    wallet, params = _balance_wallet(payload)
+
+    if not params:
         return JsonResponse(response)
 
-    provider = ViteConnector(logger=logger)
+    cached = _cached_balance(params, payload)
+    if cached:
+        return JsonResponse(cached)
+
+    provider = ViteConnector(logger=logger, deadline=_deadline(request))
     provider.balance(**params)
 
     if provider.balance_response['error']:
         return JsonResponse(provider.balance_response)
 
-    if wallet:
-        wallet.balance = provider.balance_response['data']
-        wallet.save()
+    return JsonResponse(_save_balance(wallet, params['address'], provider.balance_response))
+
+
+async def get_balance_async(request):
+    """Async version of get_balance() for ASGI deployment"""
+    response = {'error': 1, 'msg': 'invalid wallet', 'data': None}
+
+    payload = json.loads(request.body)
+    logger.info(f"tipbot::views::get_balance_async({payload})")
+
+    wallet, params = await sync_to_async(_balance_wallet)(payload)
+
+    if not params:
+        return JsonResponse(response)
+
+    cached = await sync_to_async(_cached_balance)(params, payload)
+    if cached:
+        return JsonResponse(cached)
+
+    provider = AsyncViteConnector(logger=logger, deadline=_deadline(request))
+    await provider.balance(**params)
+
+    if provider.balance_response['error']:
+        return JsonResponse(provider.balance_response)
+
+    response = await sync_to_async(_save_balance)(wallet, params['address'], provider.balance_response)
+    return JsonResponse(response)
+
+
+def _balances_wallets(payload: dict) -> tuple:
+    """
+    Resolve addresses and TelegramUser ids from balances request with one query
+    :return: tuple(list of Wallets, list of addresses, dict {user_id: address})
+    """
+    addresses = [str(address) for address in payload.get('addresses', [])]
+    ids = [int(id_) for id_ in payload.get('ids', [])]
+
+    wallets = list(Wallet.objects.filter(Q(address__in=addresses) | Q(user__id__in=ids)))
+    users = {wallet.user_id: wallet.address for wallet in wallets if wallet.user_id in ids}
+    addresses = list(dict.fromkeys(addresses + list(users.values())))
+
+    return wallets, addresses, users
+
+
+def _save_balances(wallets: list, balances_response: dict, users: dict) -> dict:
+    """Cache fresh network balances, save changed ones to Wallets with one UPDATE query
+    and prepare get_balances response"""
+    balances = balances_response['data']
+    updated = []
+
+    balance_cache.save_many({address: balance for address, balance in balances.items()
+                             if balance and not balance.get('error')})
+
+    for balance in balances.values():
+        if balance and not balance.get('error'):
+            tokens.register_balance(balance)
+
+    for wallet in wallets:
+        balance = balances.get(wallet.address)
+        if balance and not balance.get('error') and balance != wallet.balance:
+            wallet.balance = balance
+            updated.append(wallet)
+
+    Wallet.objects.bulk_update(updated, ['balance'])
+
+    return {'error': 0, 'msg': 'success', 'data': {'balances': balances, 'users': users}}
+
+
+def get_balances(request):
+    """
+    End-point for POST request with list of VITE `addresses` and / or
+    TelegramUser `ids` to retrieve many wallet balances from network at once
+    """
+    response = {'error': 1, 'msg': 'no valid wallets', 'data': None}
+
+    payload = json.loads(request.body)
+    logger.info(f"tipbot::views::get_balances({len(payload.get('addresses', []))} addresses, "
+                f"{len(payload.get('ids', []))} ids)")
+
+    wallets, addresses, users = _balances_wallets(payload)
+
+    if not addresses:
+        return JsonResponse(response)
+
+    provider = ViteConnector(logger=logger, deadline=_deadline(request))
+    provider.balance_many(addresses)
+
+    if provider.balance_response['error']:
+        return JsonResponse(provider.balance_response)
+
+    return JsonResponse(_save_balances(wallets, provider.balance_response, users))
+
+
+async def get_balances_async(request):
+    """Async version of get_balances() for ASGI deployment"""
+    response = {'error': 1, 'msg': 'no valid wallets', 'data': None}
+
+    payload = json.loads(request.body)
+    logger.info(f"tipbot::views::get_balances_async({len(payload.get('addresses', []))} addresses, "
+                f"{len(payload.get('ids', []))} ids)")
+
+    wallets, addresses, users = await sync_to_async(_balances_wallets)(payload)
+
+    if not addresses:
+        return JsonResponse(response)
+
+    provider = AsyncViteConnector(logger=logger, deadline=_deadline(request))
+    await provider.balance_many(addresses)
+
+    if provider.balance_response['error']:
+        return JsonResponse(provider.balance_response)
 
-    response = {'error': 0, 'msg': 'success', 'data': provider.balance_response['data']}
+    response = await sync_to_async(_save_balances)(wallets, provider.balance_response, users)
     return JsonResponse(response)
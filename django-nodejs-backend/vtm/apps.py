@@ -1,6 +1,36 @@
+from django.db.models.signals import post_migrate
 from django.apps import AppConfig
+from django.db import connections
+
+
+# Trigram indexes for partial (icontains) user search, Django lookups
+# compare UPPER(column::text) so indexes are built on the same expression
+TRIGRAM_INDEXES = {
+    'user_username_trgm': ('vtm_telegramuser', 'username'),
+    'user_first_name_trgm': ('vtm_telegramuser', 'first_name'),
+    }
+
+
+def create_trigram_indexes(using: str = 'default', **kwargs):
+    """post_migrate handler, PostgreSQL only (pg_trgm extension)"""
+    connection = connections[using]
+
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+        for name, (table, column) in TRIGRAM_INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+                           f'USING gin (UPPER("{column}"::text) gin_trgm_ops)')
 
 
 class VtmConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vtm'
+
+    def ready(self):
+        from . import tokens  # noqa: connect token registry signals
+
+        post_migrate.connect(create_trigram_indexes, sender=self)
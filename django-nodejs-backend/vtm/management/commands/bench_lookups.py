@@ -0,0 +1,144 @@
+from statistics import median
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from tipbot.pagination import KeysetPagination
+from tipbot.models import Wallet, Transaction, AccountAlias
+from vtm.models import TelegramUser
+
+
+# Generated rows are recognised by these, so they can be removed afterwards
+BENCH_ID_START = 9 * 10 ** 15
+BENCH_PREFIX = 'bench'
+
+FIRST_NAMES = ['Alice', 'Bob', 'Carol', 'Dave', 'Eve', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy']
+LAST_NAMES = ['Smith', 'Jones', 'Brown', 'Taylor', 'Wilson', 'Davies', 'Evans', 'Thomas', 'Roberts', 'Walker']
+
+
+def bench_address(n: int) -> str:
+    return f"vite_{BENCH_PREFIX}{n:045x}"
+
+
+class Command(BaseCommand):
+    help = "Generate benchmark users, aliases and transactions, report query plans " \
+           "and latencies of user / alias / transaction lookups made by API views"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000, help="generated TelegramUsers")
+        parser.add_argument('--wallets', type=int, default=10_000, help="users with wallet and transactions")
+        parser.add_argument('--transactions', type=int, default=200_000, help="generated transactions")
+        parser.add_argument('--aliases', type=int, default=10_000, help="generated account aliases")
+        parser.add_argument('--batch', type=int, default=10_000, help="rows in one INSERT")
+        parser.add_argument('--repeat', type=int, default=20, help="runs of each lookup")
+        parser.add_argument('--keep', action='store_true', help="keep generated data (skip generating next time)")
+
+    def handle(self, *args, **options):
+        if not TelegramUser.objects.filter(id__gte=BENCH_ID_START).exists():
+            self.generate(**options)
+
+        try:
+            for name, querysets in self.lookups(options['users'], options['wallets'], options['aliases']):
+                self.report(name, querysets, options['repeat'])
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def _bulk(self, model, rows, batch: int):
+        for i in range(0, len(rows), batch):
+            model.objects.bulk_create(rows[i:i + batch])
+
+    def generate(self, users: int, wallets: int, transactions: int, aliases: int, batch: int, **kwargs):
+        started = time.monotonic()
+        wallets = min(wallets, users)
+
+        for i in range(0, users, batch):
+            TelegramUser.objects.bulk_create([
+                TelegramUser(id=BENCH_ID_START + n, username=f"{BENCH_PREFIX}_user_{n}", password='',
+                             first_name=f"{random.choice(FIRST_NAMES)}{n}", last_name=random.choice(LAST_NAMES))
+                for n in range(i, min(i + batch, users))])
+
+        self._bulk(Wallet, [Wallet(address=bench_address(n), user_id=BENCH_ID_START + n)
+                            for n in range(wallets)], batch)
+
+        self._bulk(AccountAlias, [AccountAlias(title=f"{BENCH_PREFIX}_alias_{n}", address=bench_address(n % wallets))
+                                  for n in range(aliases)], batch)
+
+        self._bulk(Transaction, [Transaction(sender_id=bench_address(random.randrange(wallets)),
+                                             receiver_id=bench_address(random.randrange(wallets)),
+                                             amount=1, type_of='tip', status='success')
+                                 for _ in range(transactions)], batch)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        self.stdout.write(f"generated {users} users, {wallets} wallets, {aliases} aliases, "
+                          f"{transactions} transactions in {time.monotonic() - started:.1f}s")
+
+    @staticmethod
+    def user_transactions(user_id: int) -> list:
+        """
+        Queries of TransactionView first page for TelegramUser `id`: wallets of the user,
+        then one keyset page of each side (see tipbot.pagination.KeysetPagination)
+        """
+        wallets = Wallet.objects.filter(user__id=user_id).values_list('address', flat=True)
+        addresses = list(wallets)
+        transactions = Transaction.objects.filter(status='success').select_related('sender', 'receiver')
+        size = KeysetPagination.page_size
+
+        return [wallets] + [transactions.filter(q).order_by('-timestamp', '-id')[:size + 1]
+                            for q in (Q(sender_id__in=addresses), Q(receiver_id__in=addresses))]
+
+    def lookups(self, users: int, wallets: int, aliases: int):
+        """(name, querysets) pairs of lookups made by TelegramUserView, AccountAliasView and TransactionView"""
+        user = random.randrange(users)
+        wallet_user = BENCH_ID_START + random.randrange(min(wallets, users))
+        users_ = TelegramUser.objects.all()
+
+        return [
+            ('username iexact', [users_.filter(username__iexact=f"{BENCH_PREFIX.upper()}_USER_{user}")]),
+            ('first_name iexact', [users_.filter(first_name__iexact=f"alice{user}")]),
+            ('last_name iexact', [users_.filter(last_name__iexact='smith')[:20]]),
+            ('part_username icontains', [users_.filter(Q(username__icontains=f"user_{user}") |
+                                                       Q(first_name__icontains=f"{user}"))[:20]]),
+            ('alias title iexact', [AccountAlias.objects.filter(
+                title__iexact=f"{BENCH_PREFIX.upper()}_ALIAS_{random.randrange(max(aliases, 1))}")]),
+            ('transactions of user', self.user_transactions(wallet_user)),
+            ]
+
+    def report(self, name: str, querysets: list, repeat: int):
+        """Time all queries of one lookup together, print plan of each"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for queryset in querysets:
+                list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(f"\n{name}: median {median(timings):.2f} ms | p95 {p95:.2f} ms"))
+
+        analyze = {'analyze': True} if connection.vendor == 'postgresql' else {}
+        for queryset in querysets:
+            self.stdout.write(queryset.explain(**analyze))
+
+    def cleanup(self):
+        """Remove generated rows with plain DELETEs, ORM cascade would load them all"""
+        like = f"vite_{BENCH_PREFIX}%"
+        statements = [
+            (f"DELETE FROM {Transaction._meta.db_table} WHERE sender_id LIKE %s OR receiver_id LIKE %s", [like, like]),
+            (f"DELETE FROM {AccountAlias._meta.db_table} WHERE title LIKE %s", [f"{BENCH_PREFIX}_alias_%"]),
+            (f"DELETE FROM {Wallet._meta.db_table} WHERE address LIKE %s", [like]),
+            (f"DELETE FROM {TelegramUser._meta.db_table} WHERE id >= %s", [BENCH_ID_START]),
+            ]
+
+        with connection.cursor() as cursor:
+            for sql, params in statements:
+                cursor.execute(sql, params)
+
+        self.stdout.write("generated data removed")
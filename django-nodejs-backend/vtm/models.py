@@ -1,7 +1,7 @@
-import threading
 import time
 
-from django.db.models import UniqueConstraint
+from django.db.models.functions import Coalesce, Greatest, Upper
+from django.db.models import F, Q, Value
 from unixtimestampfield.fields import UnixTimeStampField
 from django.contrib.auth.models import AbstractUser
 from django.db import models
@@ -16,6 +16,7 @@ class TelegramUser(AbstractUser):
     id = models.BigIntegerField(unique=True, primary_key=True)
     is_bot = models.BooleanField(default=False)
     locked = models.BooleanField(default=False)
+    send_tat = models.FloatField(null=True, blank=True)
     username = models.CharField(max_length=128, blank=True, null=True)
     last_name = models.CharField(max_length=128, blank=True, null=True)
     first_name = models.CharField(max_length=128, blank=True, null=True)
@@ -28,23 +29,28 @@ class TelegramUser(AbstractUser):
     objects = CustomUserManager()
 
     class Meta:
-        constraints = [
-            UniqueConstraint(fields=('id', 'username'), name='id_and_username'),
-            UniqueConstraint(fields=('id', 'first_name'), name='id_and_first_name'),
+        # Case-insensitive lookups (iexact) compare UPPER(column) on PostgreSQL,
+        # trigram indexes for partial (icontains) search are created by vtm.apps
+        indexes = [
+            models.Index(Upper('username'), name='user_username_upper'),
+            models.Index(Upper('first_name'), name='user_first_name_upper'),
+            models.Index(Upper('last_name'), name='user_last_name_upper'),
             ]
 
-    def temp_lock(self, time_: int = 2):
-        self.locked = True
-        self.save()
-
-        thread = threading.Thread(target=self.unlock, args=[time_])
-        thread.start()
+    @classmethod
+    def allow_send(cls, user_id: int, burst: int, interval: float) -> bool:
+        """
+        Sender rate limit (GCRA token bucket): up to `burst` sends at once,
+        then one every `interval` seconds. `send_tat` keeps theoretical
+        arrival time of the next send, checked and moved with one conditional UPDATE.
+        :return: True if send is allowed
+        """
+        now = time.time()
 
-    def unlock(self, time_: int):
-        if self.locked:
-            time.sleep(time_)
-            self.locked = False
-            self.save()
+        return bool(cls.objects
+                    .filter(id=user_id)
+                    .filter(Q(send_tat__isnull=True) | Q(send_tat__lte=now + interval * (burst - 1)))
+                    .update(send_tat=Greatest(Coalesce(F('send_tat'), Value(now)), Value(now)) + interval))
 
     @property
     def full_name(self):
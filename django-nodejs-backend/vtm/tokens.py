@@ -0,0 +1,135 @@
+"""
+In-process registry of VITE tokens, loaded from database on first use,
+dropped on every Token change in this process (post_save / post_delete)
+and reloaded after VITE_TOKEN_REGISTRY_TTL seconds to pick up changes
+made by other processes. Serves token decimals and symbols without
+a query per transaction.
+"""
+from decimal import Decimal
+import threading
+import time
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.conf import settings
+
+from .models import Token
+
+
+# Default token of tips and transactions
+EPIC_ID = 'tti_f370fadb275bc2a1a839c753'
+EPIC = {
+    'id': EPIC_ID,
+    'name': 'Epic Cash',
+    'symbol': 'EPIC',
+    'decimals': 8,
+    'max_supply': '2100000 000000000',
+    'total_supply': '890000000000000',
+    'owner_address': 'vite_721a68f6ebd764e3f932832a05d87f8b1e8428393a0025bc72'
+    }
+
+
+class TokenRegistry:
+    """Tokens by id and by upper case symbol"""
+
+    def __init__(self):
+        self._tokens = None
+        self._symbols = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        tokens = self._tokens
+        ttl = getattr(settings, 'VITE_TOKEN_REGISTRY_TTL', 300)
+
+        if tokens is not None and time.monotonic() - self._loaded_at < ttl:
+            return tokens
+
+        with self._lock:
+            if self._tokens is None or time.monotonic() - self._loaded_at >= ttl:
+                tokens = {token.id: token for token in Token.objects.all()}
+
+                if EPIC_ID not in tokens:
+                    tokens[EPIC_ID], _ = Token.objects.get_or_create(id=EPIC_ID, defaults=EPIC)
+
+                self._symbols = {token.symbol.upper(): token for token in tokens.values()}
+                self._tokens = tokens
+                self._loaded_at = time.monotonic()
+            return self._tokens
+
+    def invalidate(self):
+        self._tokens = None
+
+    def get(self, token_id: str) -> Token:
+        return self._load().get(token_id)
+
+    def by_symbol(self, symbol: str) -> Token:
+        self._load()
+        return self._symbols.get(str(symbol).upper())
+
+    def default(self) -> Token:
+        return self.get(EPIC_ID)
+
+    def decimals(self, token_id: str) -> int:
+        token = self.get(token_id)
+        return token.decimals if token else EPIC['decimals']
+
+    def symbol(self, token_id: str) -> str:
+        token = self.get(token_id)
+        return token.symbol if token else token_id
+
+    def resolve(self, data: dict) -> Token:
+        """Token of send request: `token_id`, `token` symbol or default EPIC, None if unknown"""
+        if data.get('token_id'):
+            return self.get(data['token_id'])
+        if data.get('token'):
+            return self.by_symbol(data['token'])
+        return self.default()
+
+    def register(self, token_info: dict) -> Token:
+        """Save token from VITE API tokenInfo, database is hit only for unknown tokens"""
+        token = self.get(token_info['tokenId'])
+
+        if not token:
+            token, _ = Token.objects.get_or_create(id=token_info['tokenId'], defaults={
+                'name': token_info['tokenName'],
+                'symbol': token_info['tokenSymbol'],
+                'decimals': token_info['decimals'],
+                'max_supply': token_info['maxSupply'],
+                'total_supply': token_info['totalSupply'],
+                'owner_address': token_info['owner']
+                })
+            self.invalidate()
+        return token
+
+    def register_balance(self, balance: dict):
+        """Register tokens of VITE API balance data not known yet"""
+        for token_balance in ((balance or {}).get('balanceInfoMap') or {}).values():
+            if 'tokenInfo' in token_balance and not self.get(token_balance['tokenInfo']['tokenId']):
+                self.register(token_balance['tokenInfo'])
+
+    def to_amount(self, token_id: str, raw: int) -> Decimal:
+        """Convert raw (smallest unit) amount to token amount"""
+        return Decimal(int(raw)) / 10 ** self.decimals(token_id)
+
+    def to_raw(self, token_id: str, amount) -> int:
+        """Convert token amount to raw (smallest unit) amount"""
+        return int(Decimal(str(amount)) * 10 ** self.decimals(token_id))
+
+
+registry = TokenRegistry()
+
+
+def readable_balance(balance: dict, token_id: str = EPIC_ID) -> float:
+    """Token amount from VITE API balance data, 0.0 if there is none"""
+    try:
+        raw = balance['balanceInfoMap'][token_id]['balance']
+    except (TypeError, KeyError):
+        return 0.0
+    return round(float(registry.to_amount(token_id, raw)), 8)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def _token_changed(**kwargs):
+    registry.invalidate()
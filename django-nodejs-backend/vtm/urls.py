@@ -1,7 +1,9 @@
 from django.conf.urls import url
-from .views import CreateTelegramUserView
+from .views import CreateTelegramUserView, SyncTelegramUsersView, ResolveTelegramUsersView
 
 urlpatterns = [
     url('users/create', CreateTelegramUserView.as_view(), name='create_tg_acc'),
+    url('users/sync', SyncTelegramUsersView.as_view(), name='sync_tg_users'),
+    url('users/resolve', ResolveTelegramUsersView.as_view(), name='resolve_tg_users'),
 
     ]
\ No newline at end of file
@@ -1,9 +1,13 @@
 from django.views.generic import CreateView
 from django.http import JsonResponse
 from rest_framework import viewsets
+from django.conf import settings
 from django.db.models import Q
+import json
 
+from tipbot.serializers import AccountAliasSerializer
 from core.logger_ import setup_logging
+from tipbot.models import AccountAlias
 from .serializers import *
 from core import utils
 from .models import *
@@ -13,6 +17,14 @@ logger = setup_logging(name=__name__, console_log_output="stdout", console_log_l
                        logfile_file=__name__ + ".log", logfile_log_level="info", logfile_log_color=False,
                        log_line_template="%(color_on)s[%(asctime)s] [%(threadName)s] [%(levelname)-8s] %(message)s%(color_off)s")
 
+# Telegram profile fields updated by users/sync
+SYNC_FIELDS = ['username', 'first_name', 'last_name', 'language_code', 'is_bot', 'is_premium']
+SYNC_BOOLEAN_FIELDS = ['is_bot', 'is_premium']
+MAX_SYNC_USERS = getattr(settings, 'VTM_MAX_SYNC_USERS', 500)
+
+# Max number of usernames, ids and alias titles in one users/resolve request
+MAX_RESOLVE = getattr(settings, 'VTM_MAX_RESOLVE', 50)
+
 
 class TelegramUserView(viewsets.ModelViewSet):
     """
@@ -26,7 +38,7 @@ class TelegramUserView(viewsets.ModelViewSet):
     serializer_class = TelegramUserSerializer
 
     def get_queryset(self):
-        queryset = TelegramUser.objects.all()
+        queryset = TelegramUser.objects.prefetch_related('wallet')
 
         # List of possible params in request
         params_names = ['id', 'first_name', 'last_name', 'username', 'part_username']
@@ -40,11 +52,9 @@ class TelegramUserView(viewsets.ModelViewSet):
 
         if data['username']:
             only_username_qs = queryset.filter(username__iexact=data['username'])
-            logger.info(f"TelegramUserView::get_queryset(only_username_qs) - {only_username_qs}")
 
-            if only_username_qs.count() > 1 and data['first_name']:
+            if data['first_name'] and only_username_qs.count() > 1:
                 username_and_first_qs = only_username_qs.filter(first_name__iexact=data['first_name'])
-                logger.info(f"TelegramUserView::get_queryset(username_and_first_qs) - {username_and_first_qs}")
                 return username_and_first_qs if username_and_first_qs else only_username_qs
             else:
                 return only_username_qs
@@ -78,7 +88,7 @@ class TokenView(viewsets.ModelViewSet):
             queryset = queryset.filter(id=token_id)
 
         if symbol:
-            queryset = queryset.filter(username=symbol)
+            queryset = queryset.filter(symbol__iexact=symbol)
 
         return queryset
 
@@ -118,3 +128,110 @@ class CreateTelegramUserView(CreateView):
                     response = {'error': 0, 'msg': 'account registration success', 'data': secret_url}
 
         return JsonResponse(response)
+
+
+class SyncTelegramUsersView(CreateView):
+    """
+    Use to update Telegram profiles of many existing TelegramUser objects
+    with two queries, users not in database are skipped (no account creation)
+    endpoint: 'users/sync'
+    payload: {'users': [{'id': int, 'username': str, 'first_name': str, ...}, ...]}
+
+    From where we expect requests:
+    - ./src/user_cache.py -> ProfileSync::flush()
+
+    """
+    model = TelegramUser
+
+    def post(self, request, *args, **kwargs):
+        payload = json.loads(request.body)
+        profiles = {int(profile['id']): profile for profile in payload.get('users', []) if profile.get('id')}
+
+        if len(profiles) > MAX_SYNC_USERS:
+            response = {'error': 1, 'msg': f"too many users: {len(profiles)}, max: {MAX_SYNC_USERS}", 'data': None}
+            return JsonResponse(response)
+
+        changed = []
+
+        for user in TelegramUser.objects.filter(id__in=profiles).only('id', *SYNC_FIELDS):
+            profile = profiles[user.id]
+            is_changed = False
+
+            for field in SYNC_FIELDS:
+                if field not in profile:
+                    continue
+
+                value = bool(profile[field]) if field in SYNC_BOOLEAN_FIELDS else profile[field]
+
+                if getattr(user, field) != value:
+                    setattr(user, field, value)
+                    is_changed = True
+
+            if is_changed:
+                changed.append(user)
+
+        if changed:
+            TelegramUser.objects.bulk_update(changed, SYNC_FIELDS)
+
+        logger.info(f"users/sync: {len(changed)}/{len(profiles)} profiles updated")
+        response = {'error': 0, 'msg': f"users/sync: {len(changed)} updated", 'data': [user.id for user in changed]}
+
+        return JsonResponse(response)
+
+
+class ResolveTelegramUsersView(CreateView):
+    """
+    Use to find many tip receivers at once: users by id or username (case-insensitive)
+    with their wallet addresses in one query, account aliases by title in second one
+    endpoint: 'users/resolve'
+    payload: {'ids': [int], 'usernames': [str], 'aliases': [str]}
+    response data: {'users': [{'id', 'username', 'first_name', 'language_code', 'is_bot', 'wallet': [str]}],
+                    'aliases': [AccountAliasSerializer data]}
+
+    From where we expect requests:
+    - ./src/ui/interface.py -> Interface::get_receivers()
+
+    """
+    model = TelegramUser
+
+    def post(self, request, *args, **kwargs):
+        payload = json.loads(request.body)
+        ids = [int(id_) for id_ in payload.get('ids', []) if str(id_).isdigit()]
+        usernames = [str(username).replace('@', '') for username in payload.get('usernames', []) if username]
+        titles = [str(title).replace('#', '') for title in payload.get('aliases', []) if title]
+
+        if len(ids) + len(usernames) + len(titles) > MAX_RESOLVE:
+            response = {'error': 1, 'msg': f"too many receivers, max: {MAX_RESOLVE}", 'data': None}
+            return JsonResponse(response)
+
+        users = {}
+
+        if ids or usernames:
+            lookup = Q(id__in=ids)
+            for username in usernames:
+                lookup |= Q(username__iexact=username)
+
+            # LEFT JOIN of wallets, one row per user wallet
+            rows = TelegramUser.objects.filter(lookup).order_by('id') \
+                .values('id', 'username', 'first_name', 'language_code', 'is_bot', 'wallet__address')
+
+            for row in rows:
+                address = row.pop('wallet__address')
+                user = users.setdefault(row['id'], {**row, 'wallet': []})
+                if address:
+                    user['wallet'].append(address)
+
+        aliases = []
+
+        if titles:
+            lookup = Q()
+            for title in titles:
+                lookup |= Q(title__iexact=title)
+            aliases = AccountAliasSerializer(AccountAlias.objects.filter(lookup), many=True).data
+
+        logger.info(f"users/resolve: {len(users)} users, {len(aliases)} aliases "
+                    f"of {len(ids) + len(usernames)} users, {len(titles)} aliases")
+        response = {'error': 0, 'msg': f"users/resolve: {len(users) + len(aliases)} found",
+                    'data': {'users': list(users.values()), 'aliases': aliases}}
+
+        return JsonResponse(response)
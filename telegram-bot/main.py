@@ -6,6 +6,8 @@ from aiogram.utils import markdown
 from src.settings import Database, MarketData, Tipbot
 from src import bot, logger, tools
 from src.commands import COMMANDS
+from src.api_client import client, monitor
+from src.user_cache import profile_sync
 from src.user import TipBotUser
 from src.wallet import *
 from src.ui import *
@@ -25,43 +27,43 @@ PRICE = MarketData()
 # /------ CREATE ACCOUNT HANDLE ------\ #
 @dp.message_handler(commands=COMMANDS['create'])
 async def create_account(message: types.Message):
-    owner = TipBotUser.from_obj(message.from_user)
-    response = owner.register()
+    owner = await TipBotUser.from_obj(message.from_user)
+    response = await owner.register()
     await owner.ui.new_wallet(response)
 
 
 # /------ WALLET GUI HANDLE ------\ #
 @dp.message_handler(commands=COMMANDS['wallet'], state='*')
 async def wallet(message: types.Message, state: FSMContext):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     await owner.ui.show_wallet(state=state, message=message)
 
 
 # /------ WALLET GUI DEPOSIT ADDRESS STEP 1/1 ------\ #
 @dp.callback_query_handler(wallet_cb.filter(action='deposit'), state='*')
 async def gui_deposit(query: types.CallbackQuery, callback_data: dict):
-    owner = TipBotUser(id=callback_data['user'])
+    owner = await TipBotUser.from_dict({'id': callback_data['user']})
     await owner.wallet.show_deposit(query=query)
 
 
 # /------ WALLET GUI WITHDRAW STEP 1/3 ------\ #
 @dp.callback_query_handler(wallet_cb.filter(action='withdraw'), state='*')
 async def gui_withdraw(query: types.CallbackQuery, callback_data: dict, state: FSMContext):
-    owner = TipBotUser(id=callback_data['user'])
+    owner = await TipBotUser.from_dict({'id': callback_data['user']})
     await owner.ui.withdraw_1_of_3(state=state, query=query)
 
 
 # /------ WALLET GUI WITHDRAW STEP 2/3 ------\ #
 @dp.message_handler(state=WithdrawStates.ask_for_address)
 async def handle_withdraw_address(message: types.Message, state: FSMContext):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     await owner.ui.withdraw_2_of_3(state=state, message=message)
 
 
 # /------ WALLET GUI WITHDRAW STEP 3/3 ------\ #
 @dp.message_handler(state=WithdrawStates.ask_for_amount)
 async def handle_withdraw_amount(message: types.Message, state: FSMContext):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     await owner.ui.withdraw_3_of_3(state=state, message=message)
 
 
@@ -69,42 +71,42 @@ async def handle_withdraw_amount(message: types.Message, state: FSMContext):
 @dp.callback_query_handler(text=['confirm_withdraw'], state=[DonateStates.confirmation,
                                                              WithdrawStates.confirmation])
 async def handle_withdraw_final(query: types.CallbackQuery, state: FSMContext):
-    owner = TipBotUser(id=query.message.chat.id)
+    owner = await TipBotUser.from_dict({'id': query.message.chat.id})
     await owner.wallet.withdraw(state=state, query=query)
 
 
 # /------ WALLET GUI SEND STEP 1/3 ------\ #
 @dp.callback_query_handler(wallet_cb.filter(action='send'), state='*')
 async def gui_send(query: types.CallbackQuery, callback_data: dict, state: FSMContext):
-    owner = TipBotUser(id=callback_data['user'])
+    owner = await TipBotUser.from_dict({'id': callback_data['user']})
     await owner.ui.send_to_user_1_of_3(state=state, query=query)
 
 
 # /------ WALLET GUI SEND STEP 2/3 ------\ #
 @dp.message_handler(state=SendStates.ask_for_recipient)
 async def handle_send_recipient(message: types.Message, state: FSMContext):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     await owner.ui.send_to_user_2_of_3(state=state, message=message)
 
 
 # /------ WALLET GUI SEND STEP 3/3 ------\ #
 @dp.message_handler(state=SendStates.ask_for_amount)
 async def handle_send_amount(message: types.Message, state: FSMContext):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     await owner.ui.send_to_user_3_of_3(state=state, message=message)
 
 
 # /------ WALLET GUI SEND TO USER FINALIZE CALLBACK ------\ #
 @dp.callback_query_handler(text=['confirm_send'], state=[SendStates.confirmation])
 async def handle_send_epic(query: types.CallbackQuery, state: FSMContext):
-    owner = TipBotUser(id=query.message.chat.id)
+    owner = await TipBotUser.from_dict({'id': query.message.chat.id})
     await owner.wallet.send_to_users(state=state, query=query)
 
 
 # /------ WALLET GUI DONATE STEP 1/2 ------\ #
 @dp.callback_query_handler(wallet_cb.filter(action='donate'), state='*')
 async def gui_donate(query: types.CallbackQuery, callback_data: dict, state: FSMContext):
-    owner = TipBotUser(id=callback_data['user'])
+    owner = await TipBotUser.from_dict({'id': callback_data['user']})
     await owner.ui.donate_1_of_2(state=state, query=query)
 
 
@@ -112,14 +114,14 @@ async def gui_donate(query: types.CallbackQuery, callback_data: dict, state: FSM
 @dp.callback_query_handler(text=['donate_1', 'donate_5', 'donate_10'],
                            state=DonateStates.ask_for_amount)
 async def handle_donate_amount(query: types.CallbackQuery, state: FSMContext):
-    owner = TipBotUser(id=query.message.chat.id)
+    owner = await TipBotUser.from_dict({'id': query.message.chat.id})
     await owner.ui.donate_2_of_2(state=state, query=query)
 
 
 # /------ WALLET GUI SUPPORT STEP 1/1 ------\ #
 @dp.callback_query_handler(wallet_cb.filter(action='support'), state='*')
 async def gui_support(query: types.CallbackQuery, callback_data: dict, state: FSMContext):
-    owner = TipBotUser(id=callback_data['user'])
+    owner = await TipBotUser.from_dict({'id': callback_data['user']})
     await owner.ui.show_support(query=query)
 
 
@@ -128,7 +130,7 @@ async def gui_support(query: types.CallbackQuery, callback_data: dict, state: FS
 @dp.message_handler(lambda message: message.text.startswith(('tip', 'Tip'))
                     and 2 < len(message.text.split(' ')) < 10)
 async def tip(message: types.Message):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     if owner.is_registered:
         await owner.ui.send_tip_cmd(message=message)
 
@@ -136,21 +138,21 @@ async def tip(message: types.Message):
 # /------ START/HELP HANDLE ------\ #
 @dp.message_handler(commands=COMMANDS['start'])
 async def start(message: types.Message):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     await vite_wallet.welcome_screen(user=owner, message=message)
 
 
 # /------ FAQ HANDLE ------\ #
 @dp.message_handler(commands=COMMANDS['faq'])
 async def faq(message: types.Message):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     await vite_wallet.faq_screen(user=owner, message=message)
 
 
 # /------ CONFIRM FAILED TIP ------\ #
 @dp.callback_query_handler(wallet_cb.filter(action='confirm_failed_tip'), state='*')
 async def confirm_failed_tip(query: types.CallbackQuery, callback_data: dict, state: FSMContext):
-    owner = TipBotUser(id=query.from_user.id)
+    owner = await TipBotUser.from_dict({'id': query.from_user.id})
     if owner.id == int(callback_data['user']):
         await query.message.delete()
 
@@ -158,7 +160,7 @@ async def confirm_failed_tip(query: types.CallbackQuery, callback_data: dict, st
 # /------ CANCEL ANY STATE HANDLE ------\ #
 @dp.callback_query_handler(text='cancel_any', state='*')
 async def cancel_any_state(query: types.CallbackQuery, state: FSMContext):
-    owner = TipBotUser(id=query.from_user.id)
+    owner = await TipBotUser.from_dict({'id': query.from_user.id})
     await owner.ui.cancel_state(state=state, query=query)
 
 
@@ -167,7 +169,7 @@ if Tipbot.MAINTENANCE:
     @dp.message_handler(lambda message: message.text.startswith(('tip', 'Tip')))
     @dp.message_handler(commands=['details, tip', 'Tip', 'start', 'help', 'faq', 'wallet'])
     async def maintenance(message: types.Message):
-        owner = TipBotUser.from_obj(message.from_user)
+        owner = await TipBotUser.from_obj(message.from_user)
         await owner.ui.maintenance(message)
 
 
@@ -176,7 +178,7 @@ if Tipbot.MAINTENANCE:
 async def create_account_alias(message: types.Message):
     if len(message.text.split(' ')) > 2 and \
         message.text.split(' ')[1].startswith('#'):
-        owner = TipBotUser.from_obj(message.from_user)
+        owner = await TipBotUser.from_obj(message.from_user)
         await owner.ui.register_alias(message=message)
 
 
@@ -184,7 +186,7 @@ async def create_account_alias(message: types.Message):
 @dp.message_handler(commands=COMMANDS['alias_details'])
 async def get_alias_details(message: types.Message):
     if len(message.text.split(' ')) > 1 and message.text.split(' ')[1].startswith('#'):
-        owner = TipBotUser.from_obj(message.from_user)
+        owner = await TipBotUser.from_obj(message.from_user)
 
         if owner.wallet:
             await owner.ui.alias_details(message=message)
@@ -195,7 +197,7 @@ async def get_alias_details(message: types.Message):
 @dp.message_handler(commands=COMMANDS['alias_details'])
 async def get_alias_details(message: types.Message):
     if len(message.text.split(' ')) > 1 and message.text.split(' ')[1].startswith('#'):
-        owner = TipBotUser.from_obj(message.from_user)
+        owner = await TipBotUser.from_obj(message.from_user)
 
         if owner.wallet:
             await owner.ui.alias_details(message=message)
@@ -203,7 +205,7 @@ async def get_alias_details(message: types.Message):
 
 @dp.message_handler(commands=['spam_message'], state='*')
 async def spam_message(message: types.Message, state: FSMContext):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     await owner.ui.spam_message(message)
 
 """=================================================="""
@@ -211,20 +213,35 @@ async def spam_message(message: types.Message, state: FSMContext):
 # TODO: TEST  /------ WALLET GUI UPDATE ------\ #
 @dp.message_handler(commands=['update_balance'], state='*')
 async def wallet(message: types.Message, state: FSMContext):
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
 
     if owner.wallet:
-        owner.wallet.update_balance()
+        await owner.wallet.update_balance()
 
 
 # TODO:  /------ TESTING ------\ #
 @dp.message_handler(commands=['msg'], state='*')
 async def tests(message: types.Message, state: FSMContext):
     # print(message.entities)
-    owner = TipBotUser.from_obj(message.from_user)
+    owner = await TipBotUser.from_obj(message.from_user)
     await owner.ui.spam_message(message)
 
+async def on_startup(dispatcher: Dispatcher):
+    # Start Django API health checks, write-behind of user profiles and alias directory refresh
+    monitor.start()
+    profile_sync.start()
+    alias_directory.start()
+
+
+async def on_shutdown(dispatcher: Dispatcher):
+    # Write pending user profiles, stop health checks and close pooled connections to Django API
+    await alias_directory.stop()
+    await profile_sync.stop()
+    await monitor.stop()
+    await client.close()
+
+
 # /------ START MAIN LOOP ------\ #
 if __name__ == '__main__':
     logger.info("starting")
-    executor.start_polling(dp, skip_updates=True)
\ No newline at end of file
+    executor.start_polling(dp, skip_updates=True, on_startup=on_startup, on_shutdown=on_shutdown)
\ No newline at end of file
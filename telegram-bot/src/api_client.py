@@ -0,0 +1,190 @@
+"""
+Asyncio client of the Django back-end API. All handlers share one
+aiohttp.ClientSession, so connections are pooled and kept alive, every
+endpoint has its own timeout and limit of requests running at the same time.
+BackendMonitor keeps backend availability state, so calls fail fast while
+the backend is down instead of waiting for their timeouts.
+"""
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from .settings import Api
+from .logger_ import logger
+
+
+class ApiClient:
+    def __init__(self, connections: int = Api.CONNECTIONS, keepalive: int = Api.KEEPALIVE):
+        self.connections = connections
+        self.keepalive = keepalive
+        self._session = None
+        self._semaphores = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared session, created on first request inside running event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.connections,
+                                             keepalive_timeout=self.keepalive)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    @staticmethod
+    def timeout(query: str) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=Api.TIMEOUTS.get(query, Api.TIMEOUT))
+
+    def semaphore(self, query: str) -> asyncio.Semaphore:
+        if query not in self._semaphores:
+            self._semaphores[query] = asyncio.Semaphore(Api.LIMITS.get(query, Api.CONCURRENCY))
+        return self._semaphores[query]
+
+    @staticmethod
+    def query_params(params: dict) -> list:
+        """GET params encoded the way `requests` does it: None skipped, lists repeated"""
+        items = []
+        for key, values in params.items():
+            for value in values if isinstance(values, (list, tuple)) else [values]:
+                if value is not None:
+                    items.append((key, str(value)))
+        return items
+
+    async def request(self, query: str, url: str, params: dict, method='get') -> tuple:
+        """
+        Send request to `{url}/{query}/`, GET params in query string, POST params as JSON body
+        :param query: str
+        :param url: str
+        :param params: dict
+        :param method: str
+        :return: tuple(status_code, json or None when status is not 200)
+        :raise aiohttp.ClientError, asyncio.TimeoutError, ValueError: connection error, timeout, not JSON response
+        """
+        full_url = f'{url}/{query}/'
+
+        async with self.semaphore(query):
+            if 'get' in method:
+                request = self.session.get(full_url, params=self.query_params(params),
+                                           timeout=self.timeout(query))
+            else:  # 'post' in method
+                request = self.session.post(full_url, data=json.dumps(params),
+                                            timeout=self.timeout(query))
+
+            try:
+                async with request as response:
+                    if response.status >= 500:
+                        monitor.record_failure()
+                    else:
+                        monitor.record_success()
+
+                    if response.status != 200:
+                        return response.status, None
+                    return response.status, await response.json(content_type=None)
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                monitor.record_failure()
+                raise
+
+    async def close(self):
+        """Close pooled connections, call on bot shutdown"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class BackendMonitor:
+    """
+    Background task probing the backend every HEALTH_INTERVAL seconds, every
+    HEALTH_RETRY seconds while it is not up and right after a failed call.
+    States:
+    - up: last probe or call succeeded
+    - degraded: slow probe or failures in a row below HEALTH_FAILURES
+    - down: HEALTH_FAILURES failures in a row, `is_down` until a probe succeeds
+    """
+    UP = 'up'
+    DEGRADED = 'degraded'
+    DOWN = 'down'
+
+    def __init__(self, url: str = Api.HEALTH_URL):
+        self.url = url
+        self.state = self.UP
+        self.failures = 0
+        self.latency = None
+        self._task = None
+        self._wakeup = None
+
+    @property
+    def is_down(self) -> bool:
+        return self.state == self.DOWN
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            log = logger.info if state == self.UP else logger.warning
+            log(f"BackendMonitor: backend {self.state} -> {state} "
+                f"(failures: {self.failures}, latency: {self.latency})")
+            self.state = state
+
+    def record_success(self, latency: float = None):
+        self.failures = 0
+        if latency is not None:
+            self.latency = round(latency, 3)
+
+        if latency is not None and latency > Api.HEALTH_SLOW:
+            self._set_state(self.DEGRADED)
+        elif latency is not None or not self.is_down:
+            # Only probe can bring backend back from down
+            self._set_state(self.UP)
+
+    def record_failure(self):
+        self.failures += 1
+        self._set_state(self.DOWN if self.failures >= Api.HEALTH_FAILURES else self.DEGRADED)
+
+        # Probe now instead of waiting for next scheduled probe
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def probe(self) -> bool:
+        """Any response below 500 means backend is serving requests"""
+        started = time.monotonic()
+        try:
+            async with client.session.head(self.url, allow_redirects=False,
+                                           timeout=aiohttp.ClientTimeout(total=Api.HEALTH_TIMEOUT)) as response:
+                if response.status < 500:
+                    self.record_success(time.monotonic() - started)
+                    return True
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+
+        self.record_failure()
+        return False
+
+    async def _run(self):
+        while True:
+            await self.probe()
+
+            # Failed probe does not wake itself, only failed calls do
+            self._wakeup.clear()
+            interval = Api.HEALTH_INTERVAL if self.state == self.UP else Api.HEALTH_RETRY
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start probing task, call inside running event loop (bot startup)"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+
+client = ApiClient()
+monitor = BackendMonitor()
@@ -88,7 +88,6 @@ class Tests:
 class Tipbot:
     MAINTENANCE = False
     MAX_RECEIVERS = 5
-    TIME_LOCK = 2.2
     ADMIN_ID = '803516752'
     DONATION_ADDRESS = 'vite_0ab437d8a54d52abc802c0e75210885e761d328eaefed14204'
     HELP_STRING = \
@@ -147,3 +146,64 @@ else:
         API_PORT = 3273
         TIPBOT_URL = f"http://127.0.0.1:{API_PORT}/tipbot"
         API_URL = f"http://127.0.0.1:{API_PORT}/api"
+
+
+class Api:
+    # Connections kept alive in the shared pool, per host
+    CONNECTIONS = 20
+    KEEPALIVE = 30
+
+    # Total request timeout in seconds, per endpoint, sends wait clearly longer than
+    # back-end VITE_REQUEST_DEADLINE (90s) plus VITE_WALLET_LOCK_TIMEOUT (30s)
+    TIMEOUT = 15
+    TIMEOUTS = {
+        'users/create': 90,
+        'send_transaction': 150,
+        'send_batch': 180,
+        'update': 90,
+        'balance': 30,
+        'transaction_status': 45,
+        }
+
+    # Requests to one endpoint running at the same time, others wait for a free slot
+    CONCURRENCY = 10
+    LIMITS = {
+        'users/create': 2,
+        'send_transaction': 5,
+        'send_batch': 5,
+        'update': 5,
+        }
+
+    # Backend health monitor: probe interval while up / while degraded or down,
+    # probe slower than HEALTH_SLOW seconds means degraded, after HEALTH_FAILURES
+    # failed calls or probes in a row backend is down and calls fail fast
+    HEALTH_URL = f"{Database.API_URL}/"
+    HEALTH_INTERVAL = 30
+    HEALTH_RETRY = 3
+    HEALTH_TIMEOUT = 3
+    HEALTH_SLOW = 1.5
+    HEALTH_FAILURES = 3
+
+    # Transactions queued by back-end outbox (VITE_SEND_OUTBOX) are long-polled with
+    # `transaction_status`: STATUS_WAIT seconds per request, SEND_WAIT seconds in total,
+    # STATUS_RETRY seconds pause after a poll which got no answer
+    STATUS_WAIT = 30
+    STATUS_RETRY = 3
+    SEND_WAIT = 300
+
+
+class Users:
+    # TipBotUser identity cache (src/user_cache.py): max users kept and seconds before re-read from database
+    CACHE_SIZE = 10000
+    CACHE_TTL = 600
+
+    # Changed Telegram profiles are written to database every SYNC_INTERVAL seconds, SYNC_BATCH per request
+    SYNC_INTERVAL = 10
+    SYNC_BATCH = 100
+
+
+class Aliases:
+    # Alias directory (src/wallet/directory.py): seconds between incremental refreshes
+    # and between full reloads (full reload drops removed aliases)
+    REFRESH_INTERVAL = 60
+    RELOAD_INTERVAL = 3600
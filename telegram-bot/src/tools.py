@@ -1,11 +1,11 @@
 from aiogram.contrib.fsm_storage.files import PickleStorage
-import requests
-import socket
+import aiohttp
+import asyncio
 
 import decimal
-import json
 import os
 
+from .api_client import client, monitor
 from .logger_ import logger
 from .settings import Database, MarketData
 
@@ -13,10 +13,15 @@ from .settings import Database, MarketData
 ctx = decimal.Context()
 PRICE = MarketData()
 ctx.prec = 20
-API_PORT = Database.API_PORT
 DJANGO_API_URL = Database.API_URL
 TIPBOT_API_URL = Database.TIPBOT_URL
 
+# api_call error messages when back-end gave no answer, result of the request is unknown
+BACKEND_DOWN = "Database Connection Error"
+HTTP_ERROR = "Can not connect to database"
+CONNECTION_ERROR = "Database ReadTimeout / ConnectionError"
+NO_RESPONSE = (BACKEND_DOWN, HTTP_ERROR, CONNECTION_ERROR)
+
 
 def float_to_str(f):
     """
@@ -41,9 +46,8 @@ def is_int(value):
         return None
 
 
-def api_call(query: str, url: str, params: dict, method='get') -> dict:
-    """ Handle API calls to Django back-end database
-    :param timeout: int
+async def api_call(query: str, url: str, params: dict, method='get') -> dict:
+    """ Handle API calls to Django back-end database, through shared pooled client
     :param query: str
     :param url: str
     :param params: dict
@@ -65,22 +69,19 @@ def api_call(query: str, url: str, params: dict, method='get') -> dict:
         try: log_id = params['sender']['id']
         except: pass
 
-    if not ping_server():
-        response = {'error': 1, 'msg': f"Database Connection Error", 'data': None}
+    # Fail fast, BackendMonitor knows backend is down
+    if monitor.is_down:
+        logger.error(f"@{log_id} tools::api_call({query}) -> backend is down")
+        response = {'error': 1, 'msg': BACKEND_DOWN, 'data': None}
         return response
 
     try:
-        if 'get' in method:
-            response = requests.get(url=full_url, params=params, timeout=60*5)
-        else:  # 'post' in method
-            response = requests.post(url=full_url, data=json.dumps(params), timeout=60*5)
-
-        if response.status_code != 200:
-            logger.error(f'@{log_id} {full_url} | {response.status_code}')
-            response = {'error': 1, 'msg': 'Can not connect to database', 'data': None}
-        else:
-            r_json = response.json()
+        status_code, r_json = await client.request(query, url, params, method)
 
+        if status_code != 200:
+            logger.error(f'@{log_id} {full_url} | {status_code}')
+            response = {'error': 1, 'msg': HTTP_ERROR, 'data': None}
+        else:
             try:
                 # try standard response scheme
                 if not r_json['error']:
@@ -94,9 +95,9 @@ def api_call(query: str, url: str, params: dict, method='get') -> dict:
                 logger.info(f"@{log_id} tools::api_call({query}) (?)-> status 200")
                 response = {'error': 0, 'msg': 'success', 'data': r_json}
 
-    except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
+    except (asyncio.TimeoutError, aiohttp.ClientError, ValueError):
         logger.error(f"@{log_id} Can not connect to {full_url} URL")
-        response = {'error': 1, 'msg': f"Database ReadTimeout / ConnectionError", 'data': None}
+        response = {'error': 1, 'msg': CONNECTION_ERROR, 'data': None}
 
     return response
 
@@ -115,17 +116,15 @@ def parse_vite_balance(data):
     return balances, pending
 
 
-def ping_server(timeout=1):
-    """ping server"""
-    try:
-        socket.setdefaulttimeout(timeout)
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.connect(('localhost', API_PORT))
-    except OSError as error:
-        return False
-    else:
-        s.close()
-        return True
+_background_tasks = set()
+
+
+def run_in_background(coroutine) -> asyncio.Task:
+    """Schedule coroutine without awaiting it, task is referenced until done"""
+    task = asyncio.ensure_future(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
 
 
 def temp_storage():
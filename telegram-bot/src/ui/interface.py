@@ -2,9 +2,7 @@
 import asyncio
 import os
 from datetime import datetime, timedelta
-import threading
 import typing
-import time
 
 from aiogram.utils.exceptions import MessageToDeleteNotFound, MessageCantBeDeleted
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ParseMode, ReplyKeyboardMarkup, KeyboardButton
@@ -15,7 +13,8 @@ from aiogram.dispatcher import FSMContext
 from aiogram import types
 
 from .. import logger, bot, tools, Tipbot
-from ..wallet import AliasWallet
+from ..user_cache import cache
+from ..wallet import AliasWallet, alias_directory
 from .screens import *
 
 
@@ -109,10 +108,10 @@ class Interface:
         wallet_gui = await self.send_message(text=gui, chat_id=self.owner.id, reply_markup=keyboard)
 
         # Get wallet EPIC balance
-        threading.Thread(target=self.owner.wallet.epic_balance).start()
+        balance = tools.run_in_background(self.owner.wallet.epic_balance())
 
         # Show animation of loading
-        while self.owner.wallet.is_updating:
+        while not balance.done():
             await wallet_gui.edit_text(text=loading_wallet_2(),
                                        reply_markup=keyboard,
                                        parse_mode=ParseMode.MARKDOWN)
@@ -122,7 +121,7 @@ class Interface:
                                        parse_mode=ParseMode.MARKDOWN)
             await asyncio.sleep(0.35)
 
-        balance = self.owner.wallet.last_balance
+        balance = balance.result()
 
         # Handle response error
         if balance['error']:
@@ -147,10 +146,9 @@ class Interface:
                                        parse_mode=ParseMode.MARKDOWN)
 
             # Trigger the `receiveTransactions` vite api call
-            thread = threading.Thread(target=self.owner.wallet.update_balance)
-            thread.start()
+            update = tools.run_in_background(self.owner.wallet.update_balance())
 
-            while self.owner.wallet.is_updating:
+            while not update.done():
                 await wallet_gui.edit_text(text=pending_1(pending_txs),
                                            reply_markup=keyboard,
                                            parse_mode=ParseMode.MARKDOWN)
@@ -160,7 +158,7 @@ class Interface:
                                            parse_mode=ParseMode.MARKDOWN)
                 await asyncio.sleep(0.7)
 
-            balance = self.owner.wallet.epic_balance()
+            balance = await self.owner.wallet.epic_balance()
 
         # Prepare GUI strings
         epic_balance, balance_in_usd = balance['data']['string']
@@ -173,80 +171,111 @@ class Interface:
 
         logger.info(f"{self.owner.mention}: wallet GUI loaded")
 
-    def get_receivers(self, message: types.Message) -> tuple:
+    async def get_receivers(self, message: types.Message) -> tuple:
         """
-        Extract user mentions from tip message and return list of matching TipBotUser's
+        Extract user mentions and #aliases from tip message and find all of them
+        with one `users/resolve` call, users cached by ID need no call at all
         :param message: types.Message (AIOGRAM)
         :return: tuple(registered_receivers, unknown_receivers)
         """
         registered_receivers = []
         unknown_receivers = []
 
+        # Receivers in message order: ('username', str), ('user', dict) or ('alias', str)
+        mentions = []
+
+        # Receivers parsed from raw string are returned only when registered
+        from_raw_string = False
+
         if len(message.entities) > 0:
             for user_mention in message.entities:
+                start = user_mention.offset
+                stop = start + user_mention.length
+
                 if user_mention.type == 'mention':
-                    start = user_mention.offset
-                    stop = start + user_mention.length
-                    username = message.text[start:stop].replace('@', '')
-                    receiver = self.owner.from_dict({'username': username})
-
-                    if receiver.is_registered:
-                        logger.info(f"Wallet::get_tip_receivers() - registered_receiver by mention: {receiver}")
-                        registered_receivers.append(receiver)
-                    else:
-                        logger.info(f"Wallet::get_tip_receivers() - unknown_receiver by mention: {receiver}")
-                        unknown_receivers.append(receiver)
+                    mentions.append(('username', message.text[start:stop].replace('@', '')))
 
                 elif user_mention['type'] == 'text_mention':
                     if user_mention.user:
-                        receiver = self.owner.from_obj(user_mention.user)
-                        if receiver.is_registered:
-                            logger.info(
-                                f"Wallet::get_tip_receivers() - registered_receiver by text_mention: {receiver}")
-                            registered_receivers.append(receiver)
-                        else:
-                            logger.info(f"Wallet::get_tip_receivers() - unknown_receiver by text_mention: {receiver}")
-                            unknown_receivers.append(receiver)
+                        mentions.append(('user', user_mention.user.__dict__['_values']))
 
                 elif user_mention['type'] == 'hashtag':
                     # Handle if receiver is an AccountAlias link
-                    start = user_mention.offset
-                    stop = start + user_mention.length
-                    title = message.text[start:stop]
-                    receiver = AliasWallet(title=title).get()
-
-                    if receiver:
-                        logger.info(f"Wallet::get_tip_receivers({title}) - parsed receiver from # alias: {receiver}")
-                        registered_receivers.append(receiver)
-
-            return registered_receivers, unknown_receivers
+                    mentions.append(('alias', message.text[start:stop].replace('#', '')))
 
         else:
             # Try to parse receiver based on raw string
             try:
                 match = message.parse_entities().split(' ')[1]
-                print(match)
+                from_raw_string = True
 
                 if tools.is_int(match):
                     # Try to find user with given ID
-                    receiver = self.owner.fom_dict({'id': tools.is_int(match)})
+                    mentions.append(('user', {'id': tools.is_int(match)}))
 
-                    if receiver.is_registered:
-                        logger.info(f"Wallet::get_tip_receivers({match}) - parsed receiver without mention: {receiver}")
-                        registered_receivers.append(receiver)
-
-                else:
+                elif match.startswith('@'):
                     # Try to find user with given @username
-                    if match.startswith('@'):
-                        receiver = self.owner.fom_dict({'username': match})
-
-                        if receiver.is_registered:
-                            logger.info(f"Wallet::get_tip_receivers({match}) - parsed receiver without mention: {receiver}")
-                            registered_receivers.append(receiver)
+                    mentions.append(('username', match.replace('@', '')))
 
             except Exception as e:
                 logger.error(f'Error parsing receiver {e}')
 
+        # Users cached by ID are built from cache, all others resolved with one call
+        cached = {data['id']: await self.owner.from_dict(data) for kind, data in mentions
+                  if kind == 'user' and cache.get(data['id'])}
+
+        ids = [data['id'] for kind, data in mentions if kind == 'user' and data['id'] not in cached]
+        usernames = [value for kind, value in mentions if kind == 'username']
+        titles = [value for kind, value in mentions if kind == 'alias']
+
+        users = {}
+        aliases = {}
+
+        # Loaded alias directory knows all aliases, titles are not resolved
+        if alias_directory.loaded:
+            aliases = {title.upper(): alias_directory.get(title) for title in titles if alias_directory.get(title)}
+            titles = []
+
+        if ids or usernames or titles:
+            response = await self.owner.resolve(ids=ids, usernames=usernames, aliases=titles)
+
+            if response['error']:
+                logger.error(f"Wallet::get_tip_receivers() - {response['msg']}")
+                return registered_receivers, unknown_receivers
+
+            # Records by ID and by upper case username
+            for record in response['data']['users']:
+                users.setdefault(str(record['id']), []).append(record)
+                if record['username']:
+                    users.setdefault(record['username'].upper(), []).append(record)
+
+            aliases.update({alias['title'].upper(): alias for alias in response['data']['aliases']})
+
+        for kind, value in mentions:
+            if kind == 'alias':
+                if value.upper() in aliases:
+                    receiver = AliasWallet(**aliases[value.upper()])
+                    logger.info(f"Wallet::get_tip_receivers({value}) - parsed receiver from # alias: {receiver}")
+                    registered_receivers.append(receiver)
+                continue
+
+            if kind == 'user' and value['id'] in cached:
+                receiver = cached[value['id']]
+            else:
+                data = value if kind == 'user' else {'username': value}
+                records = users.get(str(value['id']) if kind == 'user' else value.upper(), [])
+
+                # Many users with the same username are ambiguous, no one is registered receiver
+                receiver = self.owner.from_record(data, records[0] if len(records) == 1 else None)
+
+            if receiver.is_registered:
+                logger.info(f"Wallet::get_tip_receivers() - registered_receiver by {kind}: {receiver}")
+                registered_receivers.append(receiver)
+
+            elif not from_raw_string:
+                logger.info(f"Wallet::get_tip_receivers() - unknown_receiver by {kind}: {receiver}")
+                unknown_receivers.append(receiver)
+
         return registered_receivers, unknown_receivers
 
     @staticmethod
@@ -364,7 +393,7 @@ class Interface:
 
     async def send_to_user_2_of_3(self, state, message):
         # Validate recipient and save to storage
-        recipients, unknown = self.get_receivers(message)
+        recipients, unknown = await self.get_receivers(message)
 
         if recipients:
             await state.update_data(recipients=recipients)
@@ -492,7 +521,7 @@ class Interface:
         owner = self.owner
 
         if 'owner' in details:
-            owner_ = self.owner.from_dict({'username': details['owner'].replace('@', '')})
+            owner_ = await self.owner.from_dict({'username': details['owner'].replace('@', '')})
             if owner_.is_registered:
                 owner = owner_
 
@@ -500,7 +529,7 @@ class Interface:
         alias = AliasWallet(title=alias_title, owner=owner, address=address, details=details)
 
         # Update object params to database
-        response = alias.register()
+        response = await alias.register()
 
         try:
             # Handle error
@@ -519,11 +548,11 @@ class Interface:
         cmd, alias_title = message.text.split(' ')
 
         # API call to database to get AccountAlias by #alias
-        alias = AliasWallet(title=alias_title).get()
+        alias = await AliasWallet(title=alias_title).get()
 
         if not alias: return
 
-        balance = alias.balance()
+        balance = await alias.balance()
 
         if balance:
             balance_, pending = tools.parse_vite_balance(balance)
@@ -563,7 +592,7 @@ class Interface:
         message.text = message.text.replace('  ', ' ')
 
         # Parse receivers
-        registered, unknown = self.get_receivers(message)
+        registered, unknown = await self.get_receivers(message)
 
         print(registered, unknown)
 
@@ -633,10 +662,10 @@ class Interface:
                     # Send notification to receiver's private chat
                     await self.send_message(text=receiver_msg, chat_id=params['receivers'][i].id)
 
-                    # Run threading process to update receiver balance (receiveTransactions call)
+                    # Update receiver balance in background task (receiveTransactions call)
                     logger.warning(f"@{self.owner.name} ViteWallet::gui::send_tip() - "
                                    f"start balance update for {params['receivers'][i].mention}")
-                    threading.Thread(target=params['receivers'][i].wallet.update_balance).start()
+                    tools.run_in_background(params['receivers'][i].wallet.update_balance())
 
         # Finalize with final feedback
         if len(success_receivers) > 1:
@@ -673,7 +702,7 @@ class Interface:
         keyboard = ReplyKeyboardMarkup(resize_keyboard=True).add(button)
 
         if self.owner.id == int(Tipbot.ADMIN_ID):
-            users = self.owner.get_users(100)
+            users = await self.owner.get_users(100)
 
             users = [user['id'] for user in users]
             print(f"Got {len(users)} ID's from DB")
@@ -682,13 +711,13 @@ class Interface:
                 users = [self.owner.id]
 
             for user_id in users:
-                user = self.owner.from_dict({'id': user_id})
+                user = await self.owner.from_dict({'id': user_id})
                 success = await self.send_message(text=msg, chat_id=user.id, reply_markup=keyboard)
                 if success:
                     logger.critical(f"{user} spam message sent success")
                     if send_wallet:
                         await user.ui.show_wallet()
-                time.sleep(0.3)
+                await asyncio.sleep(0.3)
 
     def auto_delete(self, message, delta):
         """Add job to scheduler with time in seconds from now to run the task"""
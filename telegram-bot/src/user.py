@@ -5,6 +5,7 @@ from aiogram.types import User
 from aiogram.utils import markdown
 
 from . import tools, logger, DJANGO_API_URL
+from .user_cache import cache, profile_sync, profile_of, profile_hash
 from .wallet import ViteWallet
 from .settings import Tests, Tipbot
 from .ui import Interface
@@ -22,10 +23,8 @@ class TipBotUser(User):
         self.wallet = ViteWallet(owner=self)
         self.ui = Interface(self)
 
-        # temp_user is used to access some instance methods,
-        # in this case do not try to connect with database
-        if 'temp_user' not in kwargs.keys():
-            self.update_from_db()
+        # Hash of Telegram profile, only objects built from Telegram User data have one
+        self.profile_hash = profile_hash(kwargs) if kwargs.get('first_name') else None
 
     @property
     def name(self):
@@ -34,18 +33,44 @@ class TipBotUser(User):
         else:
             return self.full_name
 
-    @staticmethod
-    def from_obj(user: User):
-        """Create new object based on AIOGRAM User obj"""
-        return TipBotUser(**user.__dict__['_values'])
+    @classmethod
+    async def from_obj(cls, user: User):
+        """Create new object based on AIOGRAM User obj, updated from database"""
+        return await cls.from_dict(user.__dict__['_values'])
+
+    @classmethod
+    async def from_dict(cls, data: dict):
+        """Create new object based on user dictionary, updated from cache or database"""
+        user = cls(**data)
 
-    @staticmethod
-    def from_dict(data: dict):
-        """Create new object based on user dictionary"""
-        return TipBotUser(**data)
+        if not user.update_from_cache():
+            await user.update_from_db()
+        return user
+
+    @classmethod
+    def from_record(cls, data: dict, record: dict = None):
+        """
+        Create new object based on user dictionary and its database record
+        found already (e.g. by `users/resolve`), None if user is not registered
+        """
+        user = cls(**data)
+        user.is_registered = record is not None
+
+        if record:
+            record = user._save_record(record)
+
+        if user.id:
+            cache.save(user.id, user.is_registered, record, user.profile_hash)
+        return user
+
+    @classmethod
+    async def resolve(cls, ids: list = (), usernames: list = (), aliases: list = ()) -> dict:
+        """Find users (with wallet addresses) and account aliases with one `users/resolve` call"""
+        params = {'ids': list(ids), 'usernames': list(usernames), 'aliases': list(aliases)}
+        return await tools.api_call('users/resolve', cls.API_URL, params, method='post')
 
-    def _api_call(self, query: str, params: dict, method='get') -> dict:
-        return tools.api_call(query, self.API_URL, params, method)
+    async def _api_call(self, query: str, params: dict, method='get') -> dict:
+        return await tools.api_call(query, self.API_URL, params, method)
         #
         # if response['error'] and 'database' in response['msg'].lower():
         #     raise tools.DatabaseError(response['msg'])
@@ -54,30 +79,97 @@ class TipBotUser(User):
         """Return user obj dictionary"""
         return self.__dict__['_values']
 
-    def _update_to_db(self):
+    async def _update_to_db(self):
         """Update database with values from user obj, ID required"""
         if self.id:
             logger.info(f"@{self.name} TipBotUser::_update_to_db(users/create)")
-            return self._api_call('users/create', self.params(), method='post')
+            return await self._api_call('users/create', self.params(), method='post')
 
     def _get_wallet_from_db(self, address):
         self.wallet.address = address
         logger.info(f"@{self.name} TipBotUser::_get_wallet_from_db() -> {self.wallet}")
 
-    def update_from_db(self):
+    def _update_from_record(self, record: dict) -> bool:
         """
-        Get TipBotUser data from Django Database, if exists save/update the data
-        This method is used everytime when instance is created or registered to db.
+        Save values from database record to instance, values provided by user
+        are kept only if instance is built from Telegram User data
+        :return: True if user values differ from database (profile needs update)
         """
         need_update = False
 
+        for key, value in record.items():
+
+            # Handle Wallet object creation
+            if key == 'wallet':
+                try: self._get_wallet_from_db(address=value[0])
+                except Exception: pass
+
+            else:
+                # Handle data differences between database and user payload
+                # If user payload have different value database will be overwritten
+                value_from_user = str(getattr(self, key)) if getattr(self, key) and self.profile_hash else None
+                value_from_db = str(value)
+
+                if value_from_user and value_from_user != value_from_db:
+                    need_update = True
+                    logger.warning(f"@{self.name} TipBotUser::_update_from_db({key}) NEED UPDATE: "
+                                   f"(user): {getattr(self, key)} | (db): {value}")
+
+                # Handle saving values from database to instance
+                else:
+                    setattr(self, key, value)
+
+        return need_update
+
+    def _save_record(self, record: dict) -> dict:
+        """
+        Save values from database record to instance and queue outdated
+        database profile for update, return record as it is after the update
+        """
+        record = dict(record)
+
+        if self._update_from_record(record):
+            profile_sync.add(profile_of(self.params()))
+
+        record.update({key: getattr(self, key) for key in record if key != 'wallet'})
+        return record
+
+    def update_from_cache(self) -> bool:
+        """
+        Update instance from user cache, profile changed in Telegram
+        is queued for write-behind sync to database.
+        :return: False if user is not cached or cache entry expired
+        """
+        entry = cache.get(self.id)
+
+        if entry is None:
+            return False
+
+        self.is_registered = entry['is_registered']
+        need_update = self._update_from_record(entry['record']) if entry['record'] else False
+
+        if self.profile_hash and self.profile_hash != entry['profile']:
+            if need_update:
+                profile_sync.add(profile_of(self.params()))
+                entry['record'].update({key: getattr(self, key) for key in entry['record'] if key != 'wallet'})
+            entry['profile'] = self.profile_hash
+
+        return True
+
+    async def update_from_db(self):
+        """
+        Get TipBotUser data from Django Database, if exists save/update the data
+        This method is used when instance is not cached or registered to db.
+        """
+        record = None
+
         # Handle when ID, first_name and username is not present
         if not self.id and not self.first_name and not self.username:
             logger.error(f'No first_name, username and id')
             raise Exception(f'No first_name, username and id')
 
         # Send requests with params to database
-        response = self._api_call('users', self.params())
+        response = await self._api_call('users', self.params())
         logger.info(f'@{self.name} TipBotUser::_update_from_db(users) -> {response["msg"]}')
 
         # Handle api_call error:
@@ -102,33 +194,13 @@ class TipBotUser(User):
 
         if self.is_registered:
             # Save/Update params from database to object
-            for key, value in response["data"][0].items():
-
-                # Handle Wallet object creation
-                if key == 'wallet':
-                    try: self._get_wallet_from_db(address=value[0])
-                    except Exception: pass
+            record = self._save_record(response["data"][0])
 
-                else:
-                    # Handle data differences between database and user payload
-                    # If user payload have different value database will be overwritten
-                    value_from_user = str(getattr(self, key)) if getattr(self, key) else None
-                    value_from_db = str(value)
-
-                    if value_from_user and value_from_user != value_from_db:
-                        need_update = True
-                        logger.warning(f"@{self.name} TipBotUser::_update_from_db({key}) NEED UPDATE: "
-                                       f"(user): {getattr(self, key)} | (db): {value}")
-
-                    # Handle saving values from database to instance
-                    else:
-                        setattr(self, key, value)
-
-            # If any value in database was outdated update it
-            if need_update:
-                self._update_to_db()
+        # Cache users queried by id or found by other params
+        if self.id and len(response['data']) < 2:
+            cache.save(self.id, self.is_registered, record, self.profile_hash)
 
-    def register(self):
+    async def register(self):
         """
         Handle Database API calls to create or update TipBot User
         """
@@ -140,11 +212,11 @@ class TipBotUser(User):
             response = {'error': 1, 'msg': f'No first_name', 'data': None}
 
         else:
-            response = self._update_to_db()
+            response = await self._update_to_db()
 
         if not response['error']:
             self.is_registered = True
-            self.update_from_db()
+            await self.update_from_db()
             logger.info(f"@{self.name} User::register() -> {response['msg']}")
         else:
             logger.warning(f"@{self.name} User::register() -> {response['msg']}")
@@ -162,22 +234,22 @@ class TipBotUser(User):
         return self.get_mention().replace('_', '\_')
 
     @classmethod
-    def get_user(cls, key_word):
+    async def get_user(cls, key_word):
         """Get user from database without ID"""
         # Create temp user to access instance method (self)
-        temp_user = cls(id=545454, temp_user=True)
+        temp_user = cls(id=545454)
 
         # List of possible params to query with key_word
         possible_params = ['username', 'first_name', 'part_username']
 
         for param in possible_params:
             params = {param: key_word}
-            response = temp_user._api_call(query='users', params=params)
+            response = await temp_user._api_call(query='users', params=params)
             print(param, response)
 
-    def query_users(self, num: int, match: str):
+    async def query_users(self, num: int, match: str):
         params = {'part_username': match}
-        response = self._api_call(query='users', params=params)
+        response = await self._api_call(query='users', params=params)
 
         # Handle api_call error:
         if response['error']:
@@ -186,8 +258,8 @@ class TipBotUser(User):
 
         return response['data'][:num]
 
-    def get_users(self, num: int, random_: bool = False):
-        response = self._api_call(query='users', params={})
+    async def get_users(self, num: int, random_: bool = False):
+        response = await self._api_call(query='users', params={})
 
         # Handle api_call error:
         if response['error']:
@@ -204,9 +276,9 @@ class TipBotUser(User):
         return f"User({self.id} | {self.name} | registered: {self.is_registered})"
 
     @classmethod
-    def create_test_user(cls):
+    async def create_test_user(cls):
         """Create test user from random data and return self instance"""
-        return cls(**Tests().random_user())
+        return await cls.from_dict(Tests().random_user())
 
     def __str__(self):
         return self.log_repr()
@@ -0,0 +1,154 @@
+"""
+In-process cache of TipBotUser identities keyed by Telegram id, bounded by
+size (least recently used are dropped) and by age. It keeps registration
+status, database record (with wallet address) and hash of Telegram profile
+fields, so repeated interactions of active users need no `users` API call.
+Profiles changed in Telegram are written to database in batches by ProfileSync.
+"""
+from collections import OrderedDict
+import hashlib
+import asyncio
+import json
+import time
+
+from . import tools
+from .logger_ import logger
+from .settings import Database, Users
+
+
+# Telegram profile fields kept in database, see users/sync end-point
+PROFILE_FIELDS = ('username', 'first_name', 'last_name', 'language_code', 'is_bot', 'is_premium')
+
+
+def profile_of(values: dict) -> dict:
+    """Telegram profile fields of user dictionary, with id"""
+    profile = {field: values[field] for field in PROFILE_FIELDS if field in values}
+    profile['id'] = values['id']
+    return profile
+
+
+def profile_hash(values: dict) -> str:
+    profile = [values.get(field) for field in PROFILE_FIELDS]
+    return hashlib.sha1(json.dumps(profile, default=str).encode()).hexdigest()
+
+
+class UserCache:
+    """
+    Entries: {'is_registered': bool, 'record': dict or None, 'profile': str or None, 'time': float}
+    - record: user from `users` API call (with `wallet` addresses), None when not registered
+    - profile: hash of profile fields last seen in Telegram or written to database
+    """
+
+    def __init__(self, size: int = Users.CACHE_SIZE, ttl: float = Users.CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, user_id) -> dict:
+        """Fresh entry or None"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        entry = self._entries.get(user_id)
+
+        if entry is None:
+            return None
+
+        if time.monotonic() - entry['time'] > self.ttl:
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def save(self, user_id, is_registered: bool, record: dict = None, profile: str = None) -> dict:
+        user_id = int(user_id)
+        entry = {'is_registered': is_registered, 'record': record, 'profile': profile, 'time': time.monotonic()}
+
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+        return entry
+
+    def invalidate(self, user_id):
+        self._entries.pop(int(user_id), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ProfileSync:
+    """
+    Write-behind of changed Telegram profiles: pending profiles (newest per user)
+    are sent with `users/sync` every SYNC_INTERVAL seconds, or at once when
+    SYNC_BATCH profiles are waiting. Failed batches are retried with next flush.
+    """
+
+    def __init__(self, interval: float = Users.SYNC_INTERVAL, batch: int = Users.SYNC_BATCH):
+        self.interval = interval
+        self.batch = batch
+        self.pending = OrderedDict()
+        self._task = None
+        self._wakeup = None
+
+    def add(self, profile: dict):
+        self.pending.pop(profile['id'], None)
+        self.pending[profile['id']] = profile
+
+        if len(self.pending) >= self.batch and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self):
+        while self.pending:
+            ids = list(self.pending)[:self.batch]
+            profiles = [self.pending.pop(user_id) for user_id in ids]
+
+            response = await tools.api_call('users/sync', Database.API_URL, {'users': profiles}, method='post')
+
+            if response['error']:
+                logger.error(f"ProfileSync::flush({len(profiles)}) -> {response['msg']}")
+
+                # Re-queue unless a newer profile of the user is already waiting
+                for profile in profiles:
+                    self.pending.setdefault(profile['id'], profile)
+                return
+
+            logger.info(f"ProfileSync::flush({len(profiles)}) -> {response['msg']}")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        """Start write-behind task, call inside running event loop (bot startup)"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop write-behind task and write pending profiles"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+        await self.flush()
+
+
+cache = UserCache()
+profile_sync = ProfileSync()
@@ -1,4 +1,5 @@
 from .vite_wallet import ViteWallet
 from .alias_wallet import Wallet as AliasWallet
+from .directory import directory as alias_directory
 
 
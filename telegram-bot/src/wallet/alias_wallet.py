@@ -1,4 +1,5 @@
 from .. import tools, DJANGO_API_URL, TIPBOT_API_URL, logger
+from .directory import directory
 
 class Wallet:
     """Helper class to represent AccountAlias objects as TipBotUser like object"""
@@ -12,16 +13,19 @@ class Wallet:
         for arg, val in kwargs.items():
             setattr(self, arg, val)
 
-    def register(self):
+    async def register(self):
         if self.address and self.title and self.owner.is_registered:
-            return self._update_to_db()
-
-    def get(self):
-        """Get Alias info from database, return updated AliasWallet instance"""
-        if self.title:
-            response = tools.api_call('alias', DJANGO_API_URL, dict(title=self.title), 'get')
+            return await self._update_to_db()
+
+    async def get(self):
+        """Get Alias info from alias directory or database, return updated AliasWallet instance"""
+        if self.title and directory.loaded:
+            alias = directory.get(self.title)
+            response = {'error': 0, 'msg': 'success', 'data': [alias] if alias else []}
+        elif self.title:
+            response = await tools.api_call('alias', DJANGO_API_URL, dict(title=self.title), 'get')
         elif self.address:
-            response = tools.api_call('alias', DJANGO_API_URL, dict(address=self.address), 'get')
+            response = await tools.api_call('alias', DJANGO_API_URL, dict(address=self.address), 'get')
         else:
             raise Exception('#ALIAS or ADDRESS must be provided.')
 
@@ -33,19 +37,25 @@ class Wallet:
         else:
             return None
 
-    def balance(self):
-        response = tools.api_call('balance', TIPBOT_API_URL, self.params(), 'post')
+    async def balance(self):
+        response = await tools.api_call('balance', TIPBOT_API_URL, self.params(), 'post')
         if response['error']:
             return 0
 
         return response['data']
 
-    def _update_to_db(self):
+    async def _update_to_db(self):
         """Send instance to the database and create/update entry."""
         params = self.params()
         if 'is_bot' in params: del params['is_bot']
 
-        return tools.api_call('create_alias', TIPBOT_API_URL, self.params(), 'post')
+        response = await tools.api_call('create_alias', TIPBOT_API_URL, self.params(), 'post')
+
+        # Alias is created or updated in database, update directory right away
+        if response.get('data'):
+            directory.save(response['data'])
+
+        return response
 
     def params(self) -> dict:
         """Return user obj dictionary"""
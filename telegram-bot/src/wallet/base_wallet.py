@@ -23,24 +23,23 @@ class Wallet:
     @address.setter
     def address(self, value):
         self._address = value
-        self._update_from_db()
 
-    def _api_call(self, query: str, params: dict, method='get', api_url=None) -> dict:
+    async def _api_call(self, query: str, params: dict, method='get', api_url=None) -> dict:
         if not api_url:
             api_url = self.API_URL1
 
-        return tools.api_call(query, api_url, params, method)
+        return await tools.api_call(query, api_url, params, method)
 
-    def _update_from_db(self):
+    async def _update_from_db(self):
         pass
 
-    def epic_balance(self) -> dict:
+    async def epic_balance(self) -> dict:
         pass
 
-    def withdraw(self, state, query):
+    async def withdraw(self, state, query):
         pass
 
-    def send_to_user(self, state, query):
+    async def send_to_user(self, state, query):
         pass
 
     def tip_user(self):
@@ -0,0 +1,97 @@
+"""
+In-memory directory of AccountAliases by upper case title. Loaded at bot
+startup, refreshed with aliases updated since the last refresh (`alias`
+API call with `updated_since`) and fully reloaded now and then to drop
+removed ones. Once loaded it is authoritative, #alias lookups are
+dictionary hits and unknown hashtags need no API call.
+"""
+from datetime import datetime
+import asyncio
+import time
+
+from .. import tools, DJANGO_API_URL, logger
+from ..settings import Aliases
+
+
+def parse_updated(value: str) -> datetime:
+    """Alias `updated` ISO datetime, `Z` suffix is not parsed by fromisoformat before Python 3.11"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class AliasDirectory:
+    def __init__(self, refresh_interval: float = Aliases.REFRESH_INTERVAL,
+                 reload_interval: float = Aliases.RELOAD_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self.aliases = {}
+        self.since = None
+        self.loaded = False
+        self.loaded_at = 0.0
+        self._task = None
+
+    def get(self, title: str) -> dict:
+        """Alias data by title (with or without #), None if there is no such alias"""
+        return self.aliases.get(title.replace('#', '').upper())
+
+    def save(self, alias: dict):
+        """Add or replace alias, e.g. with `create_alias` response data"""
+        self.aliases[alias['title'].upper()] = alias
+
+        if alias.get('updated') and (not self.since or parse_updated(alias['updated']) > parse_updated(self.since)):
+            self.since = alias['updated']
+
+    async def load(self) -> bool:
+        """Replace directory with all aliases from database"""
+        response = await tools.api_call('alias', DJANGO_API_URL, {})
+
+        if response['error']:
+            logger.error(f"AliasDirectory::load() -> {response['msg']}")
+            return False
+
+        self.aliases = {}
+        self.since = None
+
+        for alias in response['data']:
+            self.save(alias)
+
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+        logger.info(f"AliasDirectory::load() -> {len(self.aliases)} aliases")
+        return True
+
+    async def refresh(self) -> bool:
+        """Merge aliases updated since last refresh, full reload when due"""
+        if not self.loaded or not self.since or time.monotonic() - self.loaded_at > self.reload_interval:
+            return await self.load()
+
+        response = await tools.api_call('alias', DJANGO_API_URL, {'updated_since': self.since})
+
+        if response['error']:
+            logger.error(f"AliasDirectory::refresh() -> {response['msg']}")
+            return False
+
+        for alias in response['data']:
+            self.save(alias)
+        return True
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """Load directory and keep refreshing it, call inside running event loop (bot startup)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+directory = AliasDirectory()
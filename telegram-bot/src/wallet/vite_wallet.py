@@ -1,14 +1,19 @@
 from aiogram.types import ParseMode
 from aiogram import types
 
-import threading
+import asyncio
 import decimal
 import time
+import uuid
 
 from .base_wallet import Wallet
 from .. import tools, logger, Tipbot, bot, settings
 
 
+# Back-end Transaction statuses before the send result is known
+IN_PROGRESS = ('pending', 'queued', 'sending')
+
+
 class ViteWallet(Wallet):
     """
     Wallet class to manage VITE blockchain operations.
@@ -21,14 +26,14 @@ class ViteWallet(Wallet):
         self.last_balance = {}
 
         if self.is_valid_address(address):
-            self._update_from_db()
+            self._address = address
 
-    def epic_balance(self) -> dict:
+    async def epic_balance(self) -> dict:
         self.is_updating = True
 
         # Send POST request to get wallet balance from network
         params = {'address': self.address, 'id': self.owner.id}
-        balance = self._api_call('balance', params, method='post',
+        balance = await self._api_call('balance', params, method='post',
                                  api_url=self.API_URL2)
 
         if balance['error']:
@@ -43,7 +48,8 @@ class ViteWallet(Wallet):
                 epic_balance = 0.0
 
             # Get Epic-Cash price in USD from Coingecko API
-            epic_vs_usd = settings.MarketData().price_epic_vs('USD')
+            loop = asyncio.get_running_loop()
+            epic_vs_usd = await loop.run_in_executor(None, settings.MarketData().price_epic_vs, 'USD')
             balance_in_usd = f"{round(decimal.Decimal(epic_balance) * epic_vs_usd, 2)}" \
                              f" USD" if epic_vs_usd else ''
 
@@ -53,15 +59,15 @@ class ViteWallet(Wallet):
                                  'pending': pending}}
         return self.last_balance
 
-    def update_balance(self):
+    async def update_balance(self):
         if self.is_updating:
-            logger.warning('updating thread already running for this wallet instance')
+            logger.warning('balance update already running for this wallet instance')
             return True
 
         # Send POST request to update wallet balance (receiveTransactions call)
         self.is_updating = True
         params = {'address': self.address, 'id': self.owner.id}
-        response = self._api_call('update', params, method='post', api_url=self.API_URL2)
+        response = await self._api_call('update', params, method='post', api_url=self.API_URL2)
 
         if response['error']:
             logger.error(f'@{self.owner.name} ViteWallet::update_balance() '
@@ -76,14 +82,14 @@ class ViteWallet(Wallet):
     def parse_vite_balance(data: dict):
         return tools.parse_vite_balance(data)
 
-    def _update_from_db(self):
+    async def _update_from_db(self):
         if not self.address:
             logger.error(f'No address provided.')
             return
 
         # database query
         params = {'address': self.address, 'id': self.owner.id}
-        response = self._api_call(query='wallets', params=params)
+        response = await self._api_call(query='wallets', params=params)
 
         if response['error']:
             logger.error(f'@{self.owner.name} ViteWallet::_update_from_db() -> {response["msg"]}')
@@ -98,6 +104,62 @@ class ViteWallet(Wallet):
         address = str(address)
         return len(address) == 55 and address.startswith('vite_')
 
+    @staticmethod
+    def _in_progress(tx: dict) -> bool:
+        return not tx['error'] and bool(tx['data']) and tx['data'].get('status') in IN_PROGRESS
+
+    async def _finished(self, tx: dict, key: str) -> dict:
+        """
+        Long-poll `transaction_status` of transaction queued by back-end outbox
+        until it is sent or failed, polls without answer keep last known status.
+        :param tx: send_transaction response of single transaction
+        :param key: idempotency key of the transaction
+        :return: send_transaction response with transaction `hash` or error
+        """
+        deadline = time.monotonic() + settings.Api.SEND_WAIT
+        params = {'idempotency_key': key, 'wait': settings.Api.STATUS_WAIT}
+
+        while self._in_progress(tx) and time.monotonic() < deadline:
+            status = await self._api_call('transaction_status', params, method='post', api_url=self.API_URL2)
+
+            if status['msg'] in tools.NO_RESPONSE:
+                await asyncio.sleep(settings.Api.STATUS_RETRY)
+            else:
+                tx = status
+
+        if self._in_progress(tx):
+            logger.warning(f"ViteWallet::_finished({key}) - still {tx['data']['status']}")
+            return {'error': 1, 'msg': "Transaction is still processing, check your balance later.", 'data': None}
+
+        return tx
+
+    async def _send(self, query: str, params: dict) -> dict:
+        """
+        Send with `send_transaction` or `send_batch` under new idempotency key, so
+        back-end never sends one request twice, and wait for queued transactions.
+        :return: send_transaction response, or send_batch response with list of them
+        """
+        key = uuid.uuid4().hex
+        params = dict(params, idempotency_key=key)
+        response = await self._api_call(query, params, method='post', api_url=self.API_URL2)
+
+        # No answer, request may still be running: repeated one with the same key
+        # gets its status (or sends it, when the first one never arrived)
+        if response['msg'] in tools.NO_RESPONSE:
+            logger.warning(f"ViteWallet::_send({query}) - {response['msg']}, repeating with key {key}")
+            response = await self._api_call(query, params, method='post', api_url=self.API_URL2)
+
+        if response['error']:
+            return response
+
+        if query == 'send_batch':
+            # Back-end keys batch transactions '<batch key>:<receiver index>'
+            response['data'] = await asyncio.gather(*[self._finished(tx, f"{key}:{i}")
+                                                      for i, tx in enumerate(response['data'])])
+            return response
+
+        return await self._finished(response, key)
+
     @staticmethod
     def get_explorer_tx_url(tx_hash: str):
         """Create VITE explorer transaction URL"""
@@ -122,7 +184,7 @@ class ViteWallet(Wallet):
             'network': settings.Network.VITE.symbol
             }
 
-        response = self._api_call('send_transaction', params, method='post', api_url=self.API_URL2)
+        response = await self._send('send_transaction', params)
 
         if response['error']:
             if 'sendBlock.Height must be larger than 1' in response['msg']:
@@ -138,7 +200,7 @@ class ViteWallet(Wallet):
 
         # Show user notification/alert
         await query.answer(text='Transaction Confirmed!')
-        time.sleep(1)
+        await asyncio.sleep(1)
 
         # Remove messages from previous state
         await self.owner.ui.remove_state_messages(state)
@@ -170,26 +232,43 @@ class ViteWallet(Wallet):
         conf_msg = f"⏳ Processing transaction.."
         await data['msg_confirmation'].edit_text(text=conf_msg, reply_markup=None, parse_mode=ParseMode.MARKDOWN)
 
-        for i, receiver in enumerate(data['recipients']):
-            # Consider anti-spam transaction lock
-            if i > 0:
-                time.sleep(settings.Tipbot.TIME_LOCK)
+        # Build and send all transactions with one request
+        params = {
+            'sender': self.owner.params(),
+            'receivers': [receiver.params() for receiver in data['recipients']],
+            'amount': data['amount'],
+            'type_of': 'send',
+            'network': settings.Network.VITE.symbol
+            }
+
+        batch = await self._send('send_batch', params)
+
+        # Messages from previous state are not needed any more
+        await self.owner.ui.remove_state_messages(state)
 
-            # Build and send transaction
-            params = {
-                'sender': self.owner.params(),
-                'receiver': receiver.params(),
-                'amount': data['amount'],
-                'type_of': 'send',
-                'network': settings.Network.VITE.symbol
-                }
+        # Whole batch refused (e.g. rate limit), nothing was sent
+        if batch['error']:
+            logger.error(f"ViteWallet::send() - {self.owner.mention}: {batch['msg']}")
+            await self.owner.ui.send_message(text=f"🟡 {batch['msg']}", chat_id=self.owner.id)
+            await state.finish()
+            await query.answer()
+            return
 
-            response = self._api_call('send_transaction', params, method='post', api_url=self.API_URL2)
+        # Show user notification/alert when anything was sent
+        if any(not response['error'] for response in batch['data']):
+            await query.answer(text='Transaction Confirmed!')
+            await asyncio.sleep(1)
+        else:
+            await query.answer()
 
+        amount = tools.float_to_str(data['amount'])
+
+        # Report every receiver, failed one does not hide transactions sent to the others
+        for receiver, response in zip(data['recipients'], batch['data']):
             # Handle error case
             if response['error']:
                 if 'no account' in response['msg']:
-                    msg = f"🟡 @{data['recipient']['username']} have no Tip-Bot account yet."
+                    msg = f"🟡 {receiver.get_mention()} have no Tip-Bot account yet."
                 elif 'sendBlock.Height must be larger than 1' in response['msg']:
                     msg = f"🟡 Insufficient balance."
                 else:
@@ -197,24 +276,13 @@ class ViteWallet(Wallet):
 
                 logger.error(f"ViteWallet::send() - {self.owner.mention}: {response['msg']}")
                 await self.owner.ui.send_message(text=msg, chat_id=self.owner.id)
-                await self.owner.ui.remove_state_messages(state)
-                await query.answer()
-
-                return
-
-            # Remove messages from previous state only at first iteration
-            if i == 0:
-                # Show user notification/alert
-                await self.owner.ui.remove_state_messages(state)
-                await query.answer(text='Transaction Confirmed!')
-                time.sleep(1)
+                continue
 
             # Create Vitescan.io explorer link to transaction
             transaction_hash = response['data']['hash']
             explorer_url = self.get_explorer_tx_url(transaction_hash)
 
             # Prepare user confirmation message
-            amount = tools.float_to_str(data['amount'])
             private_msg = f"✅ Transaction sent successfully\n" \
                           f"▪️️ [Transaction details (vitescan.io)]({explorer_url})"
             receiver_msg = f"💸 `{amount} EPIC from ` {self.owner.get_mention()}"
@@ -226,21 +294,16 @@ class ViteWallet(Wallet):
             if not receiver.is_bot:
                 await self.owner.ui.send_message(text=receiver_msg, chat_id=receiver.id)
 
-            # Finish send state when last element from list
-            if i+1 == len(data['recipients']):
-                await state.finish()
-                await query.answer()
-
             logger.info(f"{self.owner.mention}: sent {amount} to {receiver.mention}")
 
-            # Run threading process to update receiver balance (receiveTransactions call)
+            # Update receiver balance in background task (receiveTransactions call)
             logger.critical(f"ViteWallet::gui::send_tip() - start balance update for {receiver.mention}")
-            threading.Thread(target=receiver.wallet.update_balance).run()
+            tools.run_in_background(receiver.wallet.update_balance())
 
-    async def send_tip(self, payload: dict, message):
-        finished_transactions = []
-        success_transactions = 0
+        # Finish send state after the whole list
+        await state.finish()
 
+    async def send_tip(self, payload: dict, message):
         # Handle when no valid receiver
         if not payload['receivers']:
             msg = f"Invalid recipient username."
@@ -255,44 +318,38 @@ class ViteWallet(Wallet):
         if not payload['amount'] or float(payload['amount']) <= 0:
             return {'error': 1, 'msg': f"Wrong amount value.", 'data': None}
 
-        # Iterate through list of receivers and send transaction to each
-        for i, receiver in enumerate(payload['receivers']):
-            # Respect anti-flood locking system
-            if i > 0:
-                await message.edit_text(text=f"{message.text} ({i+1}/{len(payload['receivers'])})")
-                time.sleep(settings.Tipbot.TIME_LOCK)
-
-            # Build and send tip transaction
-            params = {
-                'sender': payload['sender'].params(),
-                'amount': payload['amount'],
-                'network': settings.Network.VITE.symbol,
-                'type_of': 'tip',
-                'receiver': receiver.params()
-                }
-
-            logger.info(f"@{payload['sender'].name} ViteWallet::send_tip"
-                        f"({payload['amount']} -> {receiver})")
-            response = self._api_call('send_transaction', params, method='post', api_url=self.API_URL2)
+        # Build and send tip transactions to all receivers with one request
+        params = {
+            'sender': payload['sender'].params(),
+            'amount': payload['amount'],
+            'network': settings.Network.VITE.symbol,
+            'type_of': 'tip',
+            'receivers': [receiver.params() for receiver in payload['receivers']]
+            }
+
+        logger.info(f"@{payload['sender'].name} ViteWallet::send_tip"
+                    f"({payload['amount']} -> {payload['receivers']})")
+        response = await self._send('send_batch', params)
+
+        if response['error']:
+            return response
+
+        finished_transactions = []
 
+        for tx in response['data']:
             # Handle error from VITE network
-            if response['error']:
-                if 'sendBlock.Height must be larger than 1' in response['msg']:
-                    msg = f"Your wallet is empty 🕸"
-                else:
-                    msg = f"{response['msg']}"
-                finished_transactions.append({'error': 1, 'msg': msg, 'data': None})
-            else:
-                # Handle success transaction
-                finished_transactions.append(response)
-                success_transactions += 1
+            if tx['error'] and 'sendBlock.Height must be larger than 1' in tx['msg']:
+                tx = {'error': 1, 'msg': f"Your wallet is empty 🕸", 'data': None}
+            finished_transactions.append(tx)
+
+        success_transactions = len([tx for tx in finished_transactions if not tx['error']])
 
         return {'msg': f'send_tip success: {success_transactions}/{len(payload["receivers"])}',
                 'error': 0, 'data': finished_transactions}
 
     async def show_deposit(self, query=None):
         params = dict(id=self.owner.id, username=self.owner.username)
-        response = self._api_call('address', params, method='post', api_url=self.API_URL2)
+        response = await self._api_call('address', params, method='post', api_url=self.API_URL2)
 
         if not response['error']:
             msg = f"👤  *Your ID & Username:*\n" \